@@ -3,11 +3,12 @@
   (:require 
    [com.brunobonacci.mulog :as u]
    [clojure.core :exclude [println print]]
-   [com.dx.cljpy-main.interface :as cljpy-main]
-   [com.dx.agent-tui-cljpy.interface :as tui]
-   [com.dx.agent-tui.agent :as agent]
-   [com.dx.agent.resolve-at.resolve-at :as resolve-at]
-   [com.dx.agent.code-executor :refer [code-executor]]))
+   [com.zihao.cljpy-main.interface :as cljpy-main]
+   [com.zihao.agent-tui-cljpy.interface :as tui]
+   [com.zihao.agent.app :as app]
+   [com.zihao.agent.chat-agent :as agent]
+   [com.zihao.agent.resolve-at.resolve-at :as resolve-at]
+   [com.zihao.agent.code-executor :refer [code-executor]]))
 
 (def python-env (cljpy-main/make-python-env ["./components/baml-client"
                                              "./components/agent-tui-cljpy"]
@@ -27,10 +28,12 @@
         app (tui/tui
              terminal-app
              {:query-candidates-fn query-candidates-fn})
-        ctx {:store store
-             :code-executor code-executor
-             :app app}
         handler-fn (fn [app-self message]
+                     (let [;; App map over the TerminalApp, so the agent's BAML calls get the
+                           ;; AbortController of this handler call and ctrl+g cancels them
+                           ctx {:store store
+                                :code-executor code-executor
+                                :app (app/tui-app app-self)}]
                      (tui/start-spinner app-self)
                      ;; Add user input to context
                      (agent/execute-actions ctx [[:user-input message]])
@@ -45,7 +48,7 @@
                            (when has-more-actions
                              (tui/add-log app-self (str "has-more-actions: " has-more-actions))
                              (recur (inc step) max-steps)))))
-                     (tui/stop-spinner app-self))]
+                     (tui/stop-spinner app-self)))]
     (tui/set-handler app handler-fn)
     (tui/run app)))
 
@@ -1,21 +1,27 @@
 import os
 import asyncio
 import re
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 # Disable BAML terminal logs to prevent interference with TUI
 os.environ["BAML_LOG"] = "off"
 
 from textual.app import App, ComposeResult
-from textual.widgets import Input, LoadingIndicator, Static, RichLog
+from textual.widgets import Input, LoadingIndicator, Static
 from textual.containers import Vertical, Container, Horizontal, ScrollableContainer
 from textual.content import Content
 from textual import events
 from textual_autocomplete import AutoComplete
 from textual_autocomplete._autocomplete import DropdownItem, TargetState
-from rich.markdown import Markdown
-from rich.syntax import Syntax
-from rich.console import RenderableType, Console
+
+from log_panel import LEVELS, LogBuffer, LogFilter, LogPanel
+from path_ranges import PathRanges, diff_edit
+from render import RenderService, StreamingMarkdown
+from scheduler import ABORTED, FAILED, HandlerScheduler
+from transcript import ChatTranscript
+from updates import UIUpdateQueue
 
 css = """
   .main {
@@ -66,6 +72,15 @@ css = """
       background: $surface;
   }
 
+  #handler-status {
+      height: 1;
+      color: $text-muted;
+  }
+
+  #handler-status.hidden {
+      display: none;
+  }
+
   #log-section {
       height: 10;
       border-top: solid $border;
@@ -109,79 +124,175 @@ css = """
   """
 
 
-def make_at_mention_candidates_callback(query_fn):
-    """Create a candidates callback function for @ mention autocomplete.
+# Matches @ followed by non-whitespace until the end of the text
+AT_MENTION_RE = re.compile(r'@([^\s]*)$')
+
+
+def fuzzy_filter(query: str, candidates: list[str]) -> list[str]:
+    """Keep the candidates that contain the characters of query in order (like fzf).
     
-    Args:
-        query_fn: Function that takes (query: str) and returns list of file paths
+    Matching is case-insensitive. The order of candidates is preserved.
+    """
+    query_lower = query.lower()
+    matches = []
+    for candidate in candidates:
+        candidate_lower = candidate.lower()
+        pos = 0
+        for char in query_lower:
+            pos = candidate_lower.find(char, pos) + 1
+            if pos == 0:
+                break
+        else:
+            matches.append(candidate)
+    return matches
+
+
+class AtMentionCandidateCache:
+    """LRU cache of @ mention query results, keyed by query.
     
-    Returns:
-        A callback function that takes TargetState and returns list of DropdownItem
+    A query that extends a cached one is answered by fuzzy-filtering the cached
+    candidates locally. That answer is exact when the cached result was not cut
+    off at max_results, since every fuzzy match of the longer query is also a
+    match of its prefix.
     """
-    def candidates_callback(state: TargetState) -> list[DropdownItem]:
-        """Get candidates for the current input value.
-        
-        Extracts the query after @ and calls query_fn to get file candidates.
-        Returns candidates with @ prefix for display.
+    
+    def __init__(self, max_results: int = 50, max_entries: int = 256):
+        """Initialize the cache.
         
         Args:
-            state: TargetState containing the input widget state
+            max_results: Result limit of query_fn; results this long may be truncated
+            max_entries: Number of queries to keep
+        """
+        self.max_results = max_results
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[str]] = OrderedDict()
+    
+    def lookup(self, query: str) -> tuple[list[str] | None, bool]:
+        """Look up candidates for a query.
         
         Returns:
-            List of DropdownItem objects (with @ prefix)
+            (candidates, complete) where candidates is None if nothing cached applies,
+            and complete is False if query_fn still has to be called for exact results
         """
-        value = state.text
-        
-        # Extract query after @ (match @ followed by non-whitespace until end or space)
-        match = re.search(r'@([^\s]*)$', value)
-        if not match:
-            return []
-        
-        query = match.group(1)
-        
-        # If query is empty, return empty list (don't show suggestions for just @)
-        if not query:
-            return []
-        
-        try:
-            # Get candidates - query_fn is expected to be synchronous from Python's perspective
-            # (Clojure functions called via libpython-clj2 are synchronous)
-            candidates = query_fn(query)
-            
-            # Return candidates as DropdownItem objects with @ prefix for display
-            if candidates:
-                return [DropdownItem(f"@{c}") for c in candidates]
-            
-            return []
-        except Exception:
-            # On error, return empty list
-            return []
+        candidates = self._entries.get(query)
+        if candidates is not None:
+            self._entries.move_to_end(query)
+            return candidates, True
+        
+        # Longest cached prefix of the query
+        for end in range(len(query) - 1, 0, -1):
+            prefix_candidates = self._entries.get(query[:end])
+            if prefix_candidates is not None:
+                candidates = fuzzy_filter(query, prefix_candidates)
+                complete = len(prefix_candidates) < self.max_results
+                if complete:
+                    self.put(query, candidates)
+                return candidates, complete
+        return None, False
     
-    return candidates_callback
+    def put(self, query: str, candidates: list[str]) -> None:
+        self._entries[query] = candidates
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
 
 
 class AtMentionAutoComplete(AutoComplete):
     """AutoComplete widget customized for @ file mentions.
     
     Extends textual-autocomplete's AutoComplete to properly replace @query with selected file path.
+    
+    query_fn is slow (in production it forks git and fzf), so it never runs on the
+    event loop. Candidates are served from an AtMentionCandidateCache; on a miss
+    the locally filtered results of a shorter query are shown right away, and
+    query_fn is called in the executor once typing pauses for DEBOUNCE_DELAY.
+    A newer query cancels the one in flight, and results arriving for a stale
+    query only populate the cache.
     """
     
-    def __init__(self, target, query_fn, executor=None):
+    # Seconds to wait after the last keystroke before calling query_fn
+    DEBOUNCE_DELAY = 0.15
+    
+    def __init__(self, target, query_fn, executor=None, max_results=50):
         """Initialize the autocomplete.
         
         Args:
             target: The Input widget to attach to
             query_fn: Function that takes (query: str) and returns list of file paths
-            executor: ThreadPoolExecutor (kept for compatibility, not used)
+            executor: Executor to run query_fn in (None uses the event loop's default)
+            max_results: Maximum number of results query_fn returns
         """
         self.query_fn = query_fn
         self._executor = executor
+        self._cache = AtMentionCandidateCache(max_results=max_results)
+        self._debounce_timer = None
+        self._pending_query = None  # Query waiting for the debounce timer or in flight
+        
+        super().__init__(target, candidates=self._get_at_mention_candidates)
+    
+    def _get_at_mention_candidates(self, state: TargetState) -> list[DropdownItem]:
+        """Get candidates for the current input value without blocking.
+        
+        Extracts the query after @ and answers it from the cache, scheduling a
+        query_fn call if the cached answer is not exact.
+        
+        Returns:
+            List of DropdownItem objects (with @ prefix)
+        """
+        match = AT_MENTION_RE.search(state.text)
+        if not match:
+            return []
         
-        # Create candidates callback
-        candidates_callback = make_at_mention_candidates_callback(query_fn)
+        query = match.group(1)
         
-        # Initialize AutoComplete with the callback
-        super().__init__(target, candidates=candidates_callback)
+        # If query is empty, return empty list (don't show suggestions for just @)
+        if not query:
+            return []
+        
+        candidates, complete = self._cache.lookup(query)
+        if not complete:
+            self._schedule_query(query)
+        
+        # Return candidates as DropdownItem objects with @ prefix for display
+        return [DropdownItem(f"@{c}") for c in candidates or []]
+    
+    def _schedule_query(self, query: str) -> None:
+        """(Re)start the debounce timer for a query_fn call."""
+        if query == self._pending_query:
+            return
+        self._pending_query = query
+        if self._debounce_timer is not None:
+            self._debounce_timer.stop()
+        self._debounce_timer = self.set_timer(self.DEBOUNCE_DELAY, self._start_query)
+    
+    def _start_query(self) -> None:
+        self._debounce_timer = None
+        if self._pending_query is not None:
+            # exclusive=True cancels the worker of the previous, now stale, query
+            self.run_worker(self._run_query(self._pending_query), group="at-mention", exclusive=True)
+    
+    def _query(self, query: str) -> list[str]:
+        """Call query_fn and convert its result. Runs in the executor."""
+        # Clojure functions called via libpython-clj2 are synchronous
+        return [str(c) for c in self.query_fn(query) or []]
+    
+    async def _run_query(self, query: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            candidates = await loop.run_in_executor(self._executor, self._query, query)
+        except Exception:
+            # On error, keep showing what we have; the query is retried on the next keystroke
+            return
+        finally:
+            if self._pending_query == query:
+                self._pending_query = None
+        
+        self._cache.put(query, candidates)
+        # Rebuild the dropdown from the cache if the input still wants this query
+        if self.target.has_focus:
+            match = AT_MENTION_RE.search(self.target.value)
+            if match and match.group(1).startswith(query):
+                self._handle_target_update()
     
     def apply_completion(self, completion: str, state: TargetState) -> None:
         """Apply the selected completion to the input widget.
@@ -196,7 +307,7 @@ class AtMentionAutoComplete(AutoComplete):
         value = state.text
         
         # Find the @ and everything after it
-        match = re.search(r'@([^\s]*)$', value)
+        match = AT_MENTION_RE.search(value)
         if match:
             # Replace @query with the completion (which already includes @)
             at_start = match.start()
@@ -204,22 +315,11 @@ class AtMentionAutoComplete(AutoComplete):
             new_value = value[:at_start] + completion + " "
             input_widget.value = new_value
             
-            # Calculate inserted length (new path length - old query length)
-            inserted_length = len(completion + " ") - (at_end - at_start)
-            
-            # Adjust existing ranges that come after the insertion point
-            for i, (start, end) in enumerate(input_widget._path_ranges):
-                if start >= at_start:
-                    # This range comes after or at the insertion point, shift right
-                    input_widget._path_ranges[i] = (start + inserted_length, end + inserted_length)
-            
-            # Record the new path range (including @ and trailing space)
-            path_start = at_start
-            path_end = at_start + len(completion + " ")
-            input_widget._path_ranges.append((path_start, path_end))
-            
-            # Sort ranges by start position to keep them ordered
-            input_widget._path_ranges.sort(key=lambda x: x[0])
+            # Shift ranges after the replaced @query, then record the new path range
+            # (including @ and trailing space)
+            path_ranges = input_widget._path_ranges
+            path_ranges.apply_edit(at_start, at_end - at_start, len(completion + " "))
+            path_ranges.add(at_start, at_start + len(completion + " "))
             
             # Update prev_value for change detection
             input_widget._prev_value = new_value
@@ -232,9 +332,7 @@ class AtMentionAutoComplete(AutoComplete):
             input_widget.value = value + completion + " "
             
             # Record the path range
-            path_start = old_length
-            path_end = len(input_widget.value)
-            input_widget._path_ranges.append((path_start, path_end))
+            input_widget._path_ranges.add(old_length, len(input_widget.value))
             
             # Update prev_value for change detection
             input_widget._prev_value = input_widget.value
@@ -247,10 +345,9 @@ class CustomInput(Input):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # List of (start, end) tuples for @path references
-        # Updated when paths are inserted via autocomplete
-        # Ranges are kept sorted by start position
-        self._path_ranges = []
+        # (start, end) ranges of @path references
+        # Updated when paths are inserted via autocomplete and on every edit
+        self._path_ranges = PathRanges()
         # Track previous value for detecting insertions
         self._prev_value = self.value if hasattr(self, 'value') else ""
     
@@ -284,143 +381,92 @@ class CustomInput(Input):
         
         Returns True if backspace was handled (path deleted), False otherwise.
         """
-        cursor_pos = self.cursor_position
-        
-        # Check if cursor is in any saved path range
-        # Iterate in reverse to handle deletion correctly
-        for i in range(len(self._path_ranges) - 1, -1, -1):
-            start, end = self._path_ranges[i]
-            # If cursor is within the path range (including boundaries)
-            if start <= cursor_pos <= end:
-                # Delete the entire @path
-                value = self.value
-                new_value = value[:start] + value[end:]
-                self.value = new_value
-                
-                # Remove this range and adjust other ranges
-                del self._path_ranges[i]
-                # Adjust ranges that come after the deleted one
-                deleted_length = end - start
-                for j in range(i, len(self._path_ranges)):
-                    old_start, old_end = self._path_ranges[j]
-                    self._path_ranges[j] = (old_start - deleted_length, old_end - deleted_length)
-                
-                # Position cursor where the path was
-                self.cursor_position = start
-                # Update prev_value for next change detection
-                self._prev_value = new_value
-                event.prevent_default()
-                return True
-        
-        # If not in a path, let default backspace behavior handle it
-        # The range updates will be handled in on_input_changed after the deletion
-        return False
+        # Check if cursor is in any saved path range (including boundaries)
+        path_range = self._path_ranges.find(self.cursor_position)
+        if path_range is None:
+            # If not in a path, let default backspace behavior handle it
+            # The range updates will be handled in on_input_changed after the deletion
+            return False
+        
+        # Delete the entire @path
+        start, end = path_range
+        value = self.value
+        new_value = value[:start] + value[end:]
+        self.value = new_value
+        
+        # Remove this range and shift the ones after it
+        self._path_ranges.apply_edit(start, end - start, 0)
+        
+        # Position cursor where the path was
+        self.cursor_position = start
+        # Update prev_value for next change detection
+        self._prev_value = new_value
+        event.prevent_default()
+        return True
     
     def on_input_changed(self, event: Input.Changed) -> None:
         """Update path ranges when input changes (for insertions/deletions outside paths)."""
         prev_value = getattr(self, '_prev_value', '')
         current_value = self.value
         
-        if len(current_value) > len(prev_value):
-            # Text was inserted
-            inserted_length = len(current_value) - len(prev_value)
-            # Find where the insertion happened by comparing strings
-            insertion_point = 0
-            for i in range(min(len(prev_value), len(current_value))):
-                if prev_value[i] != current_value[i]:
-                    insertion_point = i
-                    break
-            else:
-                # Strings are identical up to min length, insertion is at the end
-                insertion_point = len(prev_value)
-            
-            # Adjust ranges that come after the insertion point
-            for i, (start, end) in enumerate(self._path_ranges):
-                if start >= insertion_point:
-                    # This range comes after the insertion, shift right
-                    self._path_ranges[i] = (start + inserted_length, end + inserted_length)
-        
-        elif len(current_value) < len(prev_value):
-            # Text was deleted (not handled by smart backspace)
-            deleted_length = len(prev_value) - len(current_value)
-            # Find where the deletion happened
-            deletion_point = 0
-            for i in range(min(len(prev_value), len(current_value))):
-                if prev_value[i] != current_value[i]:
-                    deletion_point = i
-                    break
-            else:
-                # Strings are identical up to min length, deletion is at the end
-                deletion_point = len(current_value)
-            
-            # Update ranges: shift left or invalidate if deletion overlaps
-            # Iterate in reverse to handle deletion correctly
-            for i in range(len(self._path_ranges) - 1, -1, -1):
-                start, end = self._path_ranges[i]
-                if deletion_point < start:
-                    # Deletion before this range, shift left
-                    self._path_ranges[i] = (start - deleted_length, end - deleted_length)
-                elif start <= deletion_point < end:
-                    # Deletion within this range, invalidate the range
-                    del self._path_ranges[i]
-                    # Adjust subsequent ranges
-                    for j in range(i, len(self._path_ranges)):
-                        old_start, old_end = self._path_ranges[j]
-                        self._path_ranges[j] = (old_start - deleted_length, old_end - deleted_length)
-                    break
-                elif deletion_point >= end:
-                    # Deletion after this range, no change needed
-                    pass
+        # Locate the edit from the common prefix and suffix of the two values
+        edit = diff_edit(prev_value, current_value)
+        if edit is not None:
+            self._path_ranges.apply_edit(*edit)
         
         # Store current value for next comparison
         self._prev_value = current_value
 
 
 class MessageWidget(Static):
-    """Base class for message widgets."""
+    """Base class for message widgets.
+    
+    Keeps the source text and renders it through the app's RenderService,
+    again whenever the width of the widget changes. Rendered Content is cached
+    by the service, so re-mounting a message that scrolls back into view, or
+    showing the same code twice, doesn't render it again.
+    """
     
-    def __init__(self, content: RenderableType, raw_text: str = "", *args, **kwargs):
+    def __init__(self, text: str, render_service: RenderService, kind: str = "markdown", *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Convert Rich renderable to Textual Content for better selection support
-        if isinstance(content, (Markdown, Syntax)):
-            # For code blocks, prefer raw text for selection
-            if isinstance(content, Syntax) and raw_text:
-                textual_content = Content.from_text(raw_text)
-            else:
-                # Convert Rich renderable to Content while preserving formatting
-                try:
-                    console = Console(width=80, legacy_windows=False)
-                    textual_content = Content.from_rich_text(content, console)
-                except Exception:
-                    # Fallback to plain text if conversion fails
-                    if raw_text:
-                        textual_content = Content.from_text(raw_text)
-                    else:
-                        # Render to plain text as last resort
-                        console = Console(width=80, legacy_windows=False)
-                        with console.capture() as capture:
-                            console.print(content)
-                        text = capture.get()
-                        textual_content = Content.from_text(text)
-            self.update(textual_content)
-        else:
-            self.update(content)
+        self.raw_text = text
+        self._kind = kind
+        self._render_service = render_service
+        # Render at the last known message width so the first layout is already right
+        self._render_at(render_service.width)
+    
+    def _source_text(self) -> str:
+        """Text handed to the renderer."""
+        return self.raw_text
+    
+    def _render_at(self, width: int) -> None:
+        self._rendered_width = width
+        self.update(self._render_service.render(self._kind, self._source_text(), width))
+    
+    def on_resize(self, event: events.Resize) -> None:
+        width = self.size.width
+        if width and width != self._rendered_width:
+            self._render_service.width = width
+            self._render_at(width)
 
 
 class UserMessage(MessageWidget):
     """Widget for user messages."""
     
-    def __init__(self, content: RenderableType, raw_text: str = "", *args, **kwargs):
-        super().__init__(content, raw_text, *args, **kwargs)
+    def __init__(self, text: str, render_service: RenderService, *args, **kwargs):
+        super().__init__(text, render_service, "markdown", *args, **kwargs)
         self.add_class("message")
         self.add_class("user-message")
+    
+    def _source_text(self) -> str:
+        return f"**User>** {self.raw_text}"
 
 
 class AssistantMessage(MessageWidget):
     """Widget for assistant messages."""
     
-    def __init__(self, content: RenderableType, raw_text: str = "", *args, **kwargs):
-        super().__init__(content, raw_text, *args, **kwargs)
+    def __init__(self, text: str, render_service: RenderService, kind: str = "markdown", *args, **kwargs):
+        super().__init__(text, render_service, kind, *args, **kwargs)
         self.add_class("message")
         self.add_class("assistant-message")
 
@@ -428,27 +474,107 @@ class AssistantMessage(MessageWidget):
 class CodeBlock(MessageWidget):
     """Widget for code blocks."""
     
-    def __init__(self, content: RenderableType, raw_text: str = "", *args, **kwargs):
-        super().__init__(content, raw_text, *args, **kwargs)
+    def __init__(self, text: str, render_service: RenderService, *args, **kwargs):
+        super().__init__(text, render_service, "code", *args, **kwargs)
         self.add_class("message")
         self.add_class("code-block")
 
 
+class StreamingAssistantMessage(Vertical):
+    """Widget for an assistant message that is being streamed.
+    
+    Finished Markdown blocks and the open block are shown in separate Statics,
+    so a new chunk only re-renders and re-lays out the (small) open block.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.add_class("message")
+        self.add_class("assistant-message")
+        self._committed = Static()
+        self._tail = Static()
+        self._shown_committed = None
+        self._renderer = None
+    
+    def compose(self) -> ComposeResult:
+        yield self._committed
+        yield self._tail
+    
+    def show(self, renderer: StreamingMarkdown) -> None:
+        """Show the current state of a StreamingMarkdown renderer."""
+        self._renderer = renderer
+        if renderer.committed is not self._shown_committed:
+            self._shown_committed = renderer.committed
+            self._committed.update(renderer.committed)
+        tail = renderer.tail
+        if tail and renderer.committed:
+            # Keep a blank line between the finished blocks and the open one
+            tail = Content("\n") + tail
+        self._tail.update(tail)
+        self._tail.display = bool(tail)
+    
+    def on_resize(self, event: events.Resize) -> None:
+        width = self.size.width
+        if width and self._renderer is not None and width != self._renderer.width:
+            self._renderer.set_width(width)
+            self.show(self._renderer)
+
+
+def make_message_widget(kind: str, text: str, render_service: RenderService):
+    """Build the chat widget for a stored message of the given kind."""
+    if kind == "user":
+        return UserMessage(text, render_service)
+    if kind == "assistant":
+        return AssistantMessage(text, render_service)
+    if kind == "code":
+        return CodeBlock(text, render_service)
+    return AssistantMessage(text, render_service, "plain")
+
+
 class TerminalApp(App):
     CSS = css
+    # How often queued UI updates from worker threads are applied
+    UPDATE_FPS = 60
     BINDINGS = [
         ("l", "toggle_log", "Toggle Log"),
+        ("ctrl+g", "abort_handlers", "Abort"),
     ]
 
-    def __init__(self, clojure_handler=None, conversation_history=None, query_candidates_fn=None):
+    def __init__(self, clojure_handler=None, conversation_history=None, query_candidates_fn=None,
+                 log_capacity=5000, log_spill_path=None, max_concurrency=1):
         super().__init__()
         self.clojure_handler = clojure_handler
         self.conversation_history = conversation_history
         self.query_candidates_fn = query_candidates_fn  # Function to query file candidates
-        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clojure-handler")
-        self._streaming_widget = None  # Track the currently streaming message widget
-        self._streaming_text = ""  # Accumulated text for streaming
+        # Runs handler calls, at most max_concurrency at a time, the rest queued
+        self._scheduler = HandlerScheduler(max_concurrency, on_change=self._on_handler_change)
+        # Separate worker so @ mention queries don't wait behind a running handler
+        self._query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="at-mention-query")
+        # Shared Console and Content cache for rendering messages
+        self.render_service = RenderService()
+        self._streaming_index = None  # Transcript index of the currently streaming message
+        self._streaming_markdown = None  # Incremental renderer for the streaming message
         self._log_visible = False  # Track log visibility state
+        self._ui_thread = None  # Ident of the thread running the event loop, set on mount
+        self._log_panel = None  # Set on mount
+        # Last log_capacity log records, optionally also spilled to a rotating file
+        self.log_buffer = LogBuffer(log_capacity, spill_path=log_spill_path)
+        # UI updates pushed by worker threads, applied once per frame
+        self._updates = UIUpdateQueue()
+        self._update_handlers = {
+            "stream_start": self._show_stream_start,
+            "stream_append": self._show_stream_append,
+            "stream_set": self._show_stream_set,
+            "stream_finish": self._show_stream_finish,
+            "user": self._show_user_output,
+            "assistant": self._show_assistant_output,
+            "code": self._show_clojure_code,
+            "plain": self._show_plain_text,
+            "spinner": self._show_spinner,
+            "log": self._show_logs,
+            "log_filter": self._show_log_filter,
+            "handler_status": self._show_handler_status,
+        }
 
     def set_handler(self, handler_fn):
         self.clojure_handler = handler_fn
@@ -463,6 +589,11 @@ class TerminalApp(App):
         self.query_candidates_fn = query_fn
 
     def on_mount(self):
+        self._ui_thread = threading.get_ident()
+        self._log_panel = self.query_one("#log-content", LogPanel)
+        # Apply queued UI updates once per frame
+        self.set_interval(1 / self.UPDATE_FPS, self._flush_updates)
+        
         # Set up autocomplete using textual-autocomplete
         if self.query_candidates_fn:
             input_widget = self.query_one("#input", CustomInput)
@@ -470,24 +601,21 @@ class TerminalApp(App):
             autocomplete = AtMentionAutoComplete(
                 target=input_widget,
                 query_fn=self.query_candidates_fn,
-                executor=self._executor
+                executor=self._query_executor
             )
             self.mount(autocomplete)
         
-        # Load conversation history
+        # Load conversation history; only the visible part is mounted
         if self.conversation_history is not None:
-            chat_container = self.query_one("#chat-scroll", Vertical)
-            for message in self.conversation_history:
-                if message["role"] == "user":
-                    content = message['content']
-                    markdown = Markdown(f"**User>** {content}")
-                    widget = UserMessage(markdown, raw_text=content)
-                    chat_container.mount(widget)
-                elif message["role"] == "assistant":
-                    content = message['content']
-                    markdown = Markdown(content)
-                    widget = AssistantMessage(markdown, raw_text=content)
-                    chat_container.mount(widget)
+            self.query_one("#chat-scroll", ChatTranscript).extend(
+                (message["role"], message["content"])
+                for message in self.conversation_history
+                if message["role"] in ("user", "assistant")
+            )
+
+    def on_unmount(self):
+        # Abort in-flight handler calls instead of leaving their requests running
+        self._scheduler.shutdown()
 
     def action_toggle_log(self):
         """Toggle the log section visibility."""
@@ -498,6 +626,12 @@ class TerminalApp(App):
         else:
             log_section.remove_class("hidden")
             self._log_visible = True
+        # The panel only renders while shown
+        self.query_one("#log-content", LogPanel).set_shown(self._log_visible)
+
+    def action_abort_handlers(self):
+        """Abort the running handler calls (and their BAML requests) and drop queued ones."""
+        self._scheduler.abort()
 
     def action_blur_input(self):
         """Blur the input field."""
@@ -507,10 +641,11 @@ class TerminalApp(App):
     def compose(self) -> ComposeResult:
         with Container(classes="main"):
             with Vertical():
-                yield Vertical(id="chat-scroll")
+                yield ChatTranscript(self._make_message_widget, id="chat-scroll")
                 yield LoadingIndicator(id="spinner", classes="hidden")
+                yield Static(id="handler-status", classes="hidden")
                 with ScrollableContainer(id="log-section", classes="hidden"):
-                    yield RichLog(id="log-content", wrap=False, markup=True)
+                    yield LogPanel(self.log_buffer, id="log-content", wrap=False, markup=True)
                 yield CustomInput(id="input", placeholder="Type here...")
 
     async def on_input_submitted(self, event: Input.Submitted):
@@ -524,212 +659,229 @@ class TerminalApp(App):
             self.add_user_output(message)
             
             if self.clojure_handler:
-                # Run the handler in a background thread to avoid blocking the event loop
-                # This allows UI updates to show immediately
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(self._executor, self.clojure_handler, self, message)
-
-    def _add_widget_to_chat(self, widget):
-        """Thread-safe helper to add a widget to the chat."""
-        def _add_widget():
-            chat_container = self.query_one("#chat-scroll", Vertical)
-            chat_container.mount(widget)
+                # Run the handler on a worker thread to avoid blocking the event loop;
+                # if all workers are busy it waits in the scheduler queue
+                self._scheduler.submit(self.clojure_handler, self, message)
+
+    def _add_to_chat(self, kind: str, text: str) -> int:
+        """Add a message to the transcript and return its index."""
+        return self.query_one("#chat-scroll", ChatTranscript).append(kind, text)
+    
+    def _make_message_widget(self, index: int, kind: str, text: str):
+        """Widget factory for the transcript, called when a message scrolls into view."""
+        if index == self._streaming_index:
+            widget = StreamingAssistantMessage()
+            widget.show(self._streaming_markdown)
+            return widget
+        return make_message_widget(kind, text, self.render_service)
+    
+    def _post_update(self, kind: str, payload=None):
+        """Queue a UI update; see UIUpdateQueue for how updates are merged.
         
-        try:
-            asyncio.get_running_loop()
-            _add_widget()
-        except RuntimeError:
-            self.call_from_thread(_add_widget)
+        From any other thread this never blocks: the update is applied on the next
+        frame. On the app's own thread the queue is flushed right away, so updates
+        keep their order and take effect immediately. (A handler thread running its
+        own event loop, e.g. for an async BAML call, is still another thread.)
+        """
+        self._updates.push(kind, payload)
+        if threading.get_ident() == self._ui_thread:
+            self._flush_updates()
+    
+    def _flush_updates(self):
+        """Apply all queued UI updates. Runs on the event loop once per frame."""
+        for kind, payload in self._updates.drain():
+            self._update_handlers[kind](payload)
+        # A flood of log lines is rendered a frame's worth at a time
+        if self._log_panel is not None and self._log_panel.backlog:
+            self._log_panel.render_backlog()
+    
+    @property
+    def max_concurrency(self) -> int:
+        """How many handler calls may run at the same time."""
+        return self._scheduler.max_concurrency
+    
+    @max_concurrency.setter
+    def max_concurrency(self, value: int):
+        self._scheduler.max_concurrency = value
+    
+    @property
+    def handler_queue_depth(self) -> int:
+        """Number of submitted messages waiting for a free handler worker."""
+        return self._scheduler.queue_depth
+    
+    def current_abort_controller(self):
+        """The BAML AbortController of the handler call running on this thread.
+        
+        Handlers pass it to BAML as baml_options={"abort_controller": ...} so that
+        aborting (ctrl+g) cancels the in-flight request. Must be called from the
+        handler's own thread; returns None elsewhere or without baml_py.
+        """
+        job = self._scheduler.current_job()
+        return job.abort_controller if job is not None else None
+    
+    def abort_handlers(self):
+        """Thread-safe method to abort running handler calls and drop queued ones."""
+        self._scheduler.abort()
+    
+    def _on_handler_change(self, scheduler, job):
+        """Called by the scheduler, on any thread, when a handler call changes status."""
+        if job.status == FAILED:
+            self.add_log(f"Handler failed: {job.error!r}", "error")
+        elif job.status == ABORTED:
+            self.add_log(f"Handler call {job.id} aborted", "warning")
+            if not scheduler.running_count:
+                # The aborted handler may not have reached its stop_spinner or
+                # finish_streaming_output calls
+                self.stop_spinner()
+                self._post_update("stream_finish")
+        self._post_update("handler_status")
+    
+    @property
+    def update_stats(self) -> dict:
+        """Counters for queued, coalesced and dropped UI updates."""
+        return self._updates.stats
     
     def start_streaming_output(self):
         """Start streaming an assistant message. Creates a new widget for streaming."""
-        def _start_streaming():
-            # Create an empty assistant message widget for streaming
-            markdown = Markdown("")
-            widget = AssistantMessage(markdown, raw_text="")
-            self._add_widget_to_chat(widget)
-            self._streaming_widget = widget
-            self._streaming_text = ""
-        
-        try:
-            asyncio.get_running_loop()
-            _start_streaming()
-        except RuntimeError:
-            self.call_from_thread(_start_streaming)
+        self._post_update("stream_start")
     
     def append_streaming_output(self, text_chunk: str):
-        """Append a chunk of text to the currently streaming message."""
-        def _append_streaming():
-            if self._streaming_widget is None:
-                # If no streaming widget exists, create one inline
-                markdown = Markdown("")
-                widget = AssistantMessage(markdown, raw_text="")
-                self._add_widget_to_chat(widget)
-                self._streaming_widget = widget
-                self._streaming_text = ""
-            
-            # Accumulate the text
-            self._streaming_text += text_chunk
-            
-            # Update the widget with the accumulated text
-            markdown = Markdown(self._streaming_text)
-            # Convert to Content for better selection support
-            try:
-                console = Console(width=80, legacy_windows=False)
-                textual_content = Content.from_rich_text(markdown, console)
-            except Exception:
-                textual_content = Content.from_text(self._streaming_text)
-            
-            self._streaming_widget.update(textual_content)
+        """Append a chunk of text to the currently streaming message.
         
-        try:
-            asyncio.get_running_loop()
-            _append_streaming()
-        except RuntimeError:
-            self.call_from_thread(_append_streaming)
+        Only the last, still-open Markdown block is re-rendered; finished blocks
+        are cached by the StreamingMarkdown renderer.
+        """
+        self._post_update("stream_append", text_chunk)
     
     def set_streaming_output(self, text: str):
-        """Set the entire text of the currently streaming message (replaces existing content)."""
-        def _set_streaming():
-            if self._streaming_widget is None:
-                # If no streaming widget exists, create one inline
-                markdown = Markdown("")
-                widget = AssistantMessage(markdown, raw_text="")
-                self._add_widget_to_chat(widget)
-                self._streaming_widget = widget
-            
-            # Set the text directly (replace existing)
-            self._streaming_text = text
-            
-            # Update the widget with the new text
-            markdown = Markdown(self._streaming_text)
-            # Convert to Content for better selection support
-            try:
-                console = Console(width=80, legacy_windows=False)
-                textual_content = Content.from_rich_text(markdown, console)
-            except Exception:
-                textual_content = Content.from_text(self._streaming_text)
-            
-            self._streaming_widget.update(textual_content)
+        """Set the entire text of the currently streaming message (replaces existing content).
         
-        try:
-            asyncio.get_running_loop()
-            _set_streaming()
-        except RuntimeError:
-            self.call_from_thread(_set_streaming)
+        If the new text extends the previous one only the new suffix is rendered.
+        """
+        self._post_update("stream_set", text)
     
     def finish_streaming_output(self):
         """Finish streaming and finalize the message."""
-        def _finish_streaming():
-            if self._streaming_widget is not None:
-                # Update the widget one final time with the complete text
-                markdown = Markdown(self._streaming_text)
-                try:
-                    console = Console(width=80, legacy_windows=False)
-                    textual_content = Content.from_rich_text(markdown, console)
-                except Exception:
-                    textual_content = Content.from_text(self._streaming_text)
-                
-                self._streaming_widget.update(textual_content)
-                # Clear streaming state
-                self._streaming_widget = None
-                self._streaming_text = ""
-        
-        try:
-            asyncio.get_running_loop()
-            _finish_streaming()
-        except RuntimeError:
-            self.call_from_thread(_finish_streaming)
+        self._post_update("stream_finish")
     
     def add_user_output(self, text):
         """Thread-safe method to add user message to the chat."""
-        def _add_user_output():
-            markdown = Markdown(f"**User>** {text}")
-            widget = UserMessage(markdown, raw_text=text)
-            self._add_widget_to_chat(widget)
-        
-        try:
-            asyncio.get_running_loop()
-            _add_user_output()
-        except RuntimeError:
-            self.call_from_thread(_add_user_output)
+        self._post_update("user", text)
 
     def add_assistant_output(self, text):
         """Thread-safe method to add assistant message to the chat.
         For streaming, use start_streaming_output/append_streaming_output/finish_streaming_output instead."""
-        def _add_assistant_output():
-            markdown = Markdown(text)
-            widget = AssistantMessage(markdown, raw_text=text)
-            self._add_widget_to_chat(widget)
-        
-        try:
-            asyncio.get_running_loop()
-            _add_assistant_output()
-        except RuntimeError:
-            self.call_from_thread(_add_assistant_output)
+        self._post_update("assistant", text)
 
     def add_clojure_code(self, code):
         """Thread-safe method to render Clojure code with syntax highlighting"""
-        def _add_code():
-            syntax = Syntax(code, "clojure", theme="monokai", line_numbers=False)
-            widget = CodeBlock(syntax, raw_text=code)
-            self._add_widget_to_chat(widget)
-        
-        try:
-            asyncio.get_running_loop()
-            _add_code()
-        except RuntimeError:
-            self.call_from_thread(_add_code)
+        self._post_update("code", code)
 
     def add_plain_text(self, text):
         """Thread-safe method to render plain text"""
-        def _add_text():
-            textual_content = Content.from_text(text, markup=False)
-            widget = Static(textual_content)
-            widget.add_class("message")
-            widget.add_class("assistant-message")
-            self._add_widget_to_chat(widget)
-        
-        try:
-            asyncio.get_running_loop()
-            _add_text()
-        except RuntimeError:
-            self.call_from_thread(_add_text)
+        self._post_update("plain", text)
 
     def start_spinner(self):
         """Thread-safe method to start the spinner"""
-        def _start_spinner():
-            self.query_one("#spinner").remove_class("hidden")
-        
-        try:
-            asyncio.get_running_loop()
-            _start_spinner()
-        except RuntimeError:
-            self.call_from_thread(_start_spinner)
+        self._post_update("spinner", True)
 
     def stop_spinner(self):
         """Thread-safe method to stop the spinner"""
-        def _stop_spinner():
-            self.query_one("#spinner").add_class("hidden")
-        
-        try:
-            asyncio.get_running_loop()
-            _stop_spinner()
-        except RuntimeError:
-            self.call_from_thread(_stop_spinner)
-
-    def add_log(self, message: str):
-        """Thread-safe method to add a log message to the log section."""
-        def _add_log():
-            log_content = self.query_one("#log-content", RichLog)
-            log_content.write(message)
-            # Auto-scroll to bottom
-            log_section = self.query_one("#log-section")
-            log_section.scroll_end(animate=False)
-        
-        try:
-            asyncio.get_running_loop()
-            _add_log()
-        except RuntimeError:
-            self.call_from_thread(_add_log)
+        self._post_update("spinner", False)
 
+    def add_log(self, message: str, level: str = "info"):
+        """Thread-safe method to add a log message to the log section.
+        
+        Args:
+            message: Log message, may contain Rich markup
+            level: One of debug, info, warning, error
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown log level {level!r}, expected one of {', '.join(LEVELS)}")
+        # Buffered (and spilled) right away; only rendering waits for the next frame
+        # and may be dropped when log lines come faster than frames
+        self._post_update("log", self.log_buffer.append(message, level))
+    
+    def set_log_filter(self, level: str = "debug", pattern: str | None = None):
+        """Thread-safe method to only show log messages at or above level matching the regex pattern."""
+        self._post_update("log_filter", LogFilter(level, pattern))
+
+    # Update handlers, called on the event loop by _flush_updates
+
+    def _ensure_streaming_message(self):
+        if self._streaming_index is None:
+            # Each message gets its own renderer, the widget keeps it for resizes
+            self._streaming_markdown = StreamingMarkdown(self.render_service)
+            self._streaming_index = self._add_to_chat("assistant", "")
+
+    def _show_streaming_message(self):
+        transcript = self.query_one("#chat-scroll", ChatTranscript)
+        # The widget only exists while the message is scrolled into view
+        widget = transcript.widget_for(self._streaming_index)
+        if widget is not None:
+            widget.show(self._streaming_markdown)
+            transcript.refresh_message(self._streaming_index)
+
+    def _close_streaming_message(self):
+        """Store the streamed text in the transcript and clear the streaming state.
+
+        The transcript rebuilds the message from its stored text when it scrolls
+        back into view, so this must happen before the index is dropped.
+        """
+        transcript = self.query_one("#chat-scroll", ChatTranscript)
+        transcript.set_text(self._streaming_index, self._streaming_markdown.text)
+        self._streaming_index = None
+        self._streaming_markdown = None
+
+    def _show_stream_start(self, _payload):
+        # A stream that was never finished keeps what it got so far
+        if self._streaming_index is not None:
+            self._close_streaming_message()
+        # Create an empty assistant message for streaming
+        self._ensure_streaming_message()
+
+    def _show_stream_append(self, text_chunk):
+        self._ensure_streaming_message()
+        self._streaming_markdown.append(text_chunk)
+        self._show_streaming_message()
+
+    def _show_stream_set(self, text):
+        self._ensure_streaming_message()
+        self._streaming_markdown.set_text(text)
+        self._show_streaming_message()
+
+    def _show_stream_finish(self, _payload):
+        if self._streaming_index is not None:
+            # Render the last open block and show the complete message
+            self._streaming_markdown.finish()
+            self._show_streaming_message()
+            self._close_streaming_message()
+
+    def _show_user_output(self, text):
+        self._add_to_chat("user", text)
+
+    def _show_assistant_output(self, text):
+        self._add_to_chat("assistant", text)
+
+    def _show_clojure_code(self, code):
+        self._add_to_chat("code", code)
+
+    def _show_plain_text(self, text):
+        self._add_to_chat("plain", text)
+
+    def _show_handler_status(self, _payload):
+        running = self._scheduler.running_count
+        queued = self._scheduler.queue_depth
+        status = self.query_one("#handler-status", Static)
+        status.set_class(not (running or queued), "hidden")
+        status.update(f"{running} running, {queued} queued (ctrl+g to abort)")
+
+    def _show_spinner(self, visible):
+        self.query_one("#spinner").set_class(not visible, "hidden")
+
+    def _show_logs(self, records):
+        # Rendered by _flush_updates a frame's worth at a time, or not at all while hidden
+        self.query_one("#log-content", LogPanel).write_records(records)
+
+    def _show_log_filter(self, log_filter):
+        self.query_one("#log-content", LogPanel).set_filter(log_filter)
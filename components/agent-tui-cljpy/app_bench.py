@@ -0,0 +1,452 @@
+"""Benchmarks for the agent TUI rendering paths.
+
+Run from this directory:
+
+    python app_bench.py streaming
+    python app_bench.py history
+    python app_bench.py session streaming
+    python app_bench.py session path/to/recorded.jsonl
+    python app_bench.py suite
+
+`session` replays a session headlessly against TerminalApp (through
+run_test) and reports frame time percentiles, producer-to-screen latency of
+every replayed call and the peak RSS of the process. `suite` runs each
+built-in session in its own process, so peak RSS is per session.
+
+A session is a JSON lines file. An optional first line {"history": [...]}
+holds the conversation history the app starts with; every other line is an
+event at `t` seconds from the start:
+
+    {"t": 0.5, "call": "append_streaming_output", "args": ["chunk"]}
+    {"t": 1.0, "press": "l"}
+    {"t": 1.5, "scroll": 0.5}
+
+`call` events invoke a thread-safe TerminalApp method from a producer thread,
+`press` sends a key and `scroll` jumps the transcript to a fraction of its
+height. Real sessions can be recorded with record_session(app, path).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from rich.console import Console
+from textual._compositor import CompositorUpdate
+from textual.screen import Screen
+
+from app import TerminalApp
+from render import RenderService, StreamingMarkdown, markdown_to_content
+from transcript import ChatTranscript
+
+# A section of a typical assistant reply: prose, a list and a code block
+REPLY_SECTION = """## Step {n}
+
+The handler reads the file, extracts the **relevant** symbols and passes them
+to the next agent step. See `resolve-at` for how `@path` mentions are resolved.
+
+- first item with some `inline code`
+- second item with a [link](https://example.com)
+- third item
+
+```clojure
+(defn step-{n} [ctx]
+  (let [result (agent-step ctx)]
+    (assoc ctx :result result)))
+```
+
+"""
+
+
+def make_reply(size: int) -> str:
+    """Build a Markdown reply of roughly `size` characters."""
+    sections = []
+    length = 0
+    n = 0
+    while length < size:
+        section = REPLY_SECTION.format(n=n)
+        sections.append(section)
+        length += len(section)
+        n += 1
+    return "".join(sections)[:size]
+
+
+def chunked(text: str, chunk_size: int):
+    for i in range(0, len(text), chunk_size):
+        yield text[i:i + chunk_size]
+
+
+def report(name: str, timings: list[float]) -> None:
+    """Print per-chunk timings for the first and last tenth of the stream."""
+    tenth = max(1, len(timings) // 10)
+    first = statistics.mean(timings[:tenth]) * 1e6
+    last = statistics.mean(timings[-tenth:]) * 1e6
+    total = sum(timings)
+    print(f"{name:>12}: chunks={len(timings)} total={total:.2f}s "
+          f"first10%={first:.0f}us/chunk last10%={last:.0f}us/chunk ratio={last / first:.1f}x")
+
+
+def bench_streaming(size: int, chunk_size: int, naive_size: int) -> None:
+    """Stream a reply through StreamingMarkdown and through a full re-render per chunk."""
+    console = Console(width=80, legacy_windows=False)
+
+    reply = make_reply(size)
+    renderer = StreamingMarkdown(RenderService(width=80))
+    timings = []
+    for chunk in chunked(reply, chunk_size):
+        start = time.perf_counter()
+        renderer.append(chunk)
+        timings.append(time.perf_counter() - start)
+    renderer.finish()
+    report("incremental", timings)
+
+    # The old behaviour re-renders the whole message per chunk, so keep it short
+    reply = make_reply(naive_size)
+    text = ""
+    timings = []
+    for chunk in chunked(reply, chunk_size):
+        start = time.perf_counter()
+        text += chunk
+        markdown_to_content(text, console)
+        timings.append(time.perf_counter() - start)
+    report("full", timings)
+
+
+def make_history(count: int) -> list[dict]:
+    """Build a conversation history of `count` alternating user/assistant messages."""
+    history = []
+    for i in range(count):
+        if i % 2 == 0:
+            history.append({"role": "user", "content": f"Where is step {i} handled?"})
+        else:
+            history.append({"role": "assistant", "content": REPLY_SECTION.format(n=i)})
+    return history
+
+
+async def bench_history_async(count: int) -> None:
+    history = make_history(count)
+    start = time.perf_counter()
+    app = TerminalApp(conversation_history=history)
+    async with app.run_test(size=(120, 40)) as pilot:
+        await pilot.pause()
+        startup = time.perf_counter() - start
+        transcript = app.query_one("#chat-scroll", ChatTranscript)
+        print(f"     startup: messages={count} time={startup:.2f}s mounted={transcript.mounted_count}")
+
+        # Jump through the history and time until the window is mounted again
+        for name, y in [("top", 0), ("middle", transcript.max_scroll_y / 2), ("bottom", transcript.max_scroll_y)]:
+            start = time.perf_counter()
+            transcript.scroll_to(y=y, animate=False, immediate=True)
+            await pilot.pause()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>12}: time={elapsed * 1000:.0f}ms mounted={transcript.mounted_count}")
+
+        # Scroll back to the top; those messages were rendered before and come from the cache
+        start = time.perf_counter()
+        transcript.scroll_to(y=0, animate=False, immediate=True)
+        await pilot.pause()
+        elapsed = time.perf_counter() - start
+        print(f"{'top again':>12}: time={elapsed * 1000:.0f}ms mounted={transcript.mounted_count}")
+        print(f"render cache: {app.render_service.stats}")
+
+
+def bench_history(count: int) -> None:
+    """Start the app with a long conversation history."""
+    asyncio.run(bench_history_async(count))
+
+
+# TerminalApp methods that may be replayed from a session
+REPLAY_METHODS = frozenset({
+    "add_user_output",
+    "add_assistant_output",
+    "add_clojure_code",
+    "add_plain_text",
+    "add_log",
+    "start_spinner",
+    "stop_spinner",
+    "start_streaming_output",
+    "append_streaming_output",
+    "set_streaming_output",
+    "finish_streaming_output",
+})
+
+CLOJURE_FORM = """(defn handle-{n} [{{:keys [store app] :as ctx}} message]
+  (let [state @store
+        msgs (:msgs state)]
+    (when app
+      (add-log app (str "[handle-{n}] " (count msgs) " messages")))
+    (swap! store update :msgs conj {{:role "user" :content message}})
+    (agent-step ctx)))
+"""
+
+
+def record_session(app: TerminalApp, path: str) -> None:
+    """Record the replayable calls made on app to a session file.
+
+    Call before app.run(); every call of a REPLAY_METHODS method is appended
+    to path as a JSON line.
+    """
+    start = time.perf_counter()
+    lock = threading.Lock()
+    out = open(path, "w", encoding="utf-8")
+    if app.conversation_history:
+        out.write(json.dumps({"history": app.conversation_history}) + "\n")
+
+    def wrap(name, method):
+        def recorded(*args):
+            with lock:
+                event = {"t": round(time.perf_counter() - start, 4), "call": name, "args": list(args)}
+                out.write(json.dumps(event) + "\n")
+                out.flush()
+            return method(*args)
+        return recorded
+
+    for name in REPLAY_METHODS:
+        setattr(app, name, wrap(name, getattr(app, name)))
+
+
+def load_session(path: str) -> tuple[list[dict], list[dict]]:
+    """Read a session file. Returns (history, events)."""
+    history = []
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if "history" in event:
+                history = event["history"]
+            else:
+                events.append(event)
+    return history, events
+
+
+def paced(calls, interval: float, start: float = 0.0) -> list[dict]:
+    """Turn (method, *args) tuples into call events spaced interval seconds apart."""
+    return [
+        {"t": start + i * interval, "call": call[0], "args": list(call[1:])}
+        for i, call in enumerate(calls)
+    ]
+
+
+def session_streaming(size: int = 50_000, chunk_size: int = 4, rate: float = 500) -> tuple[list, list]:
+    """One long Markdown reply streamed at rate chunks per second."""
+    calls = [("add_user_output", "Walk me through the agent steps"), ("start_streaming_output",)]
+    calls += [("append_streaming_output", chunk) for chunk in chunked(make_reply(size), chunk_size)]
+    calls.append(("finish_streaming_output",))
+    return [], paced(calls, 1 / rate)
+
+
+def session_code(blocks: int = 20, forms: int = 40, rate: float = 10) -> tuple[list, list]:
+    """Large Clojure code blocks, each followed by a short reply."""
+    calls = []
+    for n in range(blocks):
+        code = "\n".join(CLOJURE_FORM.format(n=n * forms + i) for i in range(forms))
+        calls.append(("add_clojure_code", code))
+        calls.append(("add_assistant_output", f"Block {n} defines **{forms}** handlers."))
+    return [], paced(calls, 1 / rate)
+
+
+def session_logs(lines: int = 20_000, rate: float = 5_000) -> tuple[list, list]:
+    """A flood of log lines with the log panel open."""
+    calls = [("add_log", f"[INFO] step {i}: {{:msgs {i} :actions [:chat-agent]}}", "info") for i in range(lines)]
+    return [], [{"t": 0.0, "press": "l"}] + paced(calls, 1 / rate, start=0.1)
+
+
+def session_history(messages: int = 10_000) -> tuple[list, list]:
+    """Start with a long history, jump through it and stream one more reply."""
+    events = [{"t": 0.2 * (i + 1), "scroll": fraction} for i, fraction in enumerate([0, 0.5, 0.25, 1])]
+    _, reply = session_streaming(size=5_000, rate=500)
+    for event in reply:
+        event["t"] += 1.2
+    return make_history(messages), events + reply
+
+
+SESSIONS = {
+    "streaming": session_streaming,
+    "code": session_code,
+    "logs": session_logs,
+    "history": session_history,
+}
+
+
+class BenchApp(TerminalApp):
+    """TerminalApp that measures when replayed calls reach the screen.
+
+    A replayed call is timed from the producer calling the TerminalApp method,
+    through the frame flush that applies it, to the end of the next frame that
+    is rendered after that.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._bench_lock = threading.RLock()
+        self._produced: list[float] = []  # Calls made but not applied yet
+        self._applied: list[float] = []  # Calls applied but not on screen yet
+        self.latencies: list[float] = []
+        self.flush_times: list[float] = []
+
+    def produce(self, method: str, *args) -> None:
+        """Call a TerminalApp method, as a producer thread would."""
+        with self._bench_lock:
+            self._produced.append(time.perf_counter())
+            getattr(self, method)(*args)
+
+    def _flush_updates(self):
+        with self._bench_lock:
+            start = time.perf_counter()
+            super()._flush_updates()
+            self.flush_times.append(time.perf_counter() - start)
+            self._applied.extend(self._produced)
+            self._produced.clear()
+
+    def _display(self, screen, renderable):
+        # Headless apps skip writing to the terminal; render the segments anyway so the cost counts
+        if isinstance(renderable, CompositorUpdate):
+            renderable.render_segments(self.console)
+        super()._display(screen, renderable)
+        if renderable is not None and self._applied:
+            now = time.perf_counter()
+            self.latencies.extend(now - produced for produced in self._applied)
+            self._applied.clear()
+
+
+@contextmanager
+def timed_frames(frame_times: list[float]):
+    """Record how long every screen update (layout, compositing, rendering) takes."""
+    original = Screen._on_timer_update
+
+    def timed(screen):
+        start = time.perf_counter()
+        original(screen)
+        frame_times.append(time.perf_counter() - start)
+
+    Screen._on_timer_update = timed
+    try:
+        yield
+    finally:
+        Screen._on_timer_update = original
+
+
+def percentiles(values: list[float]) -> str:
+    """p50/p90/p99/max of durations in seconds, formatted in milliseconds."""
+    if not values:
+        return "n=0"
+    if len(values) == 1:
+        return f"n=1 max={values[0] * 1000:.2f}ms"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return (f"n={len(values)} p50={cuts[49] * 1000:.2f}ms p90={cuts[89] * 1000:.2f}ms "
+            f"p99={cuts[98] * 1000:.2f}ms max={max(values) * 1000:.2f}ms")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def replay_events(app: BenchApp, pilot, loop, events: list[dict], start: float) -> None:
+    """Producer thread: play events at their timestamps."""
+    transcript = app.query_one("#chat-scroll", ChatTranscript)
+    for event in events:
+        delay = start + event["t"] - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if "call" in event:
+            if event["call"] not in REPLAY_METHODS:
+                raise ValueError(f"Can't replay {event['call']!r}")
+            app.produce(event["call"], *event.get("args", []))
+        elif "press" in event:
+            asyncio.run_coroutine_threadsafe(pilot.press(event["press"]), loop).result()
+        elif "scroll" in event:
+            def scroll(fraction=event["scroll"]):
+                transcript.scroll_to(y=transcript.max_scroll_y * fraction, animate=False, immediate=True)
+            app.call_from_thread(scroll)
+
+
+async def bench_session_async(name: str, history: list, events: list, size: tuple[int, int]) -> None:
+    frame_times = []
+    with timed_frames(frame_times):
+        app = BenchApp(conversation_history=history)
+        async with app.run_test(size=size) as pilot:
+            await pilot.pause()
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            await asyncio.to_thread(replay_events, app, pilot, loop, events, start)
+            # Let the last updates reach the screen
+            await pilot.pause(0.1)
+            elapsed = time.perf_counter() - start
+            update_stats = app.update_stats
+            render_stats = app.render_service.stats
+    print(f"session {name}: events={len(events)} history={len(history)} time={elapsed:.2f}s")
+    print(f"  frame time: {percentiles(frame_times)}")
+    print(f"  flush time: {percentiles(app.flush_times)}")
+    print(f"  latency:    {percentiles(app.latencies)}")
+    print(f"  updates:    {update_stats}")
+    print(f"  render:     {render_stats}")
+    print(f"  peak RSS:   {peak_rss_mb():.0f}MB")
+
+
+def bench_session(session: str, size: tuple[int, int]) -> None:
+    """Replay a built-in session by name, or a recorded session file."""
+    if session in SESSIONS:
+        history, events = SESSIONS[session]()
+    else:
+        history, events = load_session(session)
+    asyncio.run(bench_session_async(os.path.basename(session), history, events, size))
+
+
+def bench_suite(size: tuple[int, int]) -> None:
+    """Run every built-in session in its own process."""
+    for session in SESSIONS:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "session", session, "--size", f"{size[0]}x{size[1]}"],
+            check=True,
+        )
+
+
+def terminal_size(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    streaming = subparsers.add_parser("streaming", help="stream a long Markdown reply")
+    streaming.add_argument("--size", type=int, default=50_000, help="reply size in characters")
+    streaming.add_argument("--chunk-size", type=int, default=4, help="characters per chunk (~1 token)")
+    streaming.add_argument("--naive-size", type=int, default=5_000,
+                           help="reply size for the full re-render baseline")
+
+    history = subparsers.add_parser("history", help="start the app with a long history")
+    history.add_argument("--messages", type=int, default=10_000, help="number of history messages")
+
+    session = subparsers.add_parser("session", help="replay a session against the app")
+    session.add_argument("session", help=f"built-in session ({', '.join(SESSIONS)}) or session file")
+    session.add_argument("--size", type=terminal_size, default=(120, 40), help="terminal size, e.g. 120x40")
+
+    suite = subparsers.add_parser("suite", help="replay every built-in session, one process each")
+    suite.add_argument("--size", type=terminal_size, default=(120, 40), help="terminal size, e.g. 120x40")
+
+    args = parser.parse_args()
+    if args.benchmark == "streaming":
+        bench_streaming(args.size, args.chunk_size, args.naive_size)
+    elif args.benchmark == "history":
+        bench_history(args.messages)
+    elif args.benchmark == "session":
+        bench_session(args.session, args.size)
+    elif args.benchmark == "suite":
+        bench_suite(args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from textual.widgets import RichLog
+
+# Log levels in increasing severity, as accepted by add_log
+LEVELS = ("debug", "info", "warning", "error")
+LEVEL_NUMBERS = {level: index for index, level in enumerate(LEVELS)}
+
+
+class LogRecord:
+    __slots__ = ("time", "level", "message")
+
+    def __init__(self, level: str, message: str):
+        self.time = time.time()
+        self.level = level
+        self.message = message
+
+
+class LogBuffer:
+    """Fixed-capacity ring buffer of log records.
+
+    Only the last `capacity` records are kept in memory, so logging stays
+    bounded however long a session runs. Evicted records are lost unless a
+    spill file is configured, in which case every record is also written to a
+    rotating log file as it is appended. Safe to append to from any thread;
+    TerminalApp.add_log appends when it is called, so rendering falling
+    behind never loses records.
+    """
+
+    def __init__(self, capacity: int = 5000, spill_path: str | None = None,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        """Initialize the buffer.
+
+        Args:
+            capacity: Number of records kept in memory
+            spill_path: Optional file that all records are appended to
+            max_bytes: Size at which the spill file is rotated
+            backup_count: Number of rotated spill files to keep
+        """
+        self.capacity = capacity
+        self._records: deque[LogRecord] = deque(maxlen=capacity)
+        self.total = 0  # Records ever appended
+        self._lock = threading.Lock()
+        self._spill = None
+        if spill_path:
+            self.set_spill_file(spill_path, max_bytes, backup_count)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def snapshot(self) -> list[LogRecord]:
+        """The records in memory, oldest first, copied under the lock so appends can't interrupt."""
+        with self._lock:
+            return list(self._records)
+
+    @property
+    def evicted(self) -> int:
+        """Records dropped from memory because the buffer was full."""
+        return self.total - len(self._records)
+
+    def set_spill_file(self, path: str | None, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3) -> None:
+        """Start spilling records to a rotating file, or stop if path is None."""
+        if self._spill is not None:
+            for handler in list(self._spill.handlers):
+                self._spill.removeHandler(handler)
+                handler.close()
+            self._spill = None
+        if path:
+            # A private logger that doesn't propagate to the root logger
+            spill = logging.Logger(f"agent-tui-log-spill:{path}")
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            spill.addHandler(handler)
+            self._spill = spill
+
+    def append(self, message: str, level: str = "info") -> LogRecord:
+        """Add a record, evicting the oldest one if the buffer is full."""
+        record = LogRecord(level, message)
+        with self._lock:
+            self._records.append(record)
+            self.total += 1
+            spill = self._spill
+        if spill is not None:
+            spill.log(logging.getLevelName(level.upper()), message)
+        return record
+
+
+class LogFilter:
+    """Minimum level and optional regex a record must match to be shown."""
+
+    def __init__(self, level: str = "debug", pattern: str | None = None):
+        if level not in LEVEL_NUMBERS:
+            raise ValueError(f"Unknown log level {level!r}, expected one of {', '.join(LEVELS)}")
+        self.level = level
+        self._min_level = LEVEL_NUMBERS[level]
+        self.pattern = pattern
+        self._regex = re.compile(pattern) if pattern else None
+
+    def matches(self, record: LogRecord) -> bool:
+        if LEVEL_NUMBERS.get(record.level, 0) < self._min_level:
+            return False
+        return self._regex is None or self._regex.search(record.message) is not None
+
+
+class LogPanel(RichLog):
+    """Log view over a LogBuffer.
+
+    Records always go into the buffer, but are only rendered while the panel
+    is shown: writes to a hidden panel just mark it stale, and showing it (or
+    changing the filter) re-renders the matching part of the buffer. Records
+    to show wait in a backlog, and render_backlog writes at most
+    max_lines_per_frame of them with a single scroll to the end, so a flood
+    of log lines is spread over several frames instead of stalling one.
+    """
+
+    def __init__(self, buffer: LogBuffer, *args, max_lines_per_frame: int = 200, **kwargs):
+        kwargs.setdefault("max_lines", buffer.capacity)
+        super().__init__(*args, **kwargs)
+        self.buffer = buffer
+        self.filter = LogFilter()
+        self.max_lines_per_frame = max_lines_per_frame
+        # Records waiting to be written; older ones than the panel can show are dropped
+        self._backlog: deque[LogRecord] = deque(maxlen=buffer.capacity)
+        self._shown = False
+        self._stale = False
+
+    @property
+    def shown(self) -> bool:
+        return self._shown
+
+    @property
+    def backlog(self) -> int:
+        """Number of records waiting to be written."""
+        return len(self._backlog)
+
+    def set_shown(self, shown: bool) -> None:
+        """Called when the log section is shown or hidden."""
+        self._shown = shown
+        if not shown and self._backlog:
+            # Written from the buffer when shown again
+            self._backlog.clear()
+            self._stale = True
+        if shown and self._stale:
+            self._rebuild()
+
+    def set_filter(self, log_filter: LogFilter) -> None:
+        """Show only the records matching log_filter."""
+        self.filter = log_filter
+        self._stale = True
+        if self._shown:
+            self._rebuild()
+
+    def write_records(self, records: list[LogRecord]) -> None:
+        """Queue newly buffered records for rendering, if the panel is visible."""
+        if not self._shown:
+            self._stale = True
+            return
+        self._backlog.extend(record for record in records if self.filter.matches(record))
+
+    def render_backlog(self) -> None:
+        """Write up to max_lines_per_frame waiting records, oldest first. Called once per frame."""
+        count = min(len(self._backlog), self.max_lines_per_frame)
+        if not count:
+            return
+        for _ in range(count):
+            self.write(self._backlog.popleft().message, scroll_end=False)
+        self.scroll_end(animate=False)
+
+    def _rebuild(self) -> None:
+        self._stale = False
+        self.clear()
+        self._backlog.clear()
+        self._backlog.extend(record for record in self.buffer.snapshot() if self.filter.matches(record))
@@ -0,0 +1,208 @@
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "shift", "priority", "left", "right")
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        # Pending offset for everything in this subtree, pushed down lazily
+        self.shift = 0
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+
+
+def _push(node: _Node) -> None:
+    """Apply a node's pending shift to itself and hand it down to its children."""
+    if node.shift:
+        node.start += node.shift
+        node.end += node.shift
+        if node.left is not None:
+            node.left.shift += node.shift
+        if node.right is not None:
+            node.right.shift += node.shift
+        node.shift = 0
+
+
+def _split(node, pos: int):
+    """Split a tree into ranges starting before pos and ranges starting at or after pos."""
+    if node is None:
+        return None, None
+    _push(node)
+    if node.start < pos:
+        node.right, right = _split(node.right, pos)
+        return node, right
+    left, node.left = _split(node.left, pos)
+    return left, node
+
+
+def _merge(left, right):
+    """Merge two trees where every range of left starts before every range of right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        _push(left)
+        left.right = _merge(left.right, right)
+        return left
+    _push(right)
+    right.left = _merge(left, right.left)
+    return right
+
+
+def _pop_last(node):
+    """Remove the last range of a tree. Returns (tree, removed node)."""
+    _push(node)
+    if node.right is None:
+        return node.left, node
+    node.right, last = _pop_last(node.right)
+    return node, last
+
+
+def _last(node):
+    while node is not None:
+        _push(node)
+        if node.right is None:
+            return node
+        node = node.right
+    return None
+
+
+def common_prefix_length(a: str, b: str, limit: int) -> int:
+    """Length of the common prefix of a and b, at most limit.
+
+    Binary search over slice comparisons, so the character comparisons run in C.
+    """
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        # a[:lo] == b[:lo] is already known, only compare the new part
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix of a and b, at most limit."""
+    lo, hi = 0, limit
+    len_a, len_b = len(a), len(b)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len_a - mid:len_a - lo] == b[len_b - mid:len_b - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def diff_edit(old: str, new: str) -> tuple[int, int, int] | None:
+    """Describe the change from old to new as a single edit.
+
+    Returns:
+        (position, removed, inserted): old[position:position + removed] was replaced
+        by inserted characters, or None if the strings are equal
+    """
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    prefix = common_prefix_length(old, new, limit)
+    suffix = common_suffix_length(old, new, limit - prefix)
+    return prefix, len(old) - prefix - suffix, len(new) - prefix - suffix
+
+
+class PathRanges:
+    """Non-overlapping [start, end) ranges of @path references in a text.
+
+    Ranges are kept in a treap ordered by start, where each node carries a
+    pending shift for its subtree. Shifting every range after an edit point is
+    one split, one lazy add and one merge, so adding, finding, removing and
+    adjusting for an edit are all O(log n) in the number of ranges.
+    """
+
+    def __init__(self, ranges=()):
+        self._root = None
+        self._count = 0
+        for start, end in ranges:
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        """Yield (start, end) tuples in order of start."""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                _push(node)
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.start, node.end
+            node = node.right
+
+    def __repr__(self) -> str:
+        return f"PathRanges({list(self)!r})"
+
+    def add(self, start: int, end: int) -> None:
+        """Record a range. It must not overlap an existing one."""
+        left, right = _split(self._root, start)
+        self._root = _merge(_merge(left, _Node(start, end)), right)
+        self._count += 1
+
+    def find(self, pos: int) -> tuple[int, int] | None:
+        """The range with start <= pos <= end (boundaries included), if any."""
+        node = self._root
+        found = None
+        while node is not None:
+            _push(node)
+            if node.start <= pos:
+                found = node
+                node = node.right
+            else:
+                node = node.left
+        if found is not None and pos <= found.end:
+            return found.start, found.end
+        return None
+
+    def shift_from(self, pos: int, delta: int) -> None:
+        """Move every range that starts at or after pos by delta."""
+        if not delta:
+            return
+        left, right = _split(self._root, pos)
+        if right is not None:
+            right.shift += delta
+        self._root = _merge(left, right)
+
+    def apply_edit(self, pos: int, removed: int, inserted: int) -> None:
+        """Update ranges for text[pos:pos + removed] being replaced by inserted characters.
+
+        Ranges touched by the edit (overlapping the removed text, or with text
+        inserted strictly inside them) no longer name a path and are dropped.
+        Ranges after the edit move by the change in length.
+        """
+        end = pos + removed
+        left, right = _split(self._root, pos)
+        # Ranges starting inside the removed text
+        middle, right = _split(right, end) if removed else (None, right)
+        dropped = self._size(middle)
+        # The range starting before pos may reach into the edit
+        last = _last(left)
+        if last is not None and last.end > pos:
+            left, _ = _pop_last(left)
+            dropped += 1
+        if right is not None and inserted != removed:
+            right.shift += inserted - removed
+        self._root = _merge(left, right)
+        self._count -= dropped
+
+    @staticmethod
+    def _size(node) -> int:
+        if node is None:
+            return 0
+        return 1 + PathRanges._size(node.left) + PathRanges._size(node.right)
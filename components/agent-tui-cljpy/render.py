@@ -0,0 +1,323 @@
+import re
+from collections import OrderedDict
+
+from textual.content import Content
+from rich.console import Console, RenderableType
+from rich.markdown import Markdown
+from rich.syntax import Syntax
+from rich.text import Text
+
+# Width used to lay out Rich renderables before converting them to Content
+DEFAULT_RENDER_WIDTH = 80
+# Pygments theme for code blocks, both Clojure code and fences inside Markdown
+DEFAULT_CODE_THEME = "monokai"
+
+# Opening/closing line of a fenced code block (``` or ~~~, up to 3 spaces indent)
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+
+def renderable_to_content(renderable: RenderableType, console: Console, width: int = DEFAULT_RENDER_WIDTH) -> Content:
+    """Render a Rich renderable (Markdown, Syntax, ...) into Textual Content.
+
+    Content.from_rich_text only understands rich.text.Text, so the renderable is
+    laid out with the console first and the resulting segments are collected into
+    a Text, one line per rendered line.
+
+    Args:
+        renderable: Any Rich renderable
+        console: Console used for layout and style resolution
+        width: Width to lay the renderable out at
+
+    Returns:
+        Content with the rendered text and styles
+    """
+    options = console.options.update_width(width)
+    lines = console.render_lines(renderable, options, pad=False)
+
+    # Drop empty leading/trailing lines so consecutive blocks can be joined predictably
+    while lines and not "".join(segment.text for segment in lines[-1]):
+        lines.pop()
+    while lines and not "".join(segment.text for segment in lines[0]):
+        lines.pop(0)
+
+    text = Text(end="")
+    for index, line in enumerate(lines):
+        line_text = Text(end="")
+        for segment in line:
+            if not segment.control:
+                line_text.append(segment.text, segment.style)
+        line_text.rstrip()
+        if index:
+            text.append("\n")
+        text.append_text(line_text)
+    return Content.from_rich_text(text, console)
+
+
+def markdown_to_content(markdown_text: str, console: Console, width: int = DEFAULT_RENDER_WIDTH,
+                        code_theme: str = DEFAULT_CODE_THEME) -> Content:
+    """Render Markdown source into Textual Content, falling back to plain text."""
+    try:
+        return renderable_to_content(Markdown(markdown_text, code_theme=code_theme), console, width)
+    except Exception:
+        return Content.from_text(markdown_text, markup=False)
+
+
+def code_to_content(code: str, console: Console, width: int = DEFAULT_RENDER_WIDTH,
+                    code_theme: str = DEFAULT_CODE_THEME, lexer: str = "clojure") -> Content:
+    """Syntax highlight code into Textual Content, falling back to plain text."""
+    try:
+        syntax = Syntax(code, lexer, theme=code_theme, line_numbers=False, word_wrap=True)
+        return renderable_to_content(syntax, console, width)
+    except Exception:
+        return Content.from_text(code, markup=False)
+
+
+class RenderService:
+    """Shared renderer turning message text into Textual Content.
+
+    Rendering Markdown or highlighting code with Pygments is by far the most
+    expensive part of showing a message, and the transcript mounts the same
+    messages again whenever they scroll back into view. The service keeps one
+    Console per width and an LRU cache of rendered Content keyed by
+    (kind, text, width, code theme), so re-showing a message at a width it was
+    already rendered at is a dictionary lookup.
+
+    Kinds:
+        markdown: Markdown source
+        code: Clojure source, syntax highlighted
+        plain: Text shown as is
+    """
+
+    CACHE_SIZE = 512
+
+    def __init__(self, width: int = DEFAULT_RENDER_WIDTH, code_theme: str = DEFAULT_CODE_THEME,
+                 cache_size: int = CACHE_SIZE):
+        """Initialize the service.
+
+        Args:
+            width: Width new messages are rendered at until their real width is
+                   known; kept up to date by the message widgets
+            code_theme: Pygments theme for code
+            cache_size: Maximum number of rendered Contents to keep
+        """
+        self.width = width
+        self.code_theme = code_theme
+        self.cache_size = cache_size
+        self._consoles: dict[int, Console] = {}
+        self._cache: OrderedDict[tuple, Content] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict:
+        """Cache counters."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)}
+
+    def console(self, width: int) -> Console:
+        """The Console used to lay out renderables at the given width."""
+        console = self._consoles.get(width)
+        if console is None:
+            console = Console(width=width, legacy_windows=False)
+            self._consoles[width] = console
+        return console
+
+    def clear(self) -> None:
+        """Drop all cached Content, e.g. after the code theme changed."""
+        self._cache.clear()
+
+    def render(self, kind: str, text: str, width: int | None = None) -> Content:
+        """Rendered Content for text of the given kind, from the cache if possible.
+
+        Args:
+            kind: One of markdown, code or plain
+            text: Source text
+            width: Width to render at; defaults to the service width
+
+        Returns:
+            Rendered Content
+        """
+        width = max(1, width or self.width)
+        # The str caches its own hash, so long texts are only hashed once
+        key = (kind, text, width, self.code_theme)
+        content = self._cache.get(key)
+        if content is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return content
+        self.misses += 1
+        content = self.render_uncached(kind, text, width)
+        self._cache[key] = content
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return content
+
+    def render_uncached(self, kind: str, text: str, width: int | None = None) -> Content:
+        """Render without touching the cache, for text that is about to change."""
+        width = max(1, width or self.width)
+        if kind == "markdown":
+            return markdown_to_content(text, self.console(width), width, self.code_theme)
+        if kind == "code":
+            return code_to_content(text, self.console(width), width, self.code_theme)
+        return Content.from_text(text, markup=False)
+
+
+class StreamingMarkdown:
+    """Incremental renderer for a Markdown message that arrives in chunks.
+
+    Re-rendering the whole message on every chunk is quadratic in its length.
+    Instead the text is split into top-level blocks: once a blank line outside
+    a fenced code block is seen, everything before it is finished, rendered once
+    and cached as Content. Only the trailing, still-open block is re-parsed
+    when a new chunk arrives, so the per-chunk cost depends on the size of that
+    block rather than on the size of the message. Finished blocks go through
+    the RenderService cache, the open block does not.
+    """
+
+    # Separator placed between finished blocks (Rich puts one blank line between blocks)
+    BLOCK_SEPARATOR = "\n\n"
+
+    def __init__(self, render_service: RenderService | None = None, width: int | None = None):
+        self._render_service = render_service or RenderService()
+        self._width = width or self._render_service.width
+        self.reset()
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    def set_width(self, width: int) -> None:
+        """Re-render the message at a new width."""
+        if width == self._width:
+            return
+        self._width = width
+        committed = Content("")
+        for block in self._committed_parts:
+            if block.strip():
+                rendered = self._render_block(block)
+                committed = committed + self.BLOCK_SEPARATOR + rendered if committed else rendered
+        self._committed = committed
+        self._tail = self._render(self._pending)
+
+    def reset(self) -> None:
+        """Forget all text and cached blocks."""
+        # Source of the finished blocks, kept only to reconstruct the full text
+        self._committed_parts: list[str] = []
+        # Rendered finished blocks, concatenated once per committed block
+        self._committed = Content("")
+        # Text after the last finished block (the open block)
+        self._pending = ""
+        # Offset in _pending of the first line not yet scanned for block boundaries
+        self._scan_pos = 0
+        # Opening marker of the fenced code block we are inside of, if any
+        self._fence: str | None = None
+        # Offset in _pending just past the last blank line outside a fence
+        self._boundary = 0
+        self._tail = Content("")
+
+    @property
+    def text(self) -> str:
+        """The full Markdown source received so far."""
+        return "".join(self._committed_parts) + self._pending
+
+    @property
+    def block_count(self) -> int:
+        """Number of finished blocks that are cached as rendered Content."""
+        return len(self._committed_parts)
+
+    @property
+    def committed(self) -> Content:
+        """Rendered Content of the finished blocks."""
+        return self._committed
+
+    @property
+    def tail(self) -> Content:
+        """Rendered Content of the open block."""
+        return self._tail
+
+    @property
+    def content(self) -> Content:
+        """Rendered Content of the whole message.
+
+        This concatenates the cached blocks, so streaming consumers should show
+        `committed` and `tail` separately instead of calling it per chunk.
+        """
+        if not self._committed:
+            return self._tail
+        if not self._tail:
+            return self._committed
+        return self._committed + self.BLOCK_SEPARATOR + self._tail
+
+    def append(self, chunk: str) -> None:
+        """Append a chunk of Markdown, re-rendering only the open block."""
+        if chunk:
+            self._pending += chunk
+            self._scan()
+            self._commit(self._boundary)
+            self._tail = self._render(self._pending)
+
+    def set_text(self, text: str) -> None:
+        """Replace the message text.
+
+        When the new text extends the current one (the usual case for snapshot
+        style streams), only the new suffix is processed.
+        """
+        current = self.text
+        if text.startswith(current):
+            self.append(text[len(current):])
+        else:
+            self.reset()
+            self.append(text)
+
+    def finish(self) -> None:
+        """Mark the message as complete, caching the last block as well."""
+        self._commit(len(self._pending))
+        self._tail = Content("")
+
+    def _scan(self) -> None:
+        """Scan complete lines of the open block for fences and blank lines."""
+        pending = self._pending
+        pos = self._scan_pos
+        while True:
+            newline = pending.find("\n", pos)
+            if newline == -1:
+                break
+            line = pending[pos:newline]
+            fence_match = _FENCE_RE.match(line)
+            if self._fence is not None:
+                # Inside a fence only a matching closing marker ends it
+                if fence_match and fence_match.group(1)[0] == self._fence[0] \
+                        and len(fence_match.group(1)) >= len(self._fence) \
+                        and not line[fence_match.end():].strip():
+                    self._fence = None
+            elif fence_match:
+                self._fence = fence_match.group(1)
+            elif not line.strip():
+                self._boundary = newline + 1
+            pos = newline + 1
+        self._scan_pos = pos
+
+    def _commit(self, end: int) -> None:
+        """Render _pending[:end] as finished blocks and drop it from the open block."""
+        if end <= 0:
+            return
+        block = self._pending[:end]
+        self._pending = self._pending[end:]
+        self._scan_pos = max(0, self._scan_pos - end)
+        self._boundary = 0
+        self._committed_parts.append(block)
+        if not block.strip():
+            return
+        rendered = self._render_block(block)
+        if self._committed:
+            self._committed = self._committed + self.BLOCK_SEPARATOR + rendered
+        else:
+            self._committed = rendered
+
+    def _render(self, markdown_text: str) -> Content:
+        """Render the open block, which changes with every chunk and is not cached."""
+        if not markdown_text.strip():
+            return Content("")
+        return self._render_service.render_uncached("markdown", markdown_text, self._width)
+
+    def _render_block(self, markdown_text: str) -> Content:
+        return self._render_service.render("markdown", markdown_text, self._width)
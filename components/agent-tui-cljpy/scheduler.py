@@ -0,0 +1,166 @@
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+try:
+    from baml_py import AbortController
+except ImportError:  # The TUI also runs without the BAML client installed
+    AbortController = None
+
+# Upper bound for the concurrency limit, i.e. the size of the thread pool
+MAX_WORKERS = 32
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ABORTED = "aborted"
+
+
+class HandlerJob:
+    """One submitted handler call."""
+
+    def __init__(self, job_id: int, fn: Callable, args: tuple):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.status = QUEUED
+        self.error: BaseException | None = None
+        # Passed to BAML calls as baml_options={"abort_controller": ...}
+        self.abort_controller = AbortController() if AbortController is not None else None
+        self._aborted = threading.Event()
+
+    @property
+    def aborted(self) -> bool:
+        return self._aborted.is_set()
+
+    def __repr__(self) -> str:
+        return f"HandlerJob(id={self.id}, status={self.status})"
+
+
+class HandlerScheduler:
+    """Runs handler calls on worker threads with a concurrency limit.
+
+    Jobs beyond the limit wait in a FIFO queue whose depth is visible through
+    `queue_depth`. Every job carries a BAML AbortController: aborting a running
+    job aborts the controller, which makes an in-flight BAML request (or stream)
+    raise right away and frees the worker, instead of waiting for the response.
+    Aborting a queued job just removes it from the queue.
+
+    `on_change(scheduler, job)` is called whenever a job changes status, from
+    whichever thread made the change.
+    """
+
+    def __init__(self, max_concurrency: int = 1, on_change: Callable | None = None,
+                 thread_name_prefix: str = "clojure-handler"):
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._queue: deque[HandlerJob] = deque()
+        self._running: dict[int, HandlerJob] = {}
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._max_concurrency = 1
+        self.on_change = on_change
+        self.max_concurrency = max_concurrency
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    @max_concurrency.setter
+    def max_concurrency(self, value: int) -> None:
+        if not 1 <= value <= MAX_WORKERS:
+            raise ValueError(f"max_concurrency must be between 1 and {MAX_WORKERS}, got {value}")
+        with self._lock:
+            self._max_concurrency = value
+            started = self._start_queued()
+        self._notify(started)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        return len(self._queue)
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def current_job(self) -> HandlerJob | None:
+        """The job running on the calling thread, if any."""
+        return getattr(self._local, "job", None)
+
+    def submit(self, fn: Callable, *args) -> HandlerJob:
+        """Queue fn(*args), starting it right away if a worker is free."""
+        job = HandlerJob(next(self._ids), fn, args)
+        with self._lock:
+            self._queue.append(job)
+            started = self._start_queued()
+        self._notify(started if job in started else [job] + started)
+        return job
+
+    def abort(self, job: HandlerJob | None = None) -> list[HandlerJob]:
+        """Abort one job, or every queued and running job if job is None.
+
+        Returns:
+            The jobs that were aborted
+        """
+        with self._lock:
+            if job is None:
+                jobs = list(self._queue) + list(self._running.values())
+            elif job.status in (QUEUED, RUNNING):
+                jobs = [job]
+            else:
+                jobs = []
+            dequeued = []
+            for aborted_job in jobs:
+                aborted_job._aborted.set()
+                if aborted_job.status == QUEUED:
+                    self._queue.remove(aborted_job)
+                    aborted_job.status = ABORTED
+                    dequeued.append(aborted_job)
+                elif aborted_job.abort_controller is not None:
+                    aborted_job.abort_controller.abort()
+        # Running jobs report ABORTED once their worker returns
+        self._notify(dequeued)
+        return jobs
+
+    def shutdown(self) -> None:
+        """Abort everything and stop the worker threads without waiting for them."""
+        self.abort()
+        self._executor.shutdown(wait=False)
+
+    def _start_queued(self) -> list[HandlerJob]:
+        """Start queued jobs while workers are free. Called with the lock held."""
+        started = []
+        while self._queue and len(self._running) < self._max_concurrency:
+            job = self._queue.popleft()
+            job.status = RUNNING
+            self._running[job.id] = job
+            self._executor.submit(self._run, job)
+            started.append(job)
+        return started
+
+    def _run(self, job: HandlerJob) -> None:
+        self._local.job = job
+        try:
+            job.fn(*job.args)
+            status = DONE
+        except BaseException as error:
+            # An abort surfaces as whatever the handler raised (BamlAbortError, ...)
+            job.error = error
+            status = FAILED
+        finally:
+            self._local.job = None
+        with self._lock:
+            job.status = ABORTED if job.aborted else status
+            del self._running[job.id]
+            started = self._start_queued()
+        self._notify([job])
+        self._notify(started)
+
+    def _notify(self, jobs: list[HandlerJob]) -> None:
+        if self.on_change is not None:
+            for job in jobs:
+                self.on_change(self, job)
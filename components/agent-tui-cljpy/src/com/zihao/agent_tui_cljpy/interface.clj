@@ -48,5 +48,17 @@
 (defn set-streaming-output [app-instance text]
   (tui/set-streaming-output app-instance text))
 
-(defn add-log [app-instance message]
-  (tui/add-log app-instance message))
+(defn add-log
+  ([app-instance message]
+   (tui/add-log app-instance message))
+  ([app-instance message level]
+   (tui/add-log app-instance message level)))
+
+(defn current-abort-controller [app-instance]
+  (tui/current-abort-controller app-instance))
+
+(defn abort-handlers [app-instance]
+  (tui/abort-handlers app-instance))
+
+(defn set-log-filter [app-instance level pattern]
+  (tui/set-log-filter app-instance level pattern))
@@ -18,7 +18,7 @@
         sys (py/import-module "sys")
         modules (py/py.- sys "modules")
         ;; Reload the app module and related modules in reverse dependency order
-        modules-to-reload (reverse ["app"])]
+        modules-to-reload (reverse ["app" "log_panel" "path_ranges" "render" "scheduler" "transcript" "updates"])]
     (doseq [module-name modules-to-reload]
       (when (get modules module-name)
         (py. importlib "reload" (get modules module-name))))))
@@ -57,8 +57,26 @@
 (defn set-streaming-output [app-instance text]
   (py. app-instance "set_streaming_output" text))
 
-(defn add-log [app-instance message]
-  (py. app-instance "add_log" message))
+(defn add-log
+  "Add a log message. level is one of \"debug\" \"info\" \"warning\" \"error\"."
+  ([app-instance message]
+   (py. app-instance "add_log" message))
+  ([app-instance message level]
+   (py. app-instance "add_log" message level)))
+
+(defn set-log-filter
+  "Only show log messages at or above level whose text matches the regex pattern (nil for all)."
+  [app-instance level pattern]
+  (py. app-instance "set_log_filter" level pattern))
+
+(defn current-abort-controller
+  "BAML AbortController of the handler call running on the current thread, or nil.
+   Pass it as baml_options {\"abort_controller\" ...} so ctrl+g cancels the request."
+  [app-instance]
+  (py. app-instance "current_abort_controller"))
+
+(defn abort-handlers [app-instance]
+  (py. app-instance "abort_handlers"))
 
 (defn handle-input
   [{:keys [bt st-memory-init]} this message]
@@ -87,11 +105,13 @@
 (defn tui
   "return: the app instance"
   [terminal-app
-   {:keys [handler-fn conversation-history query-candidates-fn] :or {conversation-history []}}]
+   {:keys [handler-fn conversation-history query-candidates-fn max-concurrency]
+    :or {conversation-history [] max-concurrency 1}}]
   (let [terminal-app (terminal-app
                       :clojure_handler handler-fn
                       :conversation_history conversation-history
-                      :query_candidates_fn query-candidates-fn)]
+                      :query_candidates_fn query-candidates-fn
+                      :max_concurrency max-concurrency)]
     terminal-app))
 
 (defn set-handler [tui handler-fn]
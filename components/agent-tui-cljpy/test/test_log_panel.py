@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+from textual.app import App
+
+from log_panel import LogBuffer, LogFilter, LogPanel
+
+
+def test_buffer_keeps_the_last_records():
+    buffer = LogBuffer(capacity=3)
+    for i in range(5):
+        buffer.append(f"line {i}")
+    assert [record.message for record in buffer] == ["line 2", "line 3", "line 4"]
+    assert (buffer.total, buffer.evicted) == (5, 2)
+
+
+def test_spill_file_gets_every_record(tmp_path):
+    path = tmp_path / "agent.log"
+    buffer = LogBuffer(capacity=2, spill_path=str(path))
+    for i in range(10):
+        buffer.append(f"line {i}", "warning" if i % 2 else "info")
+    buffer.set_spill_file(None)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [line.split(" ", 3)[-1] for line in lines] == [f"line {i}" for i in range(10)]
+    assert " WARNING line 1" in lines[1]
+
+
+def test_buffer_counts_appends_from_many_threads():
+    buffer = LogBuffer(capacity=100)
+
+    def produce():
+        for i in range(2000):
+            buffer.append(f"line {i}")
+
+    threads = [threading.Thread(target=produce) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert buffer.total == 16000 and len(buffer) == 100
+
+
+def test_snapshot_while_another_thread_appends():
+    buffer = LogBuffer(capacity=1000)
+    done = threading.Event()
+
+    def produce():
+        i = 0
+        while not done.is_set():
+            buffer.append(f"line {i}")
+            i += 1
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    try:
+        for _ in range(2000):
+            assert len([record for record in buffer.snapshot()]) <= 1000
+            assert sum(1 for _ in buffer) <= 1000
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_filter_by_level_and_pattern():
+    buffer = LogBuffer()
+    debug, error = buffer.append("tool call", "debug"), buffer.append("tool failed", "error")
+    assert LogFilter("info").matches(error) and not LogFilter("info").matches(debug)
+    assert LogFilter(pattern="call").matches(debug) and not LogFilter(pattern="call").matches(error)
+
+
+class PanelApp(App):
+    def __init__(self, buffer):
+        super().__init__()
+        self.buffer = buffer
+
+    def compose(self):
+        yield LogPanel(self.buffer, max_lines_per_frame=100)
+
+
+def run_panel(buffer, test):
+    async def run():
+        app = PanelApp(buffer)
+        async with app.run_test():
+            test(app.query_one(LogPanel))
+    asyncio.run(run())
+
+
+def test_panel_renders_a_frame_worth_at_a_time():
+    buffer = LogBuffer(capacity=1000)
+
+    def test(panel):
+        panel.set_shown(True)
+        panel.write_records([buffer.append(f"line {i}") for i in range(250)])
+        assert panel.backlog == 250
+        panel.render_backlog()
+        assert (panel.backlog, len(panel.lines)) == (150, 100)
+        panel.render_backlog()
+        panel.render_backlog()
+        assert (panel.backlog, len(panel.lines)) == (0, 250)
+
+    run_panel(buffer, test)
+
+
+def test_hidden_panel_renders_from_the_buffer_when_shown():
+    buffer = LogBuffer(capacity=1000)
+
+    def test(panel):
+        panel.write_records([buffer.append(f"line {i}", "debug" if i % 2 else "info") for i in range(50)])
+        assert panel.backlog == 0
+        panel.set_filter(LogFilter("info"))
+        panel.set_shown(True)
+        assert panel.backlog == 25
+        panel.render_backlog()
+        assert len(panel.lines) == 25
+
+    run_panel(buffer, test)
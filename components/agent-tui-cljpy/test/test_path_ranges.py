@@ -0,0 +1,104 @@
+from hypothesis import given, settings, strategies as st
+from hypothesis.stateful import RuleBasedStateMachine, invariant, precondition, rule
+
+from path_ranges import PathRanges, diff_edit
+
+
+class ListPathRanges:
+    """The sorted list of ranges CustomInput kept before PathRanges, as a reference.
+
+    add, find and shift_from are the old list operations. apply_edit drops every
+    range the edit touches, which the old code only did for some edits (see
+    PathRanges.apply_edit).
+    """
+
+    def __init__(self):
+        self.ranges = []
+
+    def add(self, start, end):
+        self.ranges.append((start, end))
+        self.ranges.sort(key=lambda x: x[0])
+
+    def find(self, pos):
+        for start, end in reversed(self.ranges):
+            if start <= pos <= end:
+                return start, end
+        return None
+
+    def shift_from(self, pos, delta):
+        self.ranges = [(start + delta, end + delta) if start >= pos else (start, end)
+                       for start, end in self.ranges]
+
+    def apply_edit(self, pos, removed, inserted):
+        kept = []
+        for start, end in self.ranges:
+            if start < pos < end or (removed and pos <= start < pos + removed):
+                continue
+            if start >= pos + removed:
+                start, end = start + inserted - removed, end + inserted - removed
+            kept.append((start, end))
+        self.ranges = kept
+
+
+positions = st.integers(min_value=0, max_value=200)
+lengths = st.integers(min_value=0, max_value=20)
+
+
+class PathRangesMachine(RuleBasedStateMachine):
+    def __init__(self):
+        super().__init__()
+        self.ranges = PathRanges()
+        self.reference = ListPathRanges()
+
+    @rule(start=positions, length=st.integers(min_value=1, max_value=20))
+    def add(self, start, length):
+        end = start + length
+        # Ranges never overlap, but may touch ("@a @b")
+        if any(start < other_end and other_start < end for other_start, other_end in self.reference.ranges):
+            return
+        self.ranges.add(start, end)
+        self.reference.add(start, end)
+
+    @rule(pos=positions)
+    def find(self, pos):
+        assert self.ranges.find(pos) == self.reference.find(pos)
+
+    @rule(pos=positions, delta=st.integers(min_value=0, max_value=20))
+    def shift_from(self, pos, delta):
+        self.ranges.shift_from(pos, delta)
+        self.reference.shift_from(pos, delta)
+
+    @rule(pos=positions, removed=lengths, inserted=lengths)
+    def apply_edit(self, pos, removed, inserted):
+        self.ranges.apply_edit(pos, removed, inserted)
+        self.reference.apply_edit(pos, removed, inserted)
+
+    @precondition(lambda self: self.reference.ranges)
+    @rule(data=st.data())
+    def delete_path(self, data):
+        # Smart backspace: remove a whole range and shift the ones after it
+        start, end = data.draw(st.sampled_from(self.reference.ranges))
+        self.ranges.apply_edit(start, end - start, 0)
+        self.reference.apply_edit(start, end - start, 0)
+
+    @invariant()
+    def same_ranges(self):
+        assert list(self.ranges) == self.reference.ranges
+        assert len(self.ranges) == len(self.reference.ranges)
+
+
+TestPathRanges = PathRangesMachine.TestCase
+TestPathRanges.settings = settings(max_examples=300, stateful_step_count=40)
+
+
+@given(st.text(alphabet="ab @/", max_size=30), st.text(alphabet="ab @/", max_size=30))
+def test_diff_edit_describes_the_change(old, new):
+    edit = diff_edit(old, new)
+    if edit is None:
+        assert old == new
+        return
+    pos, removed, inserted = edit
+    assert old[:pos] + new[pos:pos + inserted] + old[pos + removed:] == new
+    # The edit is as small as the common prefix and suffix allow
+    assert removed == 0 or inserted == 0 or old[pos] != new[pos]
+    assert removed == 0 or inserted == 0 or old[pos + removed - 1] != new[pos + inserted - 1]
@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+from app import TerminalApp
+from scheduler import ABORTED
+from transcript import ChatTranscript
+
+
+def run_app(test):
+    async def run():
+        app = TerminalApp()
+        async with app.run_test(size=(80, 24)) as pilot:
+            await test(app, app.query_one("#chat-scroll", ChatTranscript), pilot)
+    asyncio.run(run())
+
+
+async def scroll_out_and_back(app, transcript, pilot, index):
+    """Push a message out of the mounted window with more messages, then scroll back to it."""
+    for i in range(60):
+        app._show_user_output(f"message {i}")
+    transcript.scroll_end(animate=False)
+    await pilot.pause()
+    assert transcript.widget_for(index) is None
+    transcript.scroll_home(animate=False)
+    await pilot.pause()
+    assert transcript.widget_for(index) is not None
+
+
+def test_abandoned_stream_keeps_its_text_when_scrolled_back():
+    async def test(app, transcript, pilot):
+        app._show_stream_start(None)
+        app._show_stream_append("an unfinished reply")
+        index = app._streaming_index
+        # A new stream starts without finish_streaming_output for the first one
+        app._show_stream_start(None)
+        await scroll_out_and_back(app, transcript, pilot, index)
+        assert transcript.store.get(index) == ("assistant", "an unfinished reply")
+
+    run_app(test)
+
+
+def test_aborted_stream_keeps_its_text_when_scrolled_back():
+    async def test(app, transcript, pilot):
+        app._show_stream_start(None)
+        app._show_stream_append("a reply cut short")
+        index = app._streaming_index
+        app._on_handler_change(app._scheduler, SimpleNamespace(id=1, status=ABORTED))
+        app._flush_updates()
+        assert app._streaming_index is None
+        await scroll_out_and_back(app, transcript, pilot, index)
+        assert transcript.store.get(index) == ("assistant", "a reply cut short")
+
+    run_app(test)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+from app import TerminalApp
+from updates import UIUpdateQueue
+
+
+def drained(*updates, max_droppable=1000):
+    queue = UIUpdateQueue(max_droppable=max_droppable)
+    for kind, payload in updates:
+        queue.push(kind, payload)
+    return queue.drain(), queue
+
+
+def test_runs_of_the_same_kind_are_merged():
+    merged, queue = drained(
+        ("stream_append", "a"), ("stream_append", "b"),
+        ("log", 1), ("log", 2),
+        ("spinner", True), ("spinner", False),
+        ("stream_append", "c"),
+    )
+    assert merged == [("stream_append", "ab"), ("log", [1, 2]), ("spinner", False), ("stream_append", "c")]
+    assert queue.stats == {"queued": 7, "coalesced": 3, "dropped": 0, "pending": 0}
+
+
+def test_other_kinds_are_neither_merged_nor_reordered():
+    updates = [("user", "hi"), ("user", "there"), ("stream_start", None), ("assistant", "ok")]
+    merged, _ = drained(*updates)
+    assert merged == updates
+
+
+def test_oldest_droppable_updates_are_dropped():
+    merged, queue = drained(("log", 1), ("user", "x"), ("log", 2), ("log", 3), ("log", 4), max_droppable=2)
+    assert merged == [("user", "x"), ("log", [3, 4])]
+    assert queue.dropped == 2
+
+
+def test_drain_takes_only_what_is_queued():
+    queue = UIUpdateQueue()
+    assert queue.drain() == []
+    queue.push("plain", "a")
+    assert queue.drain() == [("plain", "a")]
+    queue.push("plain", "b")
+    assert queue.drain() == [("plain", "b")]
+    assert queue.stats["queued"] == 2
+
+
+def test_concurrent_producers_lose_nothing():
+    queue = UIUpdateQueue(max_droppable=10 ** 6)
+
+    def produce(n):
+        for i in range(1000):
+            queue.push("log", (n, i))
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    [(kind, payload)] = queue.drain()
+    assert kind == "log" and len(payload) == 8000
+    for n in range(8):
+        assert [i for m, i in payload if m == n] == list(range(1000))
+
+
+def test_dropped_log_lines_stay_in_the_buffer():
+    app = TerminalApp(log_capacity=100)
+    app._updates.max_droppable = 10
+    for i in range(50):
+        app.add_log(f"line {i}")
+    [(kind, records)] = app._updates.drain()
+    assert len(records) == 10 and app._updates.dropped == 40
+    assert [record.message for record in app.log_buffer] == [f"line {i}" for i in range(50)]
+
+
+def test_updates_from_a_handler_event_loop_wait_for_the_frame():
+    app = TerminalApp()
+    app._ui_thread = threading.get_ident()
+
+    async def handler():
+        app.add_log("from a handler's own event loop")
+
+    thread = threading.Thread(target=asyncio.run, args=(handler(),))
+    thread.start()
+    thread.join()
+    # Queued for the next frame instead of flushed onto widgets from the handler thread
+    assert len(app._updates) == 1
+
+
+def test_handlers_see_the_abort_controller_of_their_own_job():
+    app = TerminalApp(max_concurrency=2)
+    seen = {}
+
+    def handler(app_self, message):
+        seen[message] = app_self.current_abort_controller()
+
+    try:
+        jobs = {message: app._scheduler.submit(handler, app, message) for message in ("a", "b")}
+        deadline = time.monotonic() + 5
+        while len(seen) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        app._scheduler.shutdown()
+    assert seen["a"] is jobs["a"].abort_controller and seen["b"] is jobs["b"].abort_controller
+    assert seen["a"] is not None and seen["a"] is not seen["b"]
+    assert app.current_abort_controller() is None
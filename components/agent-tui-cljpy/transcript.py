@@ -0,0 +1,236 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable
+
+from textual.containers import VerticalScroll
+from textual.widget import Widget
+from textual.widgets import Static
+
+# Rows between two messages (the overlapping vertical margin of `.message`)
+MESSAGE_SPACING = 1
+# Columns taken by the message border and padding, used for height estimates
+MESSAGE_GUTTER = 4
+
+
+class MessageStore:
+    """Compact store of chat messages.
+
+    Messages are kept as (kind, text) in parallel lists, plus an array of
+    heights in rows (0 while the message has never been laid out). Only the
+    transcript window is ever turned into widgets.
+    """
+
+    def __init__(self):
+        self._kinds: list[str] = []
+        self._texts: list[str] = []
+        self._heights = array("i")
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def append(self, kind: str, text: str) -> int:
+        """Add a message and return its index."""
+        self._kinds.append(kind)
+        self._texts.append(text)
+        self._heights.append(0)
+        return len(self._kinds) - 1
+
+    def get(self, index: int) -> tuple[str, str]:
+        return self._kinds[index], self._texts[index]
+
+    def set_text(self, index: int, text: str) -> None:
+        self._texts[index] = text
+
+    def measured_height(self, index: int) -> int:
+        """Height measured when the message was last mounted, or 0."""
+        return self._heights[index]
+
+    def set_height(self, index: int, height: int) -> None:
+        self._heights[index] = height
+
+    def height(self, index: int, width: int) -> int:
+        """Measured height of a message, or an estimate if it was never mounted."""
+        height = self._heights[index]
+        if height:
+            return height
+        text = self._texts[index]
+        # One row per line plus the rows needed to wrap long lines, roughly
+        width = max(1, width - MESSAGE_GUTTER)
+        return text.count("\n") + 1 + len(text) // width + MESSAGE_SPACING
+
+
+class ChatTranscript(VerticalScroll):
+    """Virtualized chat transcript.
+
+    All messages live in a MessageStore; only the ones in the viewport plus
+    OVERSCAN messages on either side are mounted as widgets. Two spacers above
+    and below the mounted window stand in for the rest of the history, sized
+    from measured heights (or estimates for messages never shown), so the
+    scrollbar still covers the whole conversation. The window follows the
+    scroll position, and mounted messages are regular widgets, so text
+    selection works as usual.
+    """
+
+    # Messages mounted beyond each edge of the viewport
+    OVERSCAN = 5
+
+    def __init__(self, widget_factory: Callable[[int, str, str], Widget], *args, **kwargs):
+        """Initialize the transcript.
+
+        Args:
+            widget_factory: Function (index, kind, text) -> Widget that builds the
+                            widget for a stored message when it scrolls into view
+        """
+        super().__init__(*args, **kwargs)
+        self.store = MessageStore()
+        self._widget_factory = widget_factory
+        self._mounted: dict[int, Widget] = {}
+        self._window = (0, 0)
+        self._top_spacer = Static(classes="transcript-spacer")
+        self._bottom_spacer = Static(classes="transcript-spacer")
+        self._offsets: list[int] | None = None
+        self._offsets_width = 0
+        self._update_scheduled = False
+        # Keep the end of the conversation in view while scrolled to the bottom
+        self._follow = True
+
+    def compose(self):
+        yield self._top_spacer
+        yield self._bottom_spacer
+
+    @property
+    def mounted_count(self) -> int:
+        """Number of messages currently mounted as widgets."""
+        return len(self._mounted)
+
+    def append(self, kind: str, text: str) -> int:
+        """Add a message to the end of the conversation and return its index."""
+        index = self.store.append(kind, text)
+        self._offsets = None
+        self._schedule_update()
+        return index
+
+    def extend(self, messages) -> None:
+        """Add many (kind, text) messages at once, e.g. a loaded history."""
+        for kind, text in messages:
+            self.store.append(kind, text)
+        self._offsets = None
+        self._schedule_update()
+
+    def set_text(self, index: int, text: str) -> None:
+        """Replace the stored text of a message (the mounted widget is left as is)."""
+        self.store.set_text(index, text)
+
+    def widget_for(self, index: int) -> Widget | None:
+        """The mounted widget for a message, or None if it is off-screen."""
+        return self._mounted.get(index)
+
+    def refresh_message(self, index: int) -> None:
+        """Note that a mounted message changed size, e.g. while streaming."""
+        if index in self._mounted:
+            self._schedule_update()
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self._follow = new_value >= self.max_scroll_y - 1
+        self._schedule_update()
+
+    def on_resize(self) -> None:
+        self._offsets = None
+        self._schedule_update()
+
+    def _schedule_update(self) -> None:
+        if not self._update_scheduled:
+            self._update_scheduled = True
+            self.call_after_refresh(self._update_window)
+
+    def _width(self) -> int:
+        return self.scrollable_content_region.width or self.app.size.width
+
+    def _viewport_height(self) -> int:
+        return self.scrollable_content_region.height or self.app.size.height
+
+    def _get_offsets(self) -> list[int]:
+        """Row offset of every message from the top of the conversation, plus the total."""
+        width = self._width()
+        if self._offsets is None or self._offsets_width != width:
+            store = self.store
+            heights = (store.height(index, width) for index in range(len(store)))
+            self._offsets = list(accumulate(heights, initial=0))
+            self._offsets_width = width
+        return self._offsets
+
+    def _measure(self) -> bool:
+        """Record the laid out height of mounted messages. Returns True if any changed."""
+        changed = False
+        for index, widget in self._mounted.items():
+            height = widget.outer_size.height
+            if not height:
+                continue
+            height += MESSAGE_SPACING
+            if height != self.store.measured_height(index):
+                self.store.set_height(index, height)
+                changed = True
+        if changed:
+            self._offsets = None
+        return changed
+
+    def _update_window(self) -> None:
+        """Mount the messages around the viewport and unmount the rest."""
+        self._update_scheduled = False
+        if not self.is_mounted:
+            return
+
+        # Anchor the first visible message so measuring doesn't make the view jump
+        offsets = self._get_offsets()
+        scroll_y = self.scroll_y
+        anchor = max(0, bisect_right(offsets, scroll_y) - 1)
+        anchor_delta = scroll_y - offsets[anchor] if anchor < len(offsets) else 0
+        if self._measure():
+            offsets = self._get_offsets()
+            if not self._follow and anchor < len(offsets):
+                scroll_y = offsets[anchor] + anchor_delta
+
+        count = len(self.store)
+        viewport = self._viewport_height()
+        if self._follow:
+            scroll_y = max(0, offsets[-1] - viewport)
+        first = max(0, bisect_right(offsets, scroll_y) - 1)
+        last = bisect_right(offsets, scroll_y + viewport)
+        start = max(0, first - self.OVERSCAN)
+        end = min(count, last + self.OVERSCAN)
+
+        old_start, old_end = self._window
+        mounted_before = len(self._mounted)
+        for index in [index for index in self._mounted if not start <= index < end]:
+            self._mounted.pop(index).remove()
+
+        if old_end <= start or end <= old_start or not self._mounted:
+            # No overlap: mount the whole window above the bottom spacer
+            self._mount_range(range(start, end), before=self._bottom_spacer)
+        else:
+            self._mount_range(range(start, old_start), after=self._top_spacer)
+            self._mount_range(range(old_end, end), before=self._bottom_spacer)
+        self._window = (start, end)
+
+        self._top_spacer.styles.height = offsets[start]
+        self._bottom_spacer.styles.height = offsets[-1] - offsets[end]
+
+        if self._follow:
+            self.call_after_refresh(self.scroll_end, animate=False, immediate=True)
+        elif scroll_y != self.scroll_y:
+            self.scroll_to(y=scroll_y, animate=False, immediate=True)
+        # Measure newly mounted messages once they are laid out
+        if len(self._mounted) != mounted_before or (start, end) != (old_start, old_end):
+            self._schedule_update()
+
+    def _mount_range(self, indexes: range, **where) -> None:
+        widgets = []
+        for index in indexes:
+            kind, text = self.store.get(index)
+            widget = self._widget_factory(index, kind, text)
+            self._mounted[index] = widget
+            widgets.append(widget)
+        if widgets:
+            self.mount_all(widgets, **where)
@@ -0,0 +1,94 @@
+from collections import deque
+
+# Update kinds whose consecutive payloads are concatenated into one update
+CONCAT_KINDS = frozenset({"stream_append"})
+# Update kinds whose consecutive payloads are batched into one list
+BATCH_KINDS = frozenset({"log"})
+# Update kinds where only the last of consecutive updates matters
+LAST_WINS_KINDS = frozenset({"stream_set", "spinner", "handler_status"})
+# Update kinds that may be dropped when producers outpace the frame rate. Only
+# their rendering is lost: add_log has already put the record in the LogBuffer.
+DROPPABLE_KINDS = frozenset({"log"})
+
+
+class UIUpdateQueue:
+    """Queue of pending UI updates, pushed by producer threads and drained per frame.
+
+    Producers only call `push`, which is a single deque.append: it never blocks
+    and needs no lock. The app drains the queue on the event loop once per frame,
+    merging runs of consecutive updates of the same kind:
+
+    - stream_append: chunks are concatenated into a single append
+    - log: messages are batched into a single write
+    - stream_set, spinner, handler_status: only the last value is kept
+
+    Updates of different kinds are never reordered. If more than `max_droppable`
+    droppable updates (log lines) pile up between two frames, the oldest ones are
+    dropped from this frame's rendering. All counters are only updated by the
+    draining thread.
+    """
+
+    def __init__(self, max_droppable: int = 1000):
+        self._pending = deque()
+        self.max_droppable = max_droppable
+        self.queued = 0  # Updates taken off the queue
+        self.coalesced = 0  # Updates merged into a neighbour
+        self.dropped = 0  # Droppable updates discarded because of overflow
+
+    def push(self, kind: str, payload=None) -> None:
+        """Enqueue an update. Safe to call from any thread."""
+        self._pending.append((kind, payload))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def stats(self) -> dict:
+        """Counters for queued, coalesced and dropped updates."""
+        return {
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+        }
+
+    def drain(self) -> list[tuple[str, object]]:
+        """Take all pending updates and return them merged, in order.
+
+        Must be called from a single consumer thread (the event loop).
+        Batched kinds are returned with a list payload.
+        """
+        updates = []
+        pending = self._pending
+        # Only take what is there now; producers may keep appending meanwhile
+        for _ in range(len(pending)):
+            updates.append(pending.popleft())
+        self.queued += len(updates)
+
+        droppable = sum(1 for kind, _ in updates if kind in DROPPABLE_KINDS)
+        to_drop = max(0, droppable - self.max_droppable)
+
+        merged = []
+        for kind, payload in updates:
+            if to_drop and kind in DROPPABLE_KINDS:
+                to_drop -= 1
+                self.dropped += 1
+                continue
+            if merged and merged[-1][0] == kind:
+                if kind in CONCAT_KINDS or kind in BATCH_KINDS:
+                    merged[-1][1].append(payload)
+                    self.coalesced += 1
+                    continue
+                if kind in LAST_WINS_KINDS:
+                    merged[-1] = (kind, payload)
+                    self.coalesced += 1
+                    continue
+            if kind in CONCAT_KINDS or kind in BATCH_KINDS:
+                merged.append((kind, [payload]))
+            else:
+                merged.append((kind, payload))
+
+        return [
+            (kind, "".join(payload)) if kind in CONCAT_KINDS else (kind, payload)
+            for kind, payload in merged
+        ]
@@ -14,20 +14,48 @@
 (defn add-plain-text [app s]
   ((:add-plain-text app) s))
 
+(defn incremental-output?
+  "True if the app can append to the streaming output (append-streaming-output)
+   instead of being sent the whole text with add-assistant-output on every partial."
+  [app]
+  (contains? app :append-streaming-output))
+
+(defn append-streaming-output [app s]
+  ((:append-streaming-output app) s))
+
+(defn set-streaming-output [app s]
+  ((:set-streaming-output app) s))
+
 (defn finish-streaming-output [app]
   (when-let [finish-fn (:finish-streaming-output app)]
     (finish-fn)))
 
-(def tui-app
-  {:add-log tui/add-log
-   :add-assistant-output tui/add-assistant-output
-   :add-clojure-code tui/add-clojure-code
-   :add-plain-text tui/add-plain-text
-   :finish-streaming-output tui/finish-streaming-output})
+(defn abort-controller
+  "BAML AbortController for the current handler call, if the app provides one."
+  [app]
+  (when-let [abort-controller-fn (:abort-controller app)]
+    (abort-controller-fn)))
+
+(defn tui-app
+  "App map over a TerminalApp instance, such as the app-self a TUI handler is called with.
+   :abort-controller is the AbortController of the handler call running on the calling
+   thread (from the app's HandlerScheduler), so ctrl+g aborts the BAML requests made
+   from that call."
+  [app-instance]
+  {:add-log #(tui/add-log app-instance %)
+   :add-assistant-output #(tui/add-assistant-output app-instance %)
+   :add-clojure-code #(tui/add-clojure-code app-instance %)
+   :add-plain-text #(tui/add-plain-text app-instance %)
+   :append-streaming-output #(tui/append-streaming-output app-instance %)
+   :set-streaming-output #(tui/set-streaming-output app-instance %)
+   :finish-streaming-output #(tui/finish-streaming-output app-instance)
+   :abort-controller #(tui/current-abort-controller app-instance)})
 
 (def console-app
   {:add-log (fn [s] (println s))
    :add-assistant-output (fn [s] (println s))
    :add-clojure-code (fn [s] (println s))
    :add-plain-text (fn [s] (println s))
-   :finish-streaming-output (fn [] nil)})
+   :finish-streaming-output (fn [] nil)
+   ;; Nothing aborts a console run but ctrl+c, which ends the process
+   :abort-controller (fn [] nil)})
@@ -3,13 +3,30 @@
    [com.brunobonacci.mulog :as u]
    [com.zihao.baml-client.interface :as baml-client]
    [com.zihao.agent.llm-function :as llm-function]
-   [com.zihao.agent.app :refer [add-log add-assistant-output finish-streaming-output]]
+   [com.zihao.agent.app :as app :refer [add-log add-assistant-output append-streaming-output
+                                         set-streaming-output finish-streaming-output]]
    [com.zihao.agent-eval.interface :as agent-eval]))
 
 (comment
   (baml-client/reload)
   :rcf)
 
+(defn- output-callbacks
+  "Callbacks that show the reply while it streams. Apps that can append get only the new
+   text of each partial (delta-callback); others get the whole text every time."
+  [app]
+  (if (app/incremental-output? app)
+    {:delta-callback (fn [deltas]
+                       (doseq [{:keys [op value]} deltas]
+                         (case op
+                           :append (append-streaming-output app value)
+                           :set (set-streaming-output app value)
+                           nil)))}
+    {:stream-callback (fn [partial-result]
+                        (when app
+                          (let [text (:content (:message partial-result))]
+                            (add-assistant-output app text))))}))
+
 (defn get-actions [{:keys [store app]}]
   (let [state @store
         {:keys [msgs]} state
@@ -23,20 +40,21 @@
       (and last-msg
            (= (:role last-msg) "user"))
       (conj [:chat-agent
-             {:messages msgs
-              :stream-callback (fn [partial-result]
+             (merge
+              (output-callbacks app)
+              {:messages msgs
+               :final-callback (fn [{:keys [message] :as final-result}]
+                                 (u/log ::final-callback :data final-result)
                                  (when app
-                                   (let [text (:content (:message partial-result))]
-                                     (add-assistant-output app text))))
-              :final-callback (fn [{:keys [message] :as final-result}]
-                                (u/log ::final-callback :data final-result)
-                                (when app
-                                  (add-log app (str "[INFO] Final callback received:" (pr-str final-result)))
-                                  (finish-streaming-output app))
-                                ;; context
-                                (when message
-                                  (swap! store update-in [:msgs] conj {:role "assistant"
-                                                                       :content (:content message)})))}]))))
+                                   (add-log app (str "[INFO] Final callback received:" (pr-str final-result)))
+                                   ;; The deltas may stop short of the final reply, so show it whole
+                                   (when (and message (app/incremental-output? app))
+                                     (set-streaming-output app (:content message)))
+                                   (finish-streaming-output app))
+                                 ;; context
+                                 (when message
+                                   (swap! store update-in [:msgs] conj {:role "assistant"
+                                                                        :content (:content message)})))})]))))
 
 (comment
   ;; 用户提问
@@ -51,22 +69,25 @@
 
 (defn execute-actions
   ([_ctx actions] (execute-actions nil _ctx actions))
-  ([system {:keys [store]} actions]
+  ([system {:keys [store app]} actions]
    (doseq [action actions]
      (u/log ::execute-action :data action)
      (let [[action-type & args] action]
        (case action-type
          :chat-agent
-         (if system
-           ;; With system map: use Collector for logging
-           (let [coll (agent-eval/create-collector system "chat-agent")
-                 result (llm-function/chat-agent args
-                                                 {:kwargs {:baml_options
-                                                           {"collector" coll}}})]
-             (agent-eval/save-collector-log! coll)
-             result)
-           ;; Without system map: normal call (backward compatible)
-           (llm-function/chat-agent args))
+         (let [abort-controller (when app (app/abort-controller app))
+               baml-options (cond-> {}
+                              abort-controller (assoc "abort_controller" abort-controller))]
+           (if system
+             ;; With system map: use Collector for logging
+             (let [coll (agent-eval/create-collector system "chat-agent")
+                   result (llm-function/chat-agent args
+                                                   {:kwargs {:baml_options
+                                                             (assoc baml-options "collector" coll)}})]
+               (agent-eval/save-collector-log! coll)
+               result)
+             ;; Without system map: normal call (backward compatible)
+             (llm-function/chat-agent args {:kwargs {:baml_options baml-options}})))
 
          :user-input (swap! store update-in [:msgs] conj
                             {:type :message
@@ -15,20 +15,28 @@
                                                :baml-client "baml_client"}))
   :rcf)
 
+(def ^:private raw-options
+  "baml_options that make the client return plain dicts instead of Pydantic models
+   (baml_client/raw_types.py). Every wrapper here converts the result to a Clojure map
+   right away, so building the models first would only add a model_dump."
+  {"raw" true})
+
 (defn pydantic->clj
-  "Convert a Pydantic model to a Clojure map.
+  "Convert a Pydantic model, or the dict of a raw-options call, to a Clojure map.
    Uses model_dump() for Pydantic v2 or dict() for v1.
    Recursively converts nested Pydantic models."
   [pydantic-model]
   (if (string? pydantic-model)
     ;; agent execute-action callback 需要返回 :message 和 :code, code 是 optional 的
     {:message {:role "assistant" :content pydantic-model}}
-    (let [model-dump (py/py. pydantic-model "model_dump")]
+    (let [model-dump (if (py/has-attr? pydantic-model "model_dump")
+                       (py/py. pydantic-model "model_dump")
+                       pydantic-model)]
       (keywordize-keys (py/->jvm model-dump)))))
 
 (defn choose-tool [_ctx message]
-  (let [sync-client (py/import-module "baml_client.sync_client")
-        b (py/py.- sync-client "b")]
+  (let [extended-client (py/import-module "baml_client.extended_client")
+        b (py/py.- extended-client "sync_b")]
     (-> (py/py. b "ChooseTool" (py/->py-dict message))
         pydantic->clj)))
 
@@ -43,13 +51,13 @@
    tool: optional map with :name, :args, :result keys
    Returns a Clojure map with :message (may be nil) and :tools (array, may be empty)."
   [_ctx messages tool]
-  (let [sync-client (py/import-module "baml_client.sync_client")
-        b (py/py.- sync-client "b")
+  (let [extended-client (py/import-module "baml_client.extended_client")
+        b (py/py.- extended-client "sync_b")
         messages-list (py/->py-list (map py/->py-dict messages))
         args (if tool
                [messages-list (py/->py-dict tool)]
                [messages-list nil])
-        result (py/py. b "DecideAction" (first args) (second args))]
+        result (py/py* b "DecideAction" args {"baml_options" (py/->py-dict raw-options)})]
     (pydantic->clj result)))
 
 (comment
@@ -71,50 +79,90 @@
 
   :rcf)
 
+(def default-stream-throttle
+  "Partials passed to a stream-callback: at most one every 50ms, plus one as soon as a
+   field gets a value. See baml_client/stream_throttle.py."
+  {:min-interval 0.05 :min-chars 0 :on-state-change true})
+
+(defn- stream-baml-options
+  "baml_options for a stream call, with raw-options. Adds a StreamThrottle when partials
+   are consumed (stream-callback or delta-callback is set) and stream-throttle isn't nil,
+   and turns on stream_deltas for a delta-callback."
+  [baml-options stream-callback delta-callback stream-throttle]
+  (cond-> (merge raw-options baml-options)
+    delta-callback
+    (assoc "stream_deltas" true)
+
+    (and (or stream-callback delta-callback) stream-throttle)
+    (assoc "stream_throttle"
+           (let [throttle-module (py/import-module "baml_client.stream_throttle")]
+             (py/py* throttle-module "StreamThrottle" []
+                     {"min_interval" (:min-interval stream-throttle 0.0)
+                      "min_chars" (:min-chars stream-throttle 0)
+                      "on_state_change" (:on-state-change stream-throttle true)})))))
+
+(def ^:private pump-poll-timeout
+  "Seconds StreamPump.poll waits for partials before returning an empty batch."
+  0.1)
+
+(defn- delta->clj
+  "A delta from StreamPump, {:path [\"findings\"] :op \"append\" :value \"...\"}, with
+   field names in the path and the op as keywords. List indexes stay integers, so paths
+   work with get-in/assoc-in on pydantic->clj results."
+  [delta]
+  (-> delta
+      (update :path (partial mapv #(if (string? %) (keyword %) %)))
+      (update :op keyword)))
+
 (defn- process-stream
   "Helper function to process a stream with optional callbacks.
    stream: Python stream object
    stream-callback: optional function to call with each partial result
+   delta-callback: optional function to call with the changes since the previous partial,
+                   a vector of delta->clj maps; the stream must have stream_deltas on
    final-callback: optional function to call with the final result
+   Partials are drained by a baml_client.stream_pump.StreamPump on a Python thread and
+   converted there; each poll converts a whole batch with one ->jvm.
    Returns the final result as a Clojure map."
-  [stream stream-callback final-callback]
-  (let [builtins (py/import-module "builtins")]
-    ;; If stream-callback is provided, iterate over partial results
-    (when stream-callback
-      (let [iter-fn (py/py. builtins "iter" stream)]
-        (loop [continue? true]
-          (when continue?
-            (let [has-next? (try
-                              (let [partial-result (py/py. builtins "next" iter-fn)
-                                    partial-clj (pydantic->clj partial-result)]
-                                (stream-callback partial-clj)
-                                true)
-                              (catch Exception e
-                                ;; StopIteration is raised when iterator is exhausted - this is expected
-                                (let [msg (str (.getMessage e))
-                                      class-name (str (class e))]
-                                  (if (or (.contains msg "StopIteration")
-                                          (.contains class-name "StopIteration"))
-                                    false
-                                    (throw e)))))]
-              (recur has-next?))))))
-    ;; Get and return the final response
-    (let [final-result (py/py. stream "get_final_response")
-          final-clj (pydantic->clj final-result)]
-      ;; If final-callback is provided, call it with the final result
-      (when final-callback
-        (final-callback final-clj))
-      final-clj)))
+  [stream stream-callback delta-callback final-callback]
+  ;; If a callback is provided, pump the partial results
+  (when (or stream-callback delta-callback)
+    (let [pump-module (py/import-module "baml_client.stream_pump")
+          pump (py/py* pump-module "StreamPump" [stream] {"snapshots" (some? stream-callback)})]
+      (try
+        (loop []
+          ;; poll returns None (nil) once the stream is exhausted
+          (when-let [batch (py/py. pump "poll" pump-poll-timeout)]
+            (doseq [{:keys [snapshot deltas]} (keywordize-keys (py/->jvm batch))]
+              (when delta-callback
+                (delta-callback (mapv delta->clj deltas)))
+              (when stream-callback
+                (stream-callback (if (string? snapshot) (pydantic->clj snapshot) snapshot))))
+            (recur)))
+        (finally
+          (py/py. pump "close")))))
+  ;; Get and return the final response
+  (let [final-result (py/py. stream "get_final_response")
+        final-clj (pydantic->clj final-result)]
+    ;; If final-callback is provided, call it with the final result
+    (when final-callback
+      (final-callback final-clj))
+    final-clj))
 
 (defn code-act-agent
-  "wrapper for baml function CodeActAgent"
-  [{:keys [messages code code-result stream-callback final-callback]}]
-  (let [sync-client (py/import-module "baml_client.sync_client")
-        b (py/py.- sync-client "b")
+  "wrapper for baml function CodeActAgent.
+   stream-throttle: which partials reach stream-callback, default-stream-throttle unless given; nil for all
+   delta-callback: called with the changes since the previous partial, see process-stream"
+  [{:keys [messages code code-result stream-callback delta-callback final-callback stream-throttle]
+    :or {stream-throttle default-stream-throttle}}]
+  (let [extended-client (py/import-module "baml_client.extended_client")
+        b (py/py.- extended-client "sync_b")
         stream-client (py/py.- b "stream")
         messages-list (py/->py-list (map py/->py-dict messages))
-        stream (py/py. stream-client "CodeActAgent" messages-list code code-result)]
-    (process-stream stream stream-callback final-callback)))
+        baml-options (stream-baml-options nil stream-callback delta-callback stream-throttle)
+        stream (py/py* stream-client "CodeActAgent" [messages-list code code-result]
+                       {"baml_options" (py/->py-dict baml-options)})]
+    (process-stream stream stream-callback delta-callback final-callback)))
 
 (comment
   ;; Test CodeActAgent - returns CodeActAgentDecision with optional message and code
@@ -140,15 +188,19 @@
   :rcf)
 
 (defn chat-agent
-  "wrapper for baml function ChatAgent"
-  [{:keys [messages stream-callback final-callback]}
+  "wrapper for baml function ChatAgent.
+   stream-throttle: which partials reach stream-callback, default-stream-throttle unless given; nil for all
+   delta-callback: called with the changes since the previous partial, see process-stream"
+  [{:keys [messages stream-callback delta-callback final-callback stream-throttle]
+    :or {stream-throttle default-stream-throttle}}
    & {:keys [kwargs]}]
-  (let [sync-client (py/import-module "baml_client.sync_client")
-        b (py/py.- sync-client "b")
+  (let [extended-client (py/import-module "baml_client.extended_client")
+        b (py/py.- extended-client "sync_b")
         stream-client (py/py.- b "stream")
         messages-list (py/->py-list (map py/->py-dict messages))
+        kwargs (update kwargs :baml_options stream-baml-options stream-callback delta-callback stream-throttle)
         stream (py/py* stream-client "ChatAgent" [messages-list] (py/->py-dict kwargs))]
-    (process-stream stream stream-callback final-callback)))
+    (process-stream stream stream-callback delta-callback final-callback)))
 
 (comment
   #_{:clj-kondo/ignore [:duplicate-require]}
@@ -170,14 +222,56 @@
   :rcf)
 
 (defn code-locator
-  "wrapper for baml function CodeLocator"
-  [{:keys [messages stream-callback final-callback]}]
-  (let [sync-client (py/import-module "baml_client.sync_client")
-        b (py/py.- sync-client "b")
+  "wrapper for baml function CodeLocator.
+   stream-throttle: which partials reach stream-callback, default-stream-throttle unless given; nil for all
+   delta-callback: called with the changes since the previous partial, see process-stream"
+  [{:keys [messages stream-callback delta-callback final-callback stream-throttle]
+    :or {stream-throttle default-stream-throttle}}]
+  (let [extended-client (py/import-module "baml_client.extended_client")
+        b (py/py.- extended-client "sync_b")
         stream-client (py/py.- b "stream")
         messages-list (py/->py-list (map py/->py-dict messages))
-        stream (py/py. stream-client "CodeLocator" messages-list)]
-    (process-stream stream stream-callback final-callback)))
+        baml-options (stream-baml-options nil stream-callback delta-callback stream-throttle)
+        stream (py/py* stream-client "CodeLocator" [messages-list]
+                       {"baml_options" (py/->py-dict baml-options)})]
+    (process-stream stream stream-callback delta-callback final-callback)))
+
+(defn batch-call
+  "Call one BAML function over many inputs concurrently, via b.batch on the async client.
+   function-name: BAML function name, e.g. \"CodeLocator\"
+   inputs: seq of argument maps, e.g. [{:messages [{:role \"user\" :content \"...\"}]}]
+   max-concurrency: maximum number of calls in flight (default 8)
+   rate-limit: maximum number of calls started per second (default unlimited)
+   Returns a vector in input order of {:index :result :error} maps. A failed input has
+   :result nil and the error message in :error; it doesn't stop the other inputs."
+  [function-name inputs & {:keys [max-concurrency rate-limit] :or {max-concurrency 8}}]
+  (let [extended-client (py/import-module "baml_client.extended_client")
+        asyncio (py/import-module "asyncio")
+        batch (py/py.- (py/py.- extended-client "async_b") "batch")
+        py-inputs (py/->py-list
+                   (map (fn [args]
+                          (py/->py-dict (into {} (map (fn [[k v]] [(name k) (py/->python v)])) args)))
+                        inputs))
+        run (py/py* batch function-name [py-inputs] {"max_concurrency" max-concurrency
+                                                      "rate_limit" rate-limit
+                                                      "baml_options" (py/->py-dict raw-options)})
+        items (py/py. asyncio "run" (py/py. run "results"))]
+    (mapv (fn [item]
+            (let [error (py/py.- item "error")]
+              {:index (py/py.- item "index")
+               :result (when-not error (pydantic->clj (py/py.- item "result")))
+               :error (when error (str error))}))
+          items)))
+
+(comment
+  (def results
+    (batch-call "CodeLocator"
+                [{:messages [{:role "user" :content "find the user authentication code"}]}
+                 {:messages [{:role "user" :content "find the TUI log panel"}]}]
+                :max-concurrency 4
+                :rate-limit 2))
+  (map :error results)
+  :rcf)
 
 (defn llm-caller
   ([ctx function-name args]
@@ -0,0 +1,156 @@
+(ns com.zihao.agent.resolve-at.file-index
+  "In-memory index of git tracked files, with a fuzzy matcher for @ completion.
+
+   The index is built once per workspace from `git ls-files` and kept until
+   the mtime of the git index file (.git/index) changes, which happens whenever
+   the set of tracked files does. Queries then run in-process without forking
+   git or fzf."
+  (:require
+   [babashka.process :refer [process check]]
+   [clojure.java.io :as io]
+   [clojure.string :as str])
+  (:import
+   [java.io File]
+   [java.util PriorityQueue]))
+
+;; workspace root (canonical path) -> index
+(defonce ^:private indexes (atom {}))
+
+(defn- char-bit
+  "Bit for a character in a path mask: a-z and 0-9 get their own bit,
+   everything else shares the remaining ones."
+  ^long [^long c]
+  (cond
+    (<= 97 c 122) (- c 97)
+    (<= 48 c 57) (+ 26 (- c 48))
+    :else (+ 36 (mod c 28))))
+
+(defn- char-mask
+  "Bitmask of the characters in a lowercased string. A path can only match a
+   query if its mask contains all bits of the query mask, which rejects most
+   paths before scoring."
+  ^long [^String s]
+  (let [n (.length s)]
+    (loop [i 0
+           mask 0]
+      (if (< i n)
+        (recur (inc i) (bit-or mask (bit-shift-left 1 (char-bit (long (.charAt s i))))))
+        mask))))
+
+(defn- separator? [c]
+  (case c
+    (\/ \_ \- \. \space) true
+    false))
+
+(defn score
+  "Fuzzy score of a lowercased path for a lowercased query, or -1 if the
+   query characters don't appear in the path in order.
+
+   Characters are matched greedily left to right. Matches at the start of a
+   path segment or word, consecutive matches and matches in the file name
+   score higher; shorter paths win ties."
+  ^long [^String query ^String path]
+  (let [qn (.length query)
+        pn (.length path)
+        basename-start (inc (.lastIndexOf path "/"))]
+    (loop [qi 0
+           pi 0
+           prev-match -2
+           total 0]
+      (cond
+        (= qi qn) (- total (quot pn 8))
+        (= pi pn) -1
+        (= (.charAt query qi) (.charAt path pi))
+        (recur (inc qi)
+               (inc pi)
+               pi
+               (+ total
+                  1
+                  (if (= prev-match (dec pi)) 4 0)
+                  (if (or (zero? pi) (separator? (.charAt path (dec pi)))) 6 0)
+                  (if (>= pi basename-start) 2 0)))
+        :else (recur qi (inc pi) prev-match total)))))
+
+(defn- git-dir
+  "Absolute .git directory of the repository containing workspace-root."
+  ^File [workspace-root]
+  (let [result @(check (process ["git" "rev-parse" "--absolute-git-dir"]
+                                {:dir workspace-root :out :string}))]
+    (io/file (str/trim (:out result)))))
+
+(defn- git-ls-files [workspace-root]
+  (let [result @(check (process ["git" "ls-files"] {:dir workspace-root :out :string}))]
+    (str/split-lines (:out result))))
+
+(defn build-index
+  "List the tracked files of workspace-root and precompute what matching needs."
+  [workspace-root]
+  (let [index-file (io/file (git-dir workspace-root) "index")
+        ;; Read the mtime before listing, so a concurrent change triggers a rebuild
+        mtime (.lastModified index-file)
+        paths (into [] (remove str/blank?) (git-ls-files workspace-root))
+        lower (mapv str/lower-case paths)]
+    {:workspace-root workspace-root
+     :index-file index-file
+     :mtime mtime
+     :paths paths
+     :lower lower
+     :masks (long-array (map char-mask lower))}))
+
+(defn- fresh? [{:keys [^File index-file mtime]}]
+  (= mtime (.lastModified index-file)))
+
+(defn get-index
+  "Return the file index for workspace-root, rebuilding it if the set of
+   tracked files may have changed since it was built."
+  [workspace-root]
+  (let [root (.getCanonicalPath (io/file workspace-root))
+        index (get @indexes root)]
+    (if (and index (fresh? index))
+      index
+      (let [index (build-index root)]
+        (swap! indexes assoc root index)
+        index))))
+
+(defn invalidate!
+  "Drop cached indexes, all of them or the one for workspace-root."
+  ([] (reset! indexes {}))
+  ([workspace-root]
+   (swap! indexes dissoc (.getCanonicalPath (io/file workspace-root)))))
+
+(defn query
+  "Top max-results paths of the index matching query, best first.
+   A blank query returns the first max-results paths in git order."
+  [{:keys [paths lower masks]} query max-results]
+  (if (str/blank? query)
+    (into [] (take max-results) paths)
+    (let [q (str/lower-case query)
+          q-mask (char-mask q)
+          ^longs masks masks
+          n (alength masks)
+          ;; Min-heap of [score index] holding the best max-results matches so far
+          heap (PriorityQueue. (int (inc max-results))
+                               (fn [[s1 i1] [s2 i2]]
+                                 (if (= s1 s2)
+                                   (compare i2 i1)
+                                   (compare s1 s2))))]
+      (dotimes [i n]
+        (when (= q-mask (bit-and q-mask (aget masks i)))
+          (let [s (score q (nth lower i))]
+            (when (>= s 0)
+              (.add heap [s i])
+              (when (> (.size heap) max-results)
+                (.poll heap))))))
+      (->> (loop [acc '()]
+             (if-let [entry (.poll heap)]
+               (recur (conj acc entry))
+               acc))
+           (mapv (fn [[_ i]] (nth paths i)))))))
+
+(comment
+  (def index (get-index "."))
+  (count (:paths index))
+  (query index "resolveat" 10)
+  (query index "app.py" 10)
+  (score "rat" "components/agent/src/com/zihao/agent/resolve_at/resolve_at.clj")
+  :rcf)
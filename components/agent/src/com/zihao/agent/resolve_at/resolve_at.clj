@@ -1,6 +1,7 @@
 (ns com.zihao.agent.resolve-at.resolve-at
   (:require
    [com.zihao.baml-client.interface :as baml-client]
+   [com.zihao.agent.resolve-at.file-index :as file-index]
    [babashka.process :refer [pipeline pb process check]]
    [clojure.string :as str]))
 
@@ -46,7 +47,33 @@
 (defn query-at-candidates
   "Query file candidates for @ completion.
    
+   Matches against an in-memory index of git ls-files (see file-index), so
+   only the first query, or the first one after the set of tracked files
+   changed, forks git. Only returns files tracked by git (respects
+   .gitignore automatically).
+   
+   Args:
+   - query: String to filter results (blank returns all)
+   - opts: Optional map with:
+     - :max-results: Maximum number of results (default: 50)
+     - :workspace-root: Root directory for git (default: current working directory)
+   
+   Returns:
+   - Vector of file path strings (relative to workspace root), best match first"
+  [query & {:keys [max-results workspace-root]
+            :or {max-results 50
+                 workspace-root "."}}]
+  (try
+    (file-index/query (file-index/get-index workspace-root) query max-results)
+    (catch Exception _
+      ;; If git is not available, or not a git repo, return empty vector
+      [])))
+
+(defn query-at-candidates-fzf
+  "Query file candidates for @ completion by forking git and fzf.
+   
    Uses git ls-files piped through fzf for fuzzy filtering.
+   Kept as the baseline for bench-query-at-candidates; use query-at-candidates.
    Only returns files tracked by git (respects .gitignore automatically).
    
    Args:
@@ -118,6 +145,29 @@
       ;; In the future, could fall back to simple file system search
       [])))
 
+(defn bench-query-at-candidates
+  "Compare the in-memory index with the git | fzf pipeline.
+   Runs every query `runs` times with each implementation and prints the
+   mean time per query in milliseconds."
+  [queries & {:keys [runs workspace-root]
+              :or {runs 20
+                   workspace-root "."}}]
+  (let [mean-ms (fn [f]
+                  (let [start (System/nanoTime)]
+                    (dotimes [_ runs]
+                      (doseq [q queries]
+                        (f q)))
+                    (/ (- (System/nanoTime) start) 1e6 runs (count queries))))
+        ;; Build the index up front, like the first keystroke would
+        _ (file-index/get-index workspace-root)
+        index-ms (mean-ms #(query-at-candidates % :workspace-root workspace-root))
+        fzf-ms (mean-ms #(query-at-candidates-fzf % :workspace-root workspace-root))]
+    (println (format "files: %d, queries: %d, runs: %d"
+                     (count (:paths (file-index/get-index workspace-root))) (count queries) runs))
+    (println (format "index: %.3f ms/query" index-ms))
+    (println (format "fzf:   %.3f ms/query" fzf-ms))
+    {:index-ms index-ms :fzf-ms fzf-ms}))
+
 (comment
   (println (resolve-at ["看一下" {:type :file :path "./readme.md"} "里面有什么未完成的"]))
 
@@ -125,4 +175,6 @@
   (query-at-candidates "agent")
   (query-at-candidates "")
   (query-at-candidates "clj" {:max-results 10})
+
+  (bench-query-at-candidates ["a" "agent" "resolveat" "app.py" "cmpzhagnt"])
   :rcf)
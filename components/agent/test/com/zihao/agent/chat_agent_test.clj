@@ -0,0 +1,24 @@
+(ns com.zihao.agent.chat-agent-test
+  (:require [clojure.test :refer [deftest testing is]]
+            [com.zihao.agent.chat-agent :as chat-agent]
+            [com.zihao.agent.llm-function :as llm-function]))
+
+(defn- baml-options-of
+  "baml_options the :chat-agent action passes to llm-function/chat-agent for this app."
+  [app]
+  (let [seen (atom nil)]
+    (with-redefs [llm-function/chat-agent (fn [_args opts] (reset! seen opts))]
+      (chat-agent/execute-actions {:store (atom {:msgs []}) :app app}
+                                  [[:chat-agent {:messages []}]]))
+    (get-in @seen [:kwargs :baml_options])))
+
+(deftest execute-actions-abort-controller-test
+  (testing "The handler call's AbortController reaches baml_options"
+    (let [controller (Object.)]
+      (is (identical? controller
+                      (get (baml-options-of {:abort-controller (fn [] controller)})
+                           "abort_controller")))))
+
+  (testing "No abort_controller without one, so BAML uses its default"
+    (is (= {} (baml-options-of {:abort-controller (fn [] nil)})))
+    (is (= {} (baml-options-of nil)))))
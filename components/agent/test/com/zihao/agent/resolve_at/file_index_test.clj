@@ -0,0 +1,73 @@
+(ns com.zihao.agent.resolve-at.file-index-test
+  (:require [babashka.process :refer [process check]]
+            [clojure.java.io :as io]
+            [clojure.string :as str]
+            [clojure.test :refer [deftest testing is]]
+            [com.zihao.agent.resolve-at.file-index :as file-index])
+  (:import [java.nio.file Files]
+           [java.nio.file.attribute FileAttribute]))
+
+(defn- index-of
+  "An index over paths, built the way build-index does without asking git."
+  [paths]
+  (let [lower (mapv str/lower-case paths)]
+    {:paths paths
+     :lower lower
+     :masks (long-array (map #'file-index/char-mask lower))}))
+
+(deftest score-test
+  (testing "Query characters must appear in the path in order"
+    (is (= -1 (file-index/score "abc" "xyz")))
+    (is (= -1 (file-index/score "ba" "ab"))))
+  (testing "Matches at the start of a segment score higher"
+    (is (> (file-index/score "app" "app.py")
+           (file-index/score "app" "components/agent-tui-cljpy/app_bench.py"))))
+  (testing "Consecutive matches score higher"
+    (is (> (file-index/score "ab" "abx.clj")
+           (file-index/score "ab" "axb.clj"))))
+  (testing "Shorter paths win otherwise equal matches"
+    (is (> (file-index/score "core" "src/core.clj")
+           (file-index/score "core" "src/my/deeply/nested/path/core.clj")))))
+
+(deftest query-test
+  (let [index (index-of ["README.md"
+                         "src/app_bench.py"
+                         "src/app.py"
+                         "a/x.clj"
+                         "b/x.clj"])]
+    (testing "A blank query returns paths in git order"
+      (is (= ["README.md" "src/app_bench.py"] (file-index/query index "" 2)))
+      (is (= ["README.md" "src/app_bench.py"] (file-index/query index "  " 2))))
+    (testing "Matches come best first, limited to max-results"
+      (is (= ["src/app.py"] (file-index/query index "app.py" 1)))
+      (is (= ["src/app.py" "src/app_bench.py"] (file-index/query index "APP" 5))))
+    (testing "Equal scores keep git order"
+      (is (= ["a/x.clj" "b/x.clj"] (file-index/query index "x.clj" 5))))
+    (testing "No match returns nothing"
+      (is (= [] (file-index/query index "zzz" 5))))))
+
+(defn- git [dir & args]
+  @(check (process (into ["git"] args) {:dir dir :out :string :err :string})))
+
+(deftest get-index-test
+  (let [root (.toFile (Files/createTempDirectory "file-index-test" (make-array FileAttribute 0)))]
+    (try
+      (git root "init" "-q")
+      (spit (io/file root "a.clj") "")
+      (git root "add" "a.clj")
+      (file-index/invalidate! root)
+      (let [index (file-index/get-index root)]
+        (testing "Indexes the tracked files"
+          (is (= ["a.clj"] (:paths index))))
+        (testing "Is reused while the git index is unchanged"
+          (is (identical? index (file-index/get-index root))))
+        (testing "Is rebuilt when the set of tracked files changes"
+          ;; Make sure the index file gets a new mtime on coarse-grained file systems
+          (Thread/sleep 1100)
+          (spit (io/file root "b.clj") "")
+          (git root "add" "b.clj")
+          (is (= ["a.clj" "b.clj"] (:paths (file-index/get-index root))))))
+      (finally
+        (file-index/invalidate! root)
+        (doseq [file (reverse (file-seq root))]
+          (.delete ^java.io.File file))))))
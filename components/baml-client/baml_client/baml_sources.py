@@ -0,0 +1,44 @@
+"""Facts about the BAML sources that the client extensions look up.
+
+Read from inlinedbaml.get_baml_files(), the sources the runtime was built
+from, and computed once per import:
+
+    function_clients()["CodeLocator"]   # => "FreeGLM45Air"
+    baml_source_hash()                  # changes with any edit to baml_src
+"""
+import hashlib
+import re
+import typing
+
+from .inlinedbaml import get_baml_files
+
+_FUNCTION_RE = re.compile(r"^function\s+(\w+)\s*\([^)]*\)\s*->[^{]*\{\s*client\s+\"?([\w-]+)\"?", re.MULTILINE)
+
+_source_hash: typing.Optional[str] = None
+_function_clients: typing.Optional[typing.Dict[str, str]] = None
+
+
+def baml_source_hash() -> str:
+    """sha256 of all BAML source files, in path order."""
+    global _source_hash
+    if _source_hash is None:
+        digest = hashlib.sha256()
+        for path, source in sorted(get_baml_files().items()):
+            digest.update(path.encode())
+            digest.update(b"\0")
+            digest.update(source.encode())
+            digest.update(b"\0")
+        _source_hash = digest.hexdigest()
+    return _source_hash
+
+
+def function_clients() -> typing.Dict[str, str]:
+    """Map of BAML function name to the name of the client it calls."""
+    global _function_clients
+    if _function_clients is None:
+        _function_clients = {
+            match.group(1): match.group(2)
+            for source in get_baml_files().values()
+            for match in _FUNCTION_RE.finditer(source)
+        }
+    return _function_clients
@@ -0,0 +1,180 @@
+"""Concurrent fan-out of one BAML function over many inputs.
+
+Used through `batch` on the extended async client (extended_client.async_b):
+
+    run = async_b.batch.CodeLocator([{"messages": m} for m in dataset], max_concurrency=8, rate_limit=2)
+    async for item in run:          # as they complete
+        print(item.index, item.result if item.ok else item.error)
+    items = await run               # or all of them, in input order
+
+Each input is a dict of keyword arguments or a tuple of positional
+arguments; anything else is passed as the single first argument. A failing
+item records its exception and the rest of the batch carries on.
+"""
+import asyncio
+import time
+import typing
+
+T = typing.TypeVar("T")
+
+
+class BatchItem(typing.Generic[T]):
+    """Outcome of one input of a batch."""
+
+    __slots__ = ("index", "args", "result", "error", "elapsed")
+
+    def __init__(self, index: int, args: typing.Any):
+        self.index = index
+        self.args = args
+        self.result: typing.Optional[T] = None
+        self.error: typing.Optional[BaseException] = None
+        self.elapsed = 0.0  # Seconds the call took, excluding time spent waiting for a slot
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        outcome = f"result={self.result!r}" if self.ok else f"error={self.error!r}"
+        return f"BatchItem(index={self.index}, {outcome})"
+
+
+class _RateLimiter:
+    """Spaces call starts at least 1 / rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class BatchRun(typing.Generic[T]):
+    """A running batch. Iterate it for items as they complete, or await it for
+    all items in input order.
+
+    Calls start on first use (iteration, await or `results()`), from within
+    the running event loop.
+    """
+
+    def __init__(self, call: typing.Callable[..., typing.Awaitable[T]], inputs: typing.Iterable[typing.Any],
+                 max_concurrency: int = 8, rate_limit: typing.Optional[float] = None,
+                 baml_options: typing.Optional[dict] = None):
+        """Prepare a batch.
+
+        Args:
+            call: Async BAML client method, e.g. b.CodeLocator
+            inputs: One entry per call, see the module docstring
+            max_concurrency: Maximum number of calls in flight
+            rate_limit: Maximum number of calls started per second, None for no limit
+            baml_options: Options passed to every call
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError(f"rate_limit must be positive, got {rate_limit}")
+        self._call = call
+        self.items: typing.List[BatchItem[T]] = [BatchItem(index, args) for index, args in enumerate(inputs)]
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self._baml_options = baml_options or {}
+        self._tasks: typing.List[asyncio.Task] = []
+        self._completed: typing.Optional[asyncio.Queue] = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def errors(self) -> typing.List[BatchItem[T]]:
+        """Items that failed so far."""
+        return [item for item in self.items if item.error is not None]
+
+    def _start(self) -> None:
+        if self._completed is not None:
+            return
+        self._completed = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = _RateLimiter(self.rate_limit) if self.rate_limit else None
+        self._tasks = [
+            asyncio.ensure_future(self._run_item(item, semaphore, limiter))
+            for item in self.items
+        ]
+
+    async def _run_item(self, item: BatchItem[T], semaphore: asyncio.Semaphore,
+                        limiter: typing.Optional[_RateLimiter]) -> None:
+        try:
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.wait()
+                args, kwargs = self._arguments(item.args)
+                start = time.monotonic()
+                try:
+                    item.result = await self._call(*args, baml_options=self._baml_options, **kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    item.error = error
+                finally:
+                    item.elapsed = time.monotonic() - start
+        finally:
+            self._completed.put_nowait(item)
+
+    @staticmethod
+    def _arguments(args: typing.Any) -> typing.Tuple[tuple, dict]:
+        if isinstance(args, dict):
+            return (), args
+        if isinstance(args, tuple):
+            return args, {}
+        return (args,), {}
+
+    async def __aiter__(self) -> typing.AsyncIterator[BatchItem[T]]:
+        self._start()
+        try:
+            for _ in range(len(self.items)):
+                yield await self._completed.get()
+        except BaseException:
+            self.cancel()
+            raise
+
+    async def results(self) -> typing.List[BatchItem[T]]:
+        """Wait for every call and return the items in input order."""
+        self._start()
+        try:
+            await asyncio.gather(*self._tasks)
+        except BaseException:
+            self.cancel()
+            raise
+        return self.items
+
+    def __await__(self):
+        return self.results().__await__()
+
+    def cancel(self) -> None:
+        """Cancel the calls that haven't finished."""
+        for task in self._tasks:
+            task.cancel()
+
+
+class BamlBatchClient:
+    """`b.batch` of the async client: b.batch.<Function>(inputs, ...) is a BatchRun of b.<Function>."""
+
+    def __init__(self, client: typing.Any):
+        self.__client = client
+
+    def __getattr__(self, name: str) -> typing.Callable[..., BatchRun]:
+        call = getattr(self.__client, name)
+        if name.startswith("_") or not asyncio.iscoroutinefunction(call):
+            raise AttributeError(f"{name} is not a BAML function of the async client")
+
+        def batch(inputs: typing.Iterable[typing.Any], max_concurrency: int = 8,
+                  rate_limit: typing.Optional[float] = None, baml_options: typing.Optional[dict] = None) -> BatchRun:
+            return BatchRun(call, inputs, max_concurrency, rate_limit, baml_options)
+        batch.__name__ = batch.__qualname__ = name
+        return batch
@@ -0,0 +1,396 @@
+"""Call manager for the extended clients, on top of the generated one.
+
+runtime.DoNotUseDirectlyCallManager is generated and resolves its options
+on every call: it copies os.environ, re-merges the `env` overrides and
+rebuilds the collectors list. CallManager keeps its behaviour and adds:
+
+- resolved options memoized per manager, and the environment copy shared
+  between managers until a relevant variable changes (RELEVANT_ENV_KEYS)
+- per-client rate limits (rate_limit.py) and hedged calls (hedging.py)
+- the `raw`, `stream_throttle` and `stream_deltas` call options (CallOptions)
+
+Use it through extended_client.sync_b / async_b, which pass it to the
+generated clients:
+
+    from baml_client.extended_client import sync_b
+
+    sync_b.DecideAction(messages, None, baml_options={"raw": True})
+"""
+import os
+import re
+import threading
+import typing
+
+import baml_py
+import typing_extensions
+
+from . import hedging, rate_limit, raw_types
+from .globals import DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_RUNTIME as _runtime
+from .globals import DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_CTX as _ctx_manager
+from .inlinedbaml import get_baml_files
+from .runtime import BamlCallOptions, DoNotUseDirectlyCallManager, _ResolvedBamlOptions
+from .stream_throttle import StreamThrottle
+
+
+class CallOptions(BamlCallOptions, total=False):
+    stream_throttle: typing_extensions.NotRequired[StreamThrottle]
+    stream_deltas: typing_extensions.NotRequired[bool]
+    raw: typing_extensions.NotRequired[bool]  # Plain dicts instead of Pydantic models, see raw_types.py
+    rate_limit_client: typing_extensions.NotRequired[str]  # Client whose limits apply, see rate_limit.py
+
+
+# Environment variables whose value can change the result of a call: the ones
+# referenced as env.NAME in the BAML sources, plus the runtime's own settings.
+RELEVANT_ENV_KEYS: typing.Tuple[str, ...] = tuple(sorted(
+    {
+        match.group(1)
+        for source in get_baml_files().values()
+        for match in re.finditer(r"\benv\.([A-Za-z_][A-Za-z0-9_]*)", source)
+    }
+    | {
+        "BAML_LOG",
+        "BAML_LOG_JSON",
+        "BAML_LOG_MAX_CHUNK_LENGTH",
+        "BOUNDARY_API_KEY",
+        "BOUNDARY_PROJECT_ID",
+        "BOUNDARY_BASE_URL",
+    }
+))
+
+# Bumped by invalidate_resolved_options to force every manager to re-resolve
+_options_generation = 0
+_env_lock = threading.Lock()
+_env_snapshot: typing.Optional[typing.Tuple[typing.Tuple[typing.Any, ...], typing.Dict[str, str]]] = None
+# len(os.environ) when last checked, and the RELEVANT_ENV_KEYS set then
+_present_keys: typing.Tuple[int, typing.Tuple[str, ...]] = (-1, ())
+
+
+def _env_fingerprint() -> typing.Tuple[typing.Any, ...]:
+    """Cheap key that changes when a relevant environment variable changes.
+
+    Reads the RELEVANT_ENV_KEYS that are set, plus the number of variables so
+    that adding or removing any variable is noticed too. Unset keys are only
+    looked up again when that number changes, since a lookup that misses is
+    the slow path of os.environ.
+    """
+    global _present_keys
+    environ = os.environ
+    size = len(environ)
+    counted, keys = _present_keys
+    if counted != size:
+        keys = tuple(key for key in RELEVANT_ENV_KEYS if key in environ)
+        _present_keys = (size, keys)
+    return (_options_generation, size, *[environ.get(key) for key in keys])
+
+
+def _environ_copy(fingerprint: typing.Tuple[typing.Any, ...]) -> typing.Dict[str, str]:
+    """os.environ.copy(), shared between calls while the fingerprint is unchanged.
+
+    The copy is passed to the runtime read-only and must not be mutated.
+    """
+    global _env_snapshot
+    snapshot = _env_snapshot
+    if snapshot is not None and snapshot[0] == fingerprint:
+        return snapshot[1]
+    with _env_lock:
+        env_vars = os.environ.copy()
+        _env_snapshot = (fingerprint, env_vars)
+    return env_vars
+
+
+def invalidate_resolved_options() -> None:
+    """Make every call manager resolve its options again on the next call.
+
+    Needed only after changing an environment variable that is not in
+    RELEVANT_ENV_KEYS, or setting a relevant one, without changing the number
+    of variables.
+    """
+    global _options_generation, _env_snapshot
+    with _env_lock:
+        _options_generation += 1
+        _env_snapshot = None
+
+
+class _EnvVars:
+    """The environment with a manager's `env` overrides applied.
+
+    Shared by the managers merged from one another without changing `env`,
+    so per-call merges don't copy the environment again.
+    """
+
+    __slots__ = ("overrides", "_cached")
+
+    def __init__(self, overrides: typing.Dict[str, typing.Optional[str]]):
+        self.overrides = overrides
+        self._cached: typing.Optional[typing.Tuple[typing.Tuple[typing.Any, ...], typing.Dict[str, str]]] = None
+
+    def get(self, fingerprint: typing.Tuple[typing.Any, ...]) -> typing.Dict[str, str]:
+        cached = self._cached
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        env_vars = _environ_copy(fingerprint)
+        if self.overrides:
+            env_vars = dict(env_vars)
+            for k, v in self.overrides.items():
+                if v is not None:
+                    env_vars[k] = v
+                else:
+                    env_vars.pop(k, None)
+        self._cached = (fingerprint, env_vars)
+        return env_vars
+
+
+def _collectors(collector: typing.Any) -> typing.List[baml_py.baml_py.Collector]:
+    if isinstance(collector, list):
+        return list(collector)
+    return [collector] if collector is not None else []
+
+
+class CallManager(DoNotUseDirectlyCallManager):
+    def __init__(self, baml_options: CallOptions, env_vars: typing.Optional[_EnvVars] = None):
+        super().__init__(baml_options)
+        self.__options = baml_options
+        self.__env_vars = env_vars if env_vars is not None else _EnvVars(baml_options.get("env", {}))
+        self.__resolved: typing.Optional[typing.Tuple[typing.Tuple[typing.Any, ...], _ResolvedBamlOptions]] = None
+
+    def __setstate__(self, state):
+        self.__init__(state["baml_options"])
+
+    @property
+    def options(self) -> CallOptions:
+        """The call options of this manager; treat as read-only."""
+        return self.__options
+
+    def merge_options(self, options: CallOptions) -> "CallManager":
+        if not options:
+            return self
+        merged: CallOptions = {**self.__options, **options}  # type: ignore[misc]
+        env_unchanged = "env" not in options or options["env"] == self.__env_vars.overrides
+        return CallManager(merged, self.__env_vars if env_unchanged else None)
+
+    def __resolve(self) -> _ResolvedBamlOptions:
+        """The generated resolution, reusing the last result while the
+        environment is unchanged."""
+        fingerprint = _env_fingerprint()
+        resolved = self.__resolved
+        if resolved is not None and resolved[0] == fingerprint:
+            return resolved[1]
+        options = self.__options
+        tb = options.get("tb")
+        collectors = _collectors(options.get("collector"))
+        on_tick = options.get("on_tick")
+        on_tick_wrapper = None
+        if on_tick is not None:
+            on_tick_collector = baml_py.baml_py.Collector("on-tick-collector")
+            collectors.append(on_tick_collector)
+
+            def on_tick_wrapper():
+                log = on_tick_collector.last
+                if log is not None:
+                    on_tick("Unknown", log)
+
+        result = _ResolvedBamlOptions(
+            tb._tb if tb is not None else None,  # type: ignore (we know how to use this private attribute)
+            options.get("client_registry"),
+            collectors,
+            self.__env_vars.get(fingerprint),
+            options.get("tags", {}) or {},
+            options.get("abort_controller"),
+            on_tick_wrapper,
+            options.get("watchers"),
+        )
+        if on_tick is None:
+            # on_tick needs a fresh collector per call
+            self.__resolved = (fingerprint, result)
+        return result
+
+    # The generated call paths resolve through their private __resolve
+    _DoNotUseDirectlyCallManager__resolve = __resolve
+
+    def __limiter(self, function_name: str, client_name: typing.Optional[str] = None) -> typing.Optional[rate_limit.ClientLimiter]:
+        """Limiter of the client the call goes to, if it is limited.
+
+        A client_registry's choice of client can't be inspected, so those calls
+        count against rate_limit_client, else the function's own client.
+        """
+        client_name = client_name or self.__options.get("rate_limit_client")
+        if client_name is not None:
+            return rate_limit.limiter_for_client(client_name)
+        return rate_limit.limiter_for_function(function_name)
+
+    def __leg(
+        self,
+        client_name: typing.Optional[str],
+        abort_controller: typing.Optional[baml_py.baml_py.AbortController],
+        tags: typing.Optional[typing.Dict[str, str]],
+        usage_collector: typing.Optional[baml_py.baml_py.Collector],
+    ) -> "CallManager":
+        """This manager with the client, controller, tags and extra collector of one request."""
+        options: CallOptions = {**self.__options}  # type: ignore[misc]
+        if client_name is not None:
+            options["client_registry"] = hedging.client_registry(client_name)
+        if abort_controller is not None:
+            options["abort_controller"] = abort_controller
+        if tags is not None:
+            options["tags"] = tags
+        if usage_collector is not None:
+            options["collector"] = [*_collectors(options.get("collector")), usage_collector]
+        return CallManager(options, self.__env_vars)
+
+    def __raw(self, result: typing.Any) -> typing.Any:
+        return _RawResult(result) if self.__options.get("raw") else result
+
+    async def call_function_async(
+        self, *, function_name: str, args: typing.Dict[str, typing.Any]
+    ) -> baml_py.baml_py.FunctionResult:
+        hedge = hedging.hedge_for_function(function_name) if self.__options.get("client_registry") is None else None
+        if hedge is not None:
+            async def leg(client_name, abort_controller, hedge_tags):
+                tags = {**(self.__options.get("tags") or {}), **hedge_tags}
+                return await self.__call_async(function_name, args, client_name, abort_controller, tags)
+            return self.__raw(await hedge.call_async(leg, self.__options.get("abort_controller")))
+        return self.__raw(await self.__call_async(function_name, args))
+
+    async def __call_async(
+        self,
+        function_name: str,
+        args: typing.Dict[str, typing.Any],
+        client_name: typing.Optional[str] = None,
+        abort_controller: typing.Optional[baml_py.baml_py.AbortController] = None,
+        tags: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> baml_py.baml_py.FunctionResult:
+        """One runtime call, to client_name if given, else to the function's client."""
+        limiter = self.__limiter(function_name, client_name)
+        if limiter is None:
+            manager = self if client_name is None and tags is None else self.__leg(client_name, abort_controller, tags, None)
+            return await DoNotUseDirectlyCallManager.call_function_async(manager, function_name=function_name, args=args)
+        usage_collector = limiter.usage_collector()
+        manager = self.__leg(client_name, abort_controller, tags, usage_collector)
+        reservation = await limiter.acquire_async(
+            limiter.estimate(args), abort_controller or self.__options.get("abort_controller")
+        )
+        try:
+            return await DoNotUseDirectlyCallManager.call_function_async(manager, function_name=function_name, args=args)
+        finally:
+            reservation.release(usage_collector)
+
+    def call_function_sync(
+        self, *, function_name: str, args: typing.Dict[str, typing.Any]
+    ) -> baml_py.baml_py.FunctionResult:
+        hedge = hedging.hedge_for_function(function_name) if self.__options.get("client_registry") is None else None
+        if hedge is not None:
+            def leg(client_name, abort_controller, hedge_tags):
+                tags = {**(self.__options.get("tags") or {}), **hedge_tags}
+                return self.__call_sync(function_name, args, client_name, abort_controller, tags)
+            return self.__raw(hedge.call_sync(leg, self.__options.get("abort_controller")))
+        return self.__raw(self.__call_sync(function_name, args))
+
+    def __call_sync(
+        self,
+        function_name: str,
+        args: typing.Dict[str, typing.Any],
+        client_name: typing.Optional[str] = None,
+        abort_controller: typing.Optional[baml_py.baml_py.AbortController] = None,
+        tags: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> baml_py.baml_py.FunctionResult:
+        """One runtime call, to client_name if given, else to the function's client."""
+        limiter = self.__limiter(function_name, client_name)
+        if limiter is None:
+            manager = self if client_name is None and tags is None else self.__leg(client_name, abort_controller, tags, None)
+            return DoNotUseDirectlyCallManager.call_function_sync(manager, function_name=function_name, args=args)
+        usage_collector = limiter.usage_collector()
+        manager = self.__leg(client_name, abort_controller, tags, usage_collector)
+        reservation = limiter.acquire(limiter.estimate(args), abort_controller or self.__options.get("abort_controller"))
+        try:
+            return DoNotUseDirectlyCallManager.call_function_sync(manager, function_name=function_name, args=args)
+        finally:
+            reservation.release(usage_collector)
+
+    def create_async_stream(
+        self,
+        *,
+        function_name: str,
+        args: typing.Dict[str, typing.Any],
+    ) -> typing.Tuple[baml_py.baml_py.RuntimeContextManager, baml_py.baml_py.FunctionResultStream]:
+        return self.__create_stream(function_name, args, is_async=True)
+
+    def create_sync_stream(
+        self,
+        *,
+        function_name: str,
+        args: typing.Dict[str, typing.Any],
+    ) -> typing.Tuple[baml_py.baml_py.RuntimeContextManager, baml_py.baml_py.SyncFunctionResultStream]:
+        return self.__create_stream(function_name, args, is_async=False)
+
+    def __create_stream(self, function_name: str, args: typing.Dict[str, typing.Any], is_async: bool) -> typing.Any:
+        limiter = self.__limiter(function_name)
+        usage_collector = limiter.usage_collector() if limiter is not None else None
+        manager = self if usage_collector is None else self.__leg(None, None, None, usage_collector)
+        create = DoNotUseDirectlyCallManager.create_async_stream if is_async else DoNotUseDirectlyCallManager.create_sync_stream
+        ctx, result = create(manager, function_name=function_name, args=args)
+        if limiter is not None:
+            # The request starts when the stream is driven, so the slot is taken then
+            result = rate_limit.LimitedStream(
+                result, limiter, limiter.estimate(args), self.__options.get("abort_controller"), usage_collector, is_async
+            )
+        if self.__options.get("raw"):
+            result = _RawStream(result, is_async)
+        return ctx, result
+
+    def parse_response(self, *, function_name: str, llm_response: str, mode: typing_extensions.Literal["stream", "request"]) -> typing.Any:
+        if not self.__options.get("raw"):
+            return super().parse_response(function_name=function_name, llm_response=llm_response, mode=mode)
+        resolved_options = self.__resolve()
+        return _runtime.parse_llm_response(
+            function_name,
+            llm_response,
+            # enum_module, cls_module, partial_cls_module
+            raw_types,
+            raw_types,
+            raw_types,
+            # allow_partials
+            mode == "stream",
+            _ctx_manager.get(),
+            resolved_options.tb,
+            resolved_options.client_registry,
+            resolved_options.env_vars,
+        )
+
+
+class _RawResult:
+    """A FunctionResult that casts to raw_types, whatever modules the generated client passes."""
+
+    __slots__ = ("_result",)
+
+    def __init__(self, result: baml_py.baml_py.FunctionResult):
+        self._result = result
+
+    def cast_to(self, enum_module: typing.Any, cls_module: typing.Any, partial_cls_module: typing.Any,
+                allow_partials: bool, runtime: typing.Any) -> typing.Any:
+        return self._result.cast_to(raw_types, raw_types, raw_types, allow_partials, runtime)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._result, name)
+
+
+class _RawStream:
+    """Wraps a runtime stream so its events and final result are _RawResults."""
+
+    def __init__(self, stream: typing.Any, is_async: bool):
+        self._stream = stream
+        self._is_async = is_async
+
+    def on_event(self, callback: typing.Any) -> "_RawStream":
+        self._stream = self._stream.on_event(None if callback is None else lambda result: callback(_RawResult(result)))
+        return self
+
+    def done(self, ctx: typing.Any) -> typing.Any:
+        if self._is_async:
+            return self._done_async(ctx)
+        return _RawResult(self._stream.done(ctx))
+
+    async def _done_async(self, ctx: typing.Any) -> typing.Any:
+        return _RawResult(await self._stream.done(ctx))
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._stream, name)
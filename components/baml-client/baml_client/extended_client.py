@@ -0,0 +1,162 @@
+"""The generated BAML clients with this repo's extra call options.
+
+sync_b and async_b work like sync_client.b and async_client.b, but run on a
+call_manager.CallManager. That adds the `raw`, `stream_throttle` and
+`stream_deltas` options, rate limits and hedging, and `b.batch` on the
+async client:
+
+    from baml_client.extended_client import async_b, sync_b
+
+    sync_b.CodeLocator(messages, baml_options={"raw": True})
+    stream = sync_b.with_options(stream_deltas=True).stream.ChatAgent(messages)
+    items = await async_b.batch.CodeLocator([{"messages": m} for m in dataset])
+
+The generated modules stay as baml-cli writes them; everything extra lives
+here, in call_manager.py and in the modules they import.
+"""
+import functools
+import typing
+
+import baml_py
+
+from . import async_client, sync_client, type_builder
+from .batch import BamlBatchClient
+from .call_manager import CallManager, CallOptions
+from .stream_delta import DeltaStream, DeltaSyncStream
+from .stream_throttle import StreamThrottle, ThrottledStream, ThrottledSyncStream
+
+
+def wrap_stream(stream: typing.Any, options: CallOptions) -> typing.Any:
+    """Apply the stream options (stream_throttle, stream_deltas) to a BamlStream or BamlSyncStream."""
+    is_sync = isinstance(stream, baml_py.BamlSyncStream)
+    throttle = options.get("stream_throttle")
+    if throttle is not None:
+        stream = ThrottledSyncStream(stream, throttle) if is_sync else ThrottledStream(stream, throttle)
+    if options.get("stream_deltas"):
+        stream = DeltaSyncStream(stream) if is_sync else DeltaStream(stream)
+    return stream
+
+
+class _StreamClient:
+    """A generated BamlStreamClient whose streams get wrap_stream applied."""
+
+    def __init__(self, stream_client: typing.Any, manager: CallManager):
+        self.__stream_client = stream_client
+        self.__manager = manager
+
+    def __getattr__(self, name: str) -> typing.Any:
+        method = getattr(self.__stream_client, name)
+        if name.startswith("_") or not callable(method):
+            return method
+
+        @functools.wraps(method)
+        def stream(*args, baml_options: CallOptions = {}, **kwargs):
+            options = self.__manager.merge_options(baml_options).options
+            return wrap_stream(method(*args, baml_options=baml_options, **kwargs), options)
+        return stream
+
+
+def _extended_options(
+    tb: typing.Optional[type_builder.TypeBuilder],
+    client_registry: typing.Optional[baml_py.baml_py.ClientRegistry],
+    collector: typing.Optional[typing.Union[baml_py.baml_py.Collector, typing.List[baml_py.baml_py.Collector]]],
+    env: typing.Optional[typing.Dict[str, typing.Optional[str]]],
+    tags: typing.Optional[typing.Dict[str, str]],
+    on_tick: typing.Optional[typing.Callable[[str, baml_py.baml_py.FunctionLog], None]],
+    stream_throttle: typing.Optional[StreamThrottle],
+    stream_deltas: typing.Optional[bool],
+    raw: typing.Optional[bool],
+) -> CallOptions:
+    given = {
+        "tb": tb,
+        "client_registry": client_registry,
+        "collector": collector,
+        "env": env,
+        "tags": tags,
+        "on_tick": on_tick,
+        "stream_throttle": stream_throttle,
+        "stream_deltas": stream_deltas,
+        "raw": raw,
+    }
+    return typing.cast(CallOptions, {name: value for name, value in given.items() if value is not None})
+
+
+class ExtendedSyncClient(sync_client.BamlSyncClient):
+    def __init__(self, options: CallManager):
+        super().__init__(options)
+        self.__manager = options
+        self.__stream_client = _StreamClient(super().stream, options)
+
+    def __getstate__(self):
+        return {"options": self.__manager}
+
+    def __setstate__(self, state):
+        self.__init__(state["options"])
+
+    @property
+    def options(self) -> CallOptions:
+        """Options every call of this client starts from."""
+        return self.__manager.options
+
+    def with_options(self,
+        tb: typing.Optional[type_builder.TypeBuilder] = None,
+        client_registry: typing.Optional[baml_py.baml_py.ClientRegistry] = None,
+        collector: typing.Optional[typing.Union[baml_py.baml_py.Collector, typing.List[baml_py.baml_py.Collector]]] = None,
+        env: typing.Optional[typing.Dict[str, typing.Optional[str]]] = None,
+        tags: typing.Optional[typing.Dict[str, str]] = None,
+        on_tick: typing.Optional[typing.Callable[[str, baml_py.baml_py.FunctionLog], None]] = None,
+        stream_throttle: typing.Optional[StreamThrottle] = None,
+        stream_deltas: typing.Optional[bool] = None,
+        raw: typing.Optional[bool] = None,
+    ) -> "ExtendedSyncClient":
+        options = _extended_options(tb, client_registry, collector, env, tags, on_tick, stream_throttle, stream_deltas, raw)
+        return ExtendedSyncClient(self.__manager.merge_options(options))
+
+    @property
+    def stream(self):
+        return self.__stream_client
+
+
+class ExtendedAsyncClient(async_client.BamlAsyncClient):
+    def __init__(self, options: CallManager):
+        super().__init__(options)
+        self.__manager = options
+        self.__stream_client = _StreamClient(super().stream, options)
+        self.__batch_client = BamlBatchClient(self)
+
+    def __getstate__(self):
+        return {"options": self.__manager}
+
+    def __setstate__(self, state):
+        self.__init__(state["options"])
+
+    @property
+    def options(self) -> CallOptions:
+        """Options every call of this client starts from."""
+        return self.__manager.options
+
+    def with_options(self,
+        tb: typing.Optional[type_builder.TypeBuilder] = None,
+        client_registry: typing.Optional[baml_py.baml_py.ClientRegistry] = None,
+        collector: typing.Optional[typing.Union[baml_py.baml_py.Collector, typing.List[baml_py.baml_py.Collector]]] = None,
+        env: typing.Optional[typing.Dict[str, typing.Optional[str]]] = None,
+        tags: typing.Optional[typing.Dict[str, str]] = None,
+        on_tick: typing.Optional[typing.Callable[[str, baml_py.baml_py.FunctionLog], None]] = None,
+        stream_throttle: typing.Optional[StreamThrottle] = None,
+        stream_deltas: typing.Optional[bool] = None,
+        raw: typing.Optional[bool] = None,
+    ) -> "ExtendedAsyncClient":
+        options = _extended_options(tb, client_registry, collector, env, tags, on_tick, stream_throttle, stream_deltas, raw)
+        return ExtendedAsyncClient(self.__manager.merge_options(options))
+
+    @property
+    def stream(self):
+        return self.__stream_client
+
+    @property
+    def batch(self) -> BamlBatchClient:
+        return self.__batch_client
+
+
+sync_b = ExtendedSyncClient(CallManager({}))
+async_b = ExtendedAsyncClient(CallManager({}))
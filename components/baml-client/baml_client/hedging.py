@@ -0,0 +1,403 @@
+"""Hedged requests: race a backup client against a slow primary.
+
+Hedges are declared next to the clients, as comments in clients.baml. The
+one there is commented out; remove its leading `// ` to turn it on:
+
+    // hedge GLMCodingA -> FreeGLM45Air delay_ms 15000 percentile 95
+
+A call through the extended clients (extended_client.py) to a function
+whose client is GLMCodingA then starts as usual. If it hasn't returned a
+parsed result after the hedge delay, the same call is also sent to
+FreeGLM45Air, and the first of the two to parse wins. The other
+is aborted through its own AbortController. A primary that fails before the
+delay starts the backup right away, so the hedge doubles as a fallback.
+
+The delay is `delay_ms`. With `percentile`, it becomes that percentile of the
+primary's recent latencies once enough calls have been seen, e.g. p95 hedges
+about one call in twenty.
+
+Both requests are sent with the call's collectors and tags, plus a `hedge`
+tag ("primary" or "backup") and a `hedge_call` tag shared by the legs of one
+call, so each FunctionLog shows which leg it was. hedge_stats(collector) counts
+the hedged calls and wins in a collector's logs.
+
+Sync calls run the primary on the calling thread, so the delay starts with
+the request; one watcher thread starts the backups.
+
+Only direct calls are hedged. Streams, and calls with a client_registry
+option, always go to a single client.
+"""
+import asyncio
+import concurrent.futures
+import itertools
+import re
+import threading
+import time
+import typing
+from collections import deque
+
+import baml_py
+
+from .baml_sources import function_clients
+from .inlinedbaml import get_baml_files
+
+_HEDGE_RE = re.compile(r"^\s*//\s*hedge\s+([\w-]+)\s*->\s*([\w-]+)((?:\s+\w+\s+[\d.]+)*)\s*$", re.MULTILINE)
+
+# Primary latencies kept for percentile delays, and how many are needed first
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+# Longest single wait, so the caller's abort is noticed promptly
+_POLL_INTERVAL = 0.1
+
+PRIMARY = "primary"
+BACKUP = "backup"
+
+T = typing.TypeVar("T")
+
+
+class HedgePolicy(typing.NamedTuple):
+    primary: str
+    backup: str
+    delay_ms: float = 10_000
+    percentile: typing.Optional[float] = None
+
+
+def declared_hedges() -> typing.Dict[str, HedgePolicy]:
+    """Hedge policies declared in the BAML sources, by primary client name."""
+    policies = {}
+    for source in get_baml_files().values():
+        for match in _HEDGE_RE.finditer(source):
+            words = match.group(3).split()
+            settings = {name: float(value) for name, value in zip(words[::2], words[1::2])}
+            unknown = set(settings) - {"delay_ms", "percentile"}
+            if unknown:
+                raise ValueError(f"Unknown hedge setting(s) {', '.join(sorted(unknown))} in: {match.group(0).strip()}")
+            policies[match.group(1)] = HedgePolicy(match.group(1), match.group(2), **settings)
+    return policies
+
+
+class Hedge:
+    """Runs calls to one primary client, hedged with a backup client."""
+
+    def __init__(self, policy: HedgePolicy):
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._latencies: typing.Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary before sending the backup."""
+        percentile = self.policy.percentile
+        with self._lock:
+            latencies = sorted(self._latencies) if len(self._latencies) >= MIN_LATENCY_SAMPLES else None
+        if percentile is not None and latencies is not None:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+        return self.policy.delay_ms / 1000
+
+    def _record(self, primary_latency: float) -> None:
+        # A primary that lost is recorded with the time it had taken so far,
+        # a lower bound that keeps slow calls in the percentile
+        with self._lock:
+            self._latencies.append(primary_latency)
+
+    def _leg_args(self, name: str, call_id: str) -> typing.Tuple[typing.Optional[str], baml_py.AbortController,
+                                                                  typing.Dict[str, str]]:
+        client_name = None if name == PRIMARY else self.policy.backup
+        return client_name, baml_py.AbortController(), {"hedge": name, "hedge_call": call_id}
+
+    async def call_async(self, leg: typing.Callable[..., typing.Awaitable[T]],
+                         abort_controller: typing.Optional[baml_py.AbortController] = None) -> T:
+        """Run leg(client_name, abort_controller, tags) for the primary and, if needed, the backup.
+
+        client_name is None for the primary (the function's own client), tags
+        are the hedge tags to add to the call's own. Returns the first result
+        that parsed, else the primary's outcome.
+        """
+        call_id = str(next(_call_ids))
+        legs: typing.Dict[asyncio.Future, typing.Tuple[str, baml_py.AbortController]] = {}
+
+        def start_leg(name: str) -> asyncio.Future:
+            client_name, controller, tags = self._leg_args(name, call_id)
+            task = asyncio.ensure_future(leg(client_name, controller, tags))
+            task.add_done_callback(_consume)
+            legs[task] = (name, controller)
+            return task
+
+        start = time.monotonic()
+        primary = start_leg(PRIMARY)
+        primary_done_at = None
+        pending = {primary}
+        try:
+            while pending:
+                _check_aborted(abort_controller)
+                timeout = _POLL_INTERVAL if abort_controller is not None else None
+                if len(legs) == 1:
+                    remaining = max(0.0, start + self.delay() - time.monotonic())
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda task: legs[task][0] != PRIMARY):
+                    if task is primary:
+                        primary_done_at = time.monotonic()
+                    if _parsed(task.exception(), None if task.exception() else task.result()):
+                        self._record((primary_done_at or time.monotonic()) - start)
+                        return task.result()
+                if len(legs) == 1 and (primary.done() or time.monotonic() - start >= self.delay()):
+                    pending.add(start_leg(BACKUP))
+            self._record(primary_done_at - start)
+            return primary.result()
+        finally:
+            for task, (_, controller) in legs.items():
+                if not task.done():
+                    controller.abort()
+
+    def call_sync(self, leg: typing.Callable[..., T],
+                  abort_controller: typing.Optional[baml_py.AbortController] = None) -> T:
+        """Blocking version of call_async.
+
+        The primary runs on the calling thread. The backup runs on a thread pool
+        when the shared watcher thread starts it after the delay, or on the
+        calling thread when the primary failed first.
+        """
+        call = _SyncCall(self, leg, abort_controller)
+        watcher = _watcher()
+        watcher.add(call)
+        try:
+            return call.run()
+        finally:
+            watcher.remove(call)
+
+
+class _SyncCall:
+    """One hedged sync call, shared by the calling thread, the backup's thread and the watcher."""
+
+    def __init__(self, hedge: Hedge, leg: typing.Callable[..., typing.Any],
+                 abort_controller: typing.Optional[baml_py.AbortController]):
+        self.hedge = hedge
+        self.leg = leg
+        self.abort_controller = abort_controller
+        self.call_id = str(next(_call_ids))
+        self.lock = threading.Lock()
+        self.controllers: typing.Dict[str, baml_py.AbortController] = {}
+        self.primary_done = False
+        self.backup: typing.Optional[concurrent.futures.Future] = None
+        self.winner: typing.Optional[str] = None
+        self.start = time.monotonic()
+        self.backup_at = self.start + hedge.delay()
+
+    def run(self) -> typing.Any:
+        primary = self._run_leg(PRIMARY)
+        with self.lock:
+            self.primary_done = True
+            fallback = self.winner is None and self.backup is None
+            if fallback:
+                self.backup = concurrent.futures.Future()
+        self.hedge._record(time.monotonic() - self.start)
+        if self.winner == PRIMARY:
+            return _outcome(primary)
+        if fallback:
+            _check_aborted(self.abort_controller)
+            self.backup.set_result(self._run_leg(BACKUP))
+        if self.backup is not None:
+            backup = self.backup.result()
+            if self.winner == BACKUP:
+                return _outcome(backup)
+        _check_aborted(self.abort_controller)
+        return _outcome(primary)
+
+    def _run_leg(self, name: str) -> typing.Tuple[typing.Any, typing.Optional[BaseException]]:
+        """Run one leg on this thread; the first leg whose result parsed aborts the other."""
+        client_name, controller, tags = self.hedge._leg_args(name, self.call_id)
+        with self.lock:
+            self.controllers[name] = controller
+            if self.winner is not None:
+                controller.abort()
+        try:
+            outcome = (self.leg(client_name, controller, tags), None)
+        except BaseException as error:
+            outcome = (None, error)
+        if _parsed(outcome[1], outcome[0]):
+            with self.lock:
+                if self.winner is None:
+                    self.winner = name
+                    for other, other_controller in self.controllers.items():
+                        if other != name:
+                            other_controller.abort()
+        return outcome
+
+    def poll(self, now: float) -> typing.Optional[float]:
+        """Start the backup once the delay is up, and pass an abort of the caller on to the legs.
+
+        Called by the watcher. Returns the seconds until the call needs another
+        poll, or None if it needs none.
+        """
+        with self.lock:
+            if self.winner is not None:
+                return None
+            if self.abort_controller is not None and self.abort_controller.aborted:
+                for controller in self.controllers.values():
+                    controller.abort()
+                return None
+            wait = None
+            if self.backup is None and not self.primary_done:
+                if now >= self.backup_at:
+                    self.backup = _executor().submit(self._run_leg, BACKUP)
+                else:
+                    wait = self.backup_at - now
+            if self.abort_controller is not None:
+                wait = _POLL_INTERVAL if wait is None else min(wait, _POLL_INTERVAL)
+            return wait
+
+
+class _Watcher:
+    """One thread that starts the backups of hedged sync calls and passes on their callers' aborts."""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._calls: typing.Set[_SyncCall] = set()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def add(self, call: _SyncCall) -> None:
+        with self._changed:
+            self._calls.add(call)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="baml-hedge-watcher", daemon=True)
+                self._thread.start()
+            self._changed.notify()
+
+    def remove(self, call: _SyncCall) -> None:
+        with self._changed:
+            self._calls.discard(call)
+
+    def _run(self) -> None:
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                waits = [wait for wait in (call.poll(now) for call in self._calls) if wait is not None]
+                self._changed.wait(min(waits) if waits else None)
+
+
+def _outcome(outcome: typing.Tuple[typing.Any, typing.Optional[BaseException]]) -> typing.Any:
+    result, error = outcome
+    if error is not None:
+        raise error
+    return result
+
+
+def _parsed(error: typing.Optional[BaseException], result: typing.Any) -> bool:
+    """Whether a leg returned a result that parsed."""
+    if error is not None:
+        return False
+    is_ok = getattr(result, "is_ok", None)
+    return is_ok() if is_ok is not None else True
+
+
+def _consume(task: asyncio.Future) -> None:
+    # Retrieve the exception of an abandoned leg, so asyncio doesn't warn about it
+    if not task.cancelled():
+        task.exception()
+
+
+def _check_aborted(abort_controller: typing.Optional[baml_py.AbortController]) -> None:
+    if abort_controller is not None and abort_controller.aborted:
+        raise baml_py.baml_py.BamlAbortError("Operation was aborted")
+
+
+_hedges: typing.Optional[typing.Dict[str, Hedge]] = None
+_registries: typing.Dict[str, baml_py.ClientRegistry] = {}
+_pool: typing.Optional[concurrent.futures.ThreadPoolExecutor] = None
+_sync_watcher: typing.Optional[_Watcher] = None
+_call_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+def _executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="baml-hedge")
+        return _pool
+
+
+def _watcher() -> _Watcher:
+    global _sync_watcher
+    with _lock:
+        if _sync_watcher is None:
+            _sync_watcher = _Watcher()
+        return _sync_watcher
+
+
+def _all_hedges() -> typing.Dict[str, Hedge]:
+    global _hedges
+    if _hedges is None:
+        with _lock:
+            if _hedges is None:
+                _hedges = {name: Hedge(policy) for name, policy in declared_hedges().items()}
+    return _hedges
+
+
+def hedge_for_function(function_name: str) -> typing.Optional[Hedge]:
+    """Hedge of the client a BAML function calls, if one is declared."""
+    hedges = _all_hedges()
+    if not hedges:
+        return None
+    client_name = function_clients().get(function_name)
+    return hedges.get(client_name) if client_name is not None else None
+
+
+def client_registry(client_name: str) -> baml_py.ClientRegistry:
+    """A registry that routes calls to client_name."""
+    with _lock:
+        registry = _registries.get(client_name)
+        if registry is None:
+            registry = _registries[client_name] = baml_py.ClientRegistry()
+            registry.set_primary(client_name)
+        return registry
+
+
+def hedge_stats(collector: baml_py.Collector) -> typing.Dict[str, typing.Dict[str, int]]:
+    """Stats of the hedged calls logged by collector, by primary client.
+
+    Counts calls, hedged (calls that also went to the backup), primary_wins,
+    backup_wins and failures (neither leg returned a parsed result). A leg won
+    if its response parsed and it finished before any other leg whose did.
+    """
+    calls: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for log in collector.logs:
+        call_id = log.tags.get("hedge_call")
+        if call_id is not None:
+            calls.setdefault(call_id, {})[log.tags.get("hedge")] = log
+    stats: typing.Dict[str, typing.Dict[str, int]] = {}
+    for legs in calls.values():
+        primary = legs.get(PRIMARY)
+        if primary is None:
+            continue
+        client_stats = stats.setdefault(function_clients().get(primary.function_name, primary.function_name), {
+            "calls": 0, "hedged": 0, "primary_wins": 0, "backup_wins": 0, "failures": 0,
+        })
+        client_stats["calls"] += 1
+        client_stats["hedged"] += BACKUP in legs
+        parsed = [(_finished_at(log), name != PRIMARY, name) for name, log in legs.items() if _log_parsed(log)]
+        if parsed:
+            client_stats[f"{min(parsed)[2]}_wins"] += 1
+        else:
+            client_stats["failures"] += 1
+    return stats
+
+
+def _finished_at(log: typing.Any) -> int:
+    timing = log.timing
+    return timing.start_time_utc_ms + (timing.duration_ms or 0)
+
+
+def _log_parsed(log: typing.Any) -> bool:
+    """Whether the response in a FunctionLog parses as its function's return type."""
+    raw = log.raw_llm_response
+    if raw is None:
+        return False
+    from .sync_client import b
+
+    try:
+        getattr(b.parse, log.function_name)(raw)
+    except baml_py.baml_py.BamlError:
+        return False
+    return True
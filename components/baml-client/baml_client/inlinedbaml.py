@@ -13,7 +13,7 @@
 _file_map = {
 
     "chat.baml": "function ChatAgent(messages: Message[]) -> string {\n  client \"GLMCodingA\"\n  prompt #\"\n    {{ _.role(\"system\") }}\n\n    You are a chat agent that can chat with the user.\n    {% for msg in messages %}\n    {{ _.role(msg.role) }} {{ msg.content }}\n    {% endfor %}\n    \"#\n}\n\ntest chat_agent {\n  functions [ChatAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"hello\"\n    }]\n  }\n}\n",
-    "clients.baml": "client<llm> GLMCodingA {\n  provider \"anthropic\"\n  options {\n    base_url \"https://api.z.ai/api/anthropic\"\n    api_key env.ZAI_API_KEY\n    model \"GLM-4.7\"\n  }\n}\n\nclient<llm> FreeGLM45Air {\n  provider \"openai-generic\"\n  options {\n    base_url \"https://openrouter.ai/api/v1\"\n    api_key env.OPENROUTER_API_KEY\n    model \"z-ai/glm-4.5-air:free\"\n  }\n}\n\nclient<llm> LMStudioQWen3Coder {\n  provider \"openai-generic\"\n  options {\n    base_url \"http://localhost:1234/v1\"\n    model \"qwen/qwen3-coder-30b\"\n  }\n}\n\n// client<llm> LMStudioQWen34B {\n//   provider \"openai-generic\"\n//   options {\n//     base_url \"http://localhost:1234/v1\"\n//     model \"qwen/qwen3-coder-30b\"\n//   }\n// }\n\n// https://docs.boundaryml.com/docs/snippets/clients/retry\nretry_policy Constant {\n  max_retries 3\n  strategy {\n    type constant_delay\n    delay_ms 200\n  }\n}\n\nretry_policy Exponential {\n  max_retries 2\n  strategy {\n    type exponential_backoff\n    delay_ms 300\n    multiplier 1.5\n    max_delay_ms 10000\n  }\n}\n",
+    "clients.baml": "client<llm> GLMCodingA {\n  provider \"anthropic\"\n  options {\n    base_url \"https://api.z.ai/api/anthropic\"\n    api_key env.ZAI_API_KEY\n    model \"GLM-4.7\"\n  }\n}\n\nclient<llm> FreeGLM45Air {\n  provider \"openai-generic\"\n  options {\n    base_url \"https://openrouter.ai/api/v1\"\n    api_key env.OPENROUTER_API_KEY\n    model \"z-ai/glm-4.5-air:free\"\n  }\n}\n\nclient<llm> LMStudioQWen3Coder {\n  provider \"openai-generic\"\n  options {\n    base_url \"http://localhost:1234/v1\"\n    model \"qwen/qwen3-coder-30b\"\n  }\n}\n\n// client<llm> LMStudioQWen34B {\n//   provider \"openai-generic\"\n//   options {\n//     base_url \"http://localhost:1234/v1\"\n//     model \"qwen/qwen3-coder-30b\"\n//   }\n// }\n\n// Hedged requests, read by baml_client/hedging.py: if the first client hasn't\n// returned a parsed result after delay_ms (or, once enough calls were seen,\n// the given percentile of its latencies), the call is also sent to the second\n// client and the first response that parses wins. Off by default; uncomment\n// the line below to hedge GLMCodingA calls.\n// // hedge GLMCodingA -> FreeGLM45Air delay_ms 15000 percentile 95\n\n// https://docs.boundaryml.com/docs/snippets/clients/retry\nretry_policy Constant {\n  max_retries 3\n  strategy {\n    type constant_delay\n    delay_ms 200\n  }\n}\n\nretry_policy Exponential {\n  max_retries 2\n  strategy {\n    type exponential_backoff\n    delay_ms 300\n    multiplier 1.5\n    max_delay_ms 10000\n  }\n}\n",
     "code_locator.baml": "class GrepTool {\n  name \"grep\"\n  pattern string @description(\"The regex pattern to search for in file contents\")\n  path string? @description(\"Optional directory path to search within. If not provided, searches entire codebase\")\n  type string? @description(\"Optional file type filter (e.g., 'js', 'py', 'ts')\")\n}\n\nclass GlobTool {\n  name \"glob_file_search\"\n  glob_pattern string @description(\"The glob pattern to match filenames (e.g., '*test*.js', '*.config.*')\")\n  target_directory string? @description(\"Optional directory to search within. If not provided, searches entire codebase\")\n}\n\nclass ListDirTool {\n  name \"list_dir\"\n  target_directory string? @description(\"Optional directory path to list contents of. If not provided, lists current directory\")\n}\n\nclass LocatorDecision {\n  explanation string? @description(\"Optional explanation of the search strategy or findings\")\n  tool (GrepTool | GlobTool | ListDirTool)? @description(\"Single tool to execute for searching the codebase. Use when you need to search. Execute one tool at a time.\")\n  findings string? @description(\"Final structured output with organized file locations. Use this after tools have been executed and you have results to organize. Format as markdown with sections: Implementation Files, Test Files, Configuration, Type Definitions, Related Directories, Entry Points.\")\n}\n\nfunction CodeLocator(messages: Message[]) -> LocatorDecision {\n    client \"FreeGLM45Air\"\n    prompt #\"\n        You are a specialist at finding WHERE code lives in a codebase. Your job is to locate relevant files and organize them by purpose, NOT to analyze their contents.\n\n    ## CRITICAL: YOUR ONLY JOB IS TO DOCUMENT AND EXPLAIN THE CODEBASE AS IT EXISTS TODAY\n    - DO NOT suggest improvements or changes unless the user explicitly asks for them\n    - DO NOT perform root cause analysis unless the user explicitly asks for them\n    - DO NOT propose future enhancements unless the user explicitly asks for them\n    - DO NOT critique the implementation\n    - DO NOT comment on code quality, architecture decisions, or best practices\n    - ONLY describe what exists, where it exists, and how components are organized\n\n    ## Core Responsibilities\n\n    1. **Find Files by Topic/Feature**\n    - Search for files containing relevant keywords\n    - Look for directory patterns and naming conventions\n    - Check common locations (src/, lib/, pkg/, etc.)\n\n    2. **Categorize Findings**\n    - Implementation files (core logic)\n    - Test files (unit, integration, e2e)\n    - Configuration files\n    - Documentation files\n    - Type definitions/interfaces\n    - Examples/samples\n\n    3. **Return Structured Results**\n    - Group files by their purpose\n    - Provide full paths from repository root\n    - Note which directories contain clusters of related files\n\n    **How to use tools:**\n    1. Execute one tool at a time - return a single tool in the `tool` field\n    2. Start with `GrepTool` to find files containing relevant keywords related to the feature/topic\n    3. Use `GlobTool` to find files matching common naming patterns (e.g., `*service*`, `*handler*`, `*test*`)\n    4. Use `ListDirTool` to explore directories that might contain related files\n    5. After each tool execution, you'll receive results and can decide to use another tool or organize findings\n    6. You can include an optional `explanation` to describe your search strategy\n\n    ## Search Strategy\n\n    ### Initial Broad Search\n\n    First, think deeply about the most effective search patterns for the requested feature or topic, considering:\n    - Common naming conventions in this codebase\n    - Language-specific directory structures\n    - Related terms and synonyms that might be used\n\n    1. Start with using your grep tool for finding keywords.\n    2. Optionally, use glob for file patterns\n    3. LS and Glob your way to victory as well!\n\n    ### Refine by Language/Framework\n    - **JavaScript/TypeScript**: Look in src/, lib/, components/, pages/, api/\n    - **Python**: Look in src/, lib/, pkg/, module names matching feature\n    - **Go**: Look in pkg/, internal/, cmd/\n    - **General**: Check for feature-specific directories - I believe in you, you are a smart cookie :)\n\n    ### Common Patterns to Find\n    - `*service*`, `*handler*`, `*controller*` - Business logic\n    - `*test*`, `*spec*` - Test files\n    - `*.config.*`, `*rc*` - Configuration\n    - `*.d.ts`, `*.types.*` - Type definitions\n    - `README*`, `*.md` in feature dirs - Documentation\n\n    ## Output Format\n\n    Structure your findings like this:\n\n    ```\n    ## File Locations for [Feature/Topic]\n\n    ### Implementation Files\n    - `src/services/feature.js` - Main service logic\n    - `src/handlers/feature-handler.js` - Request handling\n    - `src/models/feature.js` - Data models\n\n    ### Test Files\n    - `src/services/__tests__/feature.test.js` - Service tests\n    - `e2e/feature.spec.js` - End-to-end tests\n\n    ### Configuration\n    - `config/feature.json` - Feature-specific config\n    - `.featurerc` - Runtime configuration\n\n    ### Type Definitions\n    - `types/feature.d.ts` - TypeScript definitions\n\n    ### Related Directories\n    - `src/services/feature/` - Contains 5 related files\n    - `docs/feature/` - Feature documentation\n\n    ### Entry Points\n    - `src/index.js` - Imports feature module at line 23\n    - `api/routes.js` - Registers feature routes\n    ```\n\n    ## Important Guidelines\n\n    - **Don't read file contents** - Just report locations\n    - **Be thorough** - Check multiple naming patterns\n    - **Group logically** - Make it easy to understand code organization\n    - **Include counts** - \"Contains X files\" for directories\n    - **Note naming patterns** - Help user understand conventions\n    - **Check multiple extensions** - .js/.ts, .py, .go, etc.\n\n    ## What NOT to Do\n\n    - Don't analyze what the code does\n    - Don't read files to understand implementation\n    - Don't make assumptions about functionality\n    - Don't skip test or config files\n    - Don't ignore documentation\n    - Don't critique file organization or suggest better structures\n    - Don't comment on naming conventions being good or bad\n    - Don't identify \"problems\" or \"issues\" in the codebase structure\n    - Don't recommend refactoring or reorganization\n    - Don't evaluate whether the current structure is optimal\n\n    ## REMEMBER: You are a documentarian, not a critic or consultant\n\n    Your job is to help someone understand what code exists and where it lives, NOT to analyze problems or suggest improvements. Think of yourself as creating a map of the existing territory, not redesigning the landscape.\n\n    You're a file finder and organizer, documenting the codebase exactly as it exists today. Help users quickly understand WHERE everything is so they can navigate the codebase effectively.\n\n    You can respond in two ways:\n    1. **To search**: Return a `LocatorDecision` with `tool` populated (single tool, and optionally `explanation`) when you need to execute a search\n    2. **To report findings**: Return a `LocatorDecision` with `findings` populated (structured markdown output) when you have results from tools and want to organize them into the final output format\n\n    Analyze the conversation history and determine which approach to take. If you need to search, return a single tool. Execute one tool at a time. If you have search results to organize, return findings in the structured format described above.\n\n    **Important**: Tool results from previous tool executions are included in the message history as system messages. Look for system messages that contain \"Tool executed:\" to see previous tool results. You can use information from all previous tool results when making decisions.\n\n    {{ ctx.output_format }}\n\n    Conversation history:\n    {% for msg in messages %}\n    {{ _.role(msg.role) }} {{ msg.content }}\n    {% endfor %}\n    \"#\n}\n\ntest code_locator_basic {\n    functions [CodeLocator]\n    args {\n        messages [{\n            role \"user\"\n            content \"I want to find the code for the feature 'user authentication'\"\n        }]\n    }\n}\n\ntest code_locator_with_tool_result {\n    functions [CodeLocator]\n    args {\n        messages [\n            {\n                role \"user\"\n                content \"I want to find the code for the feature 'user authentication'\"\n            }\n            {\n                role \"assistant\"\n                content #\"\n                {\"explanation\": \"I'll start by searching for authentication-related code using the term 'auth', which is the most common keyword used in authentication systems. This will help identify files that contain authentication logic, services, handlers, or related functionality.\",\n                  \"tool\": {\n                    \"name\": \"grep\",\n                    \"pattern\": \"auth\",\n                    \"path\": null,\n                    \"type\": null\n                  },\n                  \"findings\": null\n                }\n                \"#\n            }\n            {\n                role \"system\"\n                content \"Tool executed: grep\\nArguments: {\\\"name\\\":\\\"grep\\\",\\\"pattern\\\":\\\"auth\\\",\\\"path\\\":null,\\\"type\\\":null}\\nResult: Found 15 matches across 8 files:\\n- src/auth/authenticator.js (3 matches)\\n- src/auth/login-handler.js (5 matches)\\n- src/models/user.js (2 matches)\\n- src/middleware/auth-middleware.js (3 matches)\\n- tests/auth/authenticator.test.js (1 match)\\n- tests/auth/login-handler.test.js (1 match)\\n- config/auth.config.js (0 matches, but file contains 'auth')\\n- docs/auth/README.md (0 matches, but file contains 'authentication')\"\n            }\n        ]\n    }\n}",
     "codeact.baml": "class CodeActAgentDecision {\n  message Message?\n  code string? @description(\"The clojure code to execute\")\n}\n\nfunction CodeActAgent(messages: Message[], code: string?, code_result: string?) -> CodeActAgentDecision {\n  client \"GLMCodingA\"\n  // client \"LMStudioQWen3Coder\"\n  prompt #\"\n    {{ _.role(\"system\") }}\n\n    You are a CodeAct agent that can explore a Clojure codebase and execute code. Analyze the conversation history, the latest code execution, and its result to decide what action to take next. You can:\n    1. Respond with a Message only (set message, leave code empty)\n    2. Respond with a Message and code (set both message and code)\n    3. Use code only without a message (leave message null, set code)\n\n    You can write and execute Clojure code directly to explore the codebase, read files, search for patterns, and perform any other operations you need. Use standard Clojure functions and libraries to accomplish your tasks.\n\n    IMPORTANT: You have access to predefined helper functions in the `com.zihao.baml-client.tools.tools` namespace. You can use these functions in your code by requiring the namespace. The available functions are:\n\n    ```clojure\n    {{PredefinedFunctions()}}\n    ```\n\n    {{ ctx.output_format }}\n\n    Conversation history:\n    {% for msg in messages %}\n    {{ _.role(msg.role) }} {{ msg.content }}\n    {% endfor %}\n\n    {{ _.role(\"system\") }}\n    {% if code %}\n    The following code was just executed:\n    ```clojure\n    {{ code }}\n    ```\n\n    {% if code_result %}\n    Code execution result:\n    {{ code_result }}\n    {% else %}\n    Code execution completed (no result returned).\n    {% endif %}\n    \n    Please analyze this result and decide what to do next. You may need to:\n    - Provide a final answer if the task is complete\n    - Execute additional code if more work is needed\n    - Fix errors if the code failed\n    - Continue with the next step in a multi-step process\n    {% elif code_result %}\n    Previous code execution result:\n    {{ code_result }}\n    \n    Please analyze this result and decide what to do next.\n    {% else %}\n    No code has been executed yet. Based on the conversation history, decide what action to take next.\n    {% endif %}\n  \"#\n}\n\ntest codeact_list_directory {\n  functions [CodeActAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"what is in current dir\"\n    }]\n  }\n}\n\ntest codeact_after_ls_execution {\n  functions [CodeActAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"how many files in current dir\"\n    }]\n    code \"(ls)\"\n    code_result \"file1.clj\\nfile2.clj\\ndirectory1\\ndirectory2\"\n  }\n  @@assert({{ this.message is not none and \"2\" in this.message.content }})\n}\n\ntest codeact_list_namespace_functions {\n  functions [CodeActAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"what functions in the current namespace\"\n    }]\n  }\n  @@assert({{ this.code is not none and (\"ns-publics\" in this.code or \"ns-map\" in this.code or \"*ns*\" in this.code) }})\n}\n\ntest codeact_explicit_create_celsius_to_fahrenheit {\n  functions [CodeActAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"create a celsius to fahrenheit function\"\n    }]\n  }\n  @@assert({{ this.code is not none and (\"defn\" in this.code or \"def\" in this.code) and (\"celsius\" in this.code or \"Celsius\" in this.code or \"fahrenheit\" in this.code or \"Fahrenheit\" in this.code or \"9/5\" in this.code or \"* 9\" in this.code or \"+ 32\" in this.code) }})\n}\n\ntest codeact_use_predefined_read_file {\n  functions [CodeActAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"read the file /path/to/example.clj\"\n    }]\n  }\n  @@assert({{ this.code is not none and (\"read-file\" in this.code or \"com.zihao.baml-client.tools.tools\" in this.code or \"baml-client.tools.tools\" in this.code) }})\n}\n\ntest codeact_use_predefined_read_file_retry {\n  functions [CodeActAgent]\n  args {\n    messages [{\n      role \"user\"\n      content \"read the file /path/to/example.clj\"\n    }\n    {\n      role \"assistant\"\n      content #\"\n      ```clojure\n      (require '[com.zihao.baml-client.tools.tools :as tools])\n      (tools/read-file \"/path/to/example.clj\")\n      ```\n      \"#\n    }\n    {\n      role \"user\"\n      content \"parse result error, if you want to execute code, please answer in JSON with key `code`\"\n    }\n    ]\n  }\n  @@assert({{ this.code is not none and (\"read-file\" in this.code or \"com.zihao.baml-client.tools.tools\" in this.code or \"baml-client.tools.tools\" in this.code) }})\n}\n",
     "generators.baml": "// This helps use auto generate libraries you can use in the language of\n// your choice. You can have multiple generators if you use multiple languages.\n// Just ensure that the output_dir is different for each generator.\n// generator openapi {\n//     // Valid values: \"python/pydantic\", \"typescript\", \"ruby/sorbet\", \"rest/openapi\"\n//     output_type \"rest/openapi\"\n\n//     // Where the generated code will be saved (relative to baml_src/)\n//     output_dir \"../\"\n\n//     // The version of the BAML package you have installed (e.g. same version as your baml-py or @boundaryml/baml).\n//     // The BAML VSCode extension version should also match this version.\n//     version \"0.213.0\"\n\n//     // 'baml-cli generate' will run this after generating openapi.yaml, to generate your OpenAPI client\n//     // This command will be run from within $output_dir/baml_client\n//     // on_generate \"npx @openapitools/openapi-generator-cli generate -i openapi.yaml -g clojure -o .\"\n// }\n\ngenerator python {\n    output_type \"python/pydantic\"\n    output_dir \"../\"\n    version \"0.215.2\"\n}",
@@ -0,0 +1,405 @@
+"""Client-side rate limiting and concurrency limits per BAML client.
+
+Every call the extended clients (extended_client.py) make to a limited
+client (sync, async or stream) first takes a slot from that client's
+ClientLimiter, so all three share one budget per process:
+
+    from baml_client import rate_limit
+
+    rate_limit.apply_default_limits()  # DEFAULT_LIMITS, off until applied
+    rate_limit.configure_client("GLMCodingA", tokens_per_minute=200_000, max_in_flight=4)
+    rate_limit.limiter_stats()["FreeGLM45Air"]["mean_wait"]
+
+A call waits (the thread sleeps, or the coroutine awaits) until the request
+rate, token rate and in-flight limits all allow it; the time spent waiting is
+recorded as the limiter's queueing delay. Waiting stops early with a
+BamlAbortError when the call's abort_controller is aborted.
+
+Tokens are counted ahead of the call from an estimate of the prompt size
+plus `estimated_output_tokens`, and corrected from the usage the runtime
+reports once the call is done. The client a `client_registry` picks can't
+be inspected, so such calls count against the function's own client, or the
+one named by the `rate_limit_client` call option.
+"""
+import asyncio
+import threading
+import time
+import typing
+
+import baml_py
+from pydantic import BaseModel
+
+from .baml_sources import function_clients
+
+# Characters per token used to estimate the prompt size
+CHARS_PER_TOKEN = 4
+
+# Longest single sleep while a call waits, so aborts are noticed promptly
+_MAX_SLEEP = 0.1
+
+
+class ClientLimits(typing.NamedTuple):
+    """Limits of one client; None means unlimited."""
+
+    requests_per_second: typing.Optional[float] = None
+    tokens_per_minute: typing.Optional[float] = None
+    max_in_flight: typing.Optional[int] = None
+    estimated_output_tokens: int = 512
+
+
+# Applied by apply_default_limits(). FreeGLM45Air is an OpenRouter free-tier
+# model (20 requests/min), LMStudioQWen3Coder runs on a single local GPU.
+DEFAULT_LIMITS: typing.Dict[str, ClientLimits] = {
+    "FreeGLM45Air": ClientLimits(requests_per_second=20 / 60),
+    "LMStudioQWen3Coder": ClientLimits(max_in_flight=1),
+}
+
+
+def estimate_tokens(value: typing.Any) -> int:
+    """Rough token count of call arguments, from the length of their strings."""
+    stack = [value]
+    chars = 0
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            chars += len(item)
+        elif isinstance(item, BaseModel):
+            stack.extend(item.__dict__.values())
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return chars // CHARS_PER_TOKEN
+
+
+class _Bucket:
+    """Token bucket refilled at rate units per second, holding at most capacity.
+
+    The level may go negative: a debit larger than what is available is
+    allowed once the bucket holds enough to cover it (or is full), and the
+    debt is paid back by the refill.
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = now
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be debited, 0 if it can be right away."""
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+
+class Reservation:
+    """A granted call slot; release it once the call is done."""
+
+    __slots__ = ("limiter", "tokens", "waited", "_released")
+
+    def __init__(self, limiter: "ClientLimiter", tokens: int, waited: float):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.waited = waited  # Queueing delay in seconds
+        self._released = False
+
+    def release(self, collector: typing.Optional[baml_py.Collector] = None) -> None:
+        """Free the slot and settle the token estimate against the usage in collector."""
+        if self._released:
+            return
+        self._released = True
+        self.limiter._release(self, _used_tokens(collector))
+
+
+def _used_tokens(collector: typing.Optional[baml_py.Collector]) -> typing.Optional[int]:
+    if collector is None:
+        return None
+    log = collector.last
+    if log is None:
+        return None
+    usage = log.usage
+    if usage.input_tokens is None and usage.output_tokens is None:
+        return None
+    return (usage.input_tokens or 0) + (usage.output_tokens or 0)
+
+
+class ClientLimiter:
+    """Request rate, token rate and in-flight limits of one client.
+
+    Thread-safe; shared by sync callers (which sleep) and async callers on any
+    event loop (which await). `clock` returns seconds, as time.monotonic does.
+    """
+
+    def __init__(self, name: str, limits: ClientLimits, clock: typing.Callable[[], float] = time.monotonic):
+        self.name = name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._async_waiters: typing.List[typing.Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.in_flight = 0
+        self.requests = 0
+        self.queued = 0  # Requests that had to wait
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.tokens_used = 0
+        self.limits = limits
+        self._requests_bucket: typing.Optional[_Bucket] = None
+        self._tokens_bucket: typing.Optional[_Bucket] = None
+        self.set_limits(limits)
+
+    def set_limits(self, limits: ClientLimits) -> None:
+        with self._lock:
+            self.limits = limits
+            rps = limits.requests_per_second
+            # Allow a burst of one second's worth of requests, and at least one
+            now = self._clock()
+            self._requests_bucket = _Bucket(rps, max(1.0, rps), now) if rps else None
+            tpm = limits.tokens_per_minute
+            self._tokens_bucket = _Bucket(tpm / 60, tpm, now) if tpm else None
+            self._wake_all()
+
+    @property
+    def tracks_tokens(self) -> bool:
+        """Whether calls should report their usage back through a collector."""
+        return self._tokens_bucket is not None
+
+    def usage_collector(self) -> typing.Optional[baml_py.Collector]:
+        """A collector to add to the call, so release can settle actual token usage."""
+        return baml_py.Collector(f"rate-limit-{self.name}") if self.tracks_tokens else None
+
+    def estimate(self, args: typing.Dict[str, typing.Any]) -> int:
+        return estimate_tokens(args) + self.limits.estimated_output_tokens
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "total_wait": self.total_wait,
+                "mean_wait": self.total_wait / self.requests if self.requests else 0.0,
+                "max_wait": self.max_wait,
+                "tokens_used": self.tokens_used,
+            }
+
+    def try_acquire(self, tokens: int) -> typing.Optional[Reservation]:
+        """Take a slot for a call of about `tokens` tokens if every limit allows it now, else None."""
+        with self._lock:
+            if self._try_acquire(tokens) == 0.0:
+                return self._granted(tokens, self._clock())
+        return None
+
+    def acquire(self, tokens: int, abort_controller: typing.Optional[baml_py.AbortController] = None) -> Reservation:
+        """Block until a call of about `tokens` tokens may start."""
+        start = self._clock()
+        with self._lock:
+            while True:
+                _check_aborted(abort_controller)
+                wait = self._try_acquire(tokens)
+                if wait == 0.0:
+                    return self._granted(tokens, start)
+                self._released.wait(self._sleep_time(wait, abort_controller))
+
+    async def acquire_async(self, tokens: int,
+                            abort_controller: typing.Optional[baml_py.AbortController] = None) -> Reservation:
+        """Wait, without blocking the event loop, until a call of about `tokens` tokens may start."""
+        start = self._clock()
+        loop = asyncio.get_running_loop()
+        while True:
+            _check_aborted(abort_controller)
+            with self._lock:
+                wait = self._try_acquire(tokens)
+                if wait == 0.0:
+                    return self._granted(tokens, start)
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait([waiter], timeout=self._sleep_time(wait, abort_controller))
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def _try_acquire(self, tokens: int) -> typing.Optional[float]:
+        """Take a slot if every limit allows it. Called with the lock held.
+
+        Returns:
+            0.0 if granted, else the seconds until a rate limit could allow it,
+            or None if only a release can (the in-flight limit is reached)
+        """
+        limits = self.limits
+        if limits.max_in_flight is not None and self.in_flight >= limits.max_in_flight:
+            return None
+        now = self._clock()
+        wait = 0.0
+        if self._requests_bucket is not None:
+            self._requests_bucket.refill(now)
+            wait = max(wait, self._requests_bucket.wait_time(1))
+        if self._tokens_bucket is not None:
+            self._tokens_bucket.refill(now)
+            wait = max(wait, self._tokens_bucket.wait_time(tokens))
+        if wait > 0.0:
+            return wait
+        if self._requests_bucket is not None:
+            self._requests_bucket.level -= 1
+        if self._tokens_bucket is not None:
+            self._tokens_bucket.level -= tokens
+        self.in_flight += 1
+        return 0.0
+
+    def _granted(self, tokens: int, start: float) -> Reservation:
+        waited = self._clock() - start
+        self.requests += 1
+        if waited > 0.0005:
+            self.queued += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return Reservation(self, tokens, waited)
+
+    @staticmethod
+    def _sleep_time(wait: typing.Optional[float],
+                    abort_controller: typing.Optional[baml_py.AbortController]) -> typing.Optional[float]:
+        if abort_controller is None:
+            return wait
+        return _MAX_SLEEP if wait is None else min(wait, _MAX_SLEEP)
+
+    def _release(self, reservation: Reservation, used_tokens: typing.Optional[int]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            tokens = reservation.tokens if used_tokens is None else used_tokens
+            self.tokens_used += tokens
+            if self._tokens_bucket is not None and used_tokens is not None:
+                # Settle the estimate: debit an underestimate, refund an overestimate
+                bucket = self._tokens_bucket
+                bucket.level = min(bucket.capacity, bucket.level + reservation.tokens - used_tokens)
+            self._wake_all()
+
+    def _wake_all(self) -> None:
+        """Let every waiter retry. Called with the lock held."""
+        self._released.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(_resolve_waiter, waiter)
+        self._async_waiters.clear()
+
+
+def _resolve_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _check_aborted(abort_controller: typing.Optional[baml_py.AbortController]) -> None:
+    if abort_controller is not None and abort_controller.aborted:
+        raise baml_py.baml_py.BamlAbortError("Operation was aborted")
+
+
+_limiters: typing.Dict[str, ClientLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_client(client_name: str, requests_per_second: typing.Optional[float] = None,
+                     tokens_per_minute: typing.Optional[float] = None, max_in_flight: typing.Optional[int] = None,
+                     estimated_output_tokens: int = 512) -> ClientLimiter:
+    """Set the limits of a client, replacing any earlier ones.
+
+    Args:
+        client_name: Client name as declared in clients.baml, e.g. "FreeGLM45Air"
+        requests_per_second: Sustained request rate; bursts of up to one second's worth are allowed
+        tokens_per_minute: Sustained prompt + completion token rate
+        max_in_flight: Maximum number of concurrent calls
+        estimated_output_tokens: Completion tokens counted ahead of each call, until its usage is known
+
+    Returns:
+        The client's limiter; existing waiters re-check against the new limits
+    """
+    limits = ClientLimits(requests_per_second, tokens_per_minute, max_in_flight, estimated_output_tokens)
+    with _limiters_lock:
+        limiter = _limiters.get(client_name)
+        if limiter is None:
+            limiter = _limiters[client_name] = ClientLimiter(client_name, limits)
+            return limiter
+    limiter.set_limits(limits)
+    return limiter
+
+
+def remove_client(client_name: str) -> None:
+    """Stop limiting a client. Calls already waiting on it keep their limiter."""
+    with _limiters_lock:
+        limiter = _limiters.pop(client_name, None)
+    if limiter is not None:
+        limiter.set_limits(ClientLimits())
+
+
+def apply_default_limits() -> None:
+    """Limit the clients in DEFAULT_LIMITS, replacing any earlier limits of theirs."""
+    for client_name, limits in DEFAULT_LIMITS.items():
+        configure_client(client_name, *limits)
+
+
+def limiter_for_function(function_name: str) -> typing.Optional[ClientLimiter]:
+    """Limiter of the client a BAML function calls, if that client is limited."""
+    if not _limiters:
+        return None
+    client_name = function_clients().get(function_name)
+    return _limiters.get(client_name) if client_name is not None else None
+
+
+def limiter_for_client(client_name: str) -> typing.Optional[ClientLimiter]:
+    """Limiter of a client, if it is limited."""
+    return _limiters.get(client_name)
+
+
+def limiter_stats() -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Stats of every limited client: requests, queued, in_flight, total/mean/max_wait (seconds), tokens_used."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats for limiter in limiters}
+
+
+class LimitedStream:
+    """Wraps a runtime stream so it holds a limiter slot while it runs.
+
+    Drop-in for the FunctionResultStream / SyncFunctionResultStream handed to
+    baml_py.BamlStream / BamlSyncStream: `done` waits for a slot before the
+    request starts and releases it when the stream ends.
+    """
+
+    def __init__(self, stream: typing.Any, limiter: ClientLimiter, tokens: int,
+                 abort_controller: typing.Optional[baml_py.AbortController],
+                 collector: typing.Optional[baml_py.Collector], is_async: bool):
+        self._stream = stream
+        self._limiter = limiter
+        self._tokens = tokens
+        self._abort_controller = abort_controller
+        self._collector = collector
+        self._is_async = is_async
+
+    def on_event(self, callback: typing.Any) -> "LimitedStream":
+        self._stream = self._stream.on_event(callback)
+        return self
+
+    def done(self, ctx: typing.Any) -> typing.Any:
+        if self._is_async:
+            return self._done_async(ctx)
+        reservation = self._limiter.acquire(self._tokens, self._abort_controller)
+        try:
+            return self._stream.done(ctx)
+        finally:
+            reservation.release(self._collector)
+
+    async def _done_async(self, ctx: typing.Any) -> typing.Any:
+        reservation = await self._limiter.acquire_async(self._tokens, self._abort_controller)
+        try:
+            return await self._stream.done(ctx)
+        finally:
+            reservation.release(self._collector)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._stream, name)
+
@@ -0,0 +1,47 @@
+"""Plain-dict stand-ins for the classes in types.py and stream_types.py.
+
+FunctionResult.cast_to builds a result bottom up: each BAML class is looked
+up by name in the module it is given and created with
+`Cls.model_validate(fields)`, where nested values have already been cast.
+With the `raw` call option the extended clients (extended_client.py) cast
+to this module instead, so every class returns its fields dict unchanged.
+No Pydantic models are built, and the result is the same JSON-like value
+`model_dump()` would give:
+
+    sync_b.CodeLocator(messages, baml_options={"raw": True})
+    # => {"explanation": "...", "tool": {"name": "grep", ...}, "findings": None}
+
+Partials of streams with the option are dicts the same way, and sync_b.parse
+honours it too. The stand-ins are made at import time, one per Pydantic
+class in types.py and stream_types.py, so they follow `baml-cli generate`.
+"""
+import typing
+
+from pydantic import BaseModel
+
+from . import stream_types, types
+
+
+class _Plain:
+    """A BAML class whose instances are the plain dict of its fields."""
+
+    __slots__ = ()
+
+    @classmethod
+    def model_validate(cls, fields: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        return fields
+
+    def __new__(cls, **fields: typing.Any) -> typing.Dict[str, typing.Any]:  # type: ignore[misc]
+        return fields
+
+
+def _plain_classes(*modules: typing.Any) -> typing.Dict[str, type]:
+    return {
+        name: type(name, (_Plain,), {"__slots__": ()})
+        for module in modules
+        for name, value in vars(module).items()
+        if isinstance(value, type) and issubclass(value, BaseModel) and value.__module__ == module.__name__
+    }
+
+
+globals().update(_plain_classes(types, stream_types))
@@ -0,0 +1,341 @@
+"""Opt-in, content-addressed cache of parsed BAML function results.
+
+Wrap a client to serve repeated calls without an HTTP request:
+
+    from baml_client.extended_client import sync_b
+    from baml_client.response_cache import CachedBamlClient, SQLiteCache
+
+    cached = CachedBamlClient(sync_b, SQLiteCache(".baml_cache.sqlite", ttl=7 * 24 * 3600))
+    decision = cached.CodeLocator(messages=messages)
+
+The key covers the function name, the canonicalized arguments, the client
+the function calls, the `env` option and a hash of all BAML sources, so
+editing a prompt, a type or a client definition invalidates earlier entries. Results are stored
+as JSON and validated back into the `types.*` models on a hit.
+
+Only direct function calls are cached; `stream`, `request` and `parse` pass
+through. Calls whose options, the client's own included, have a
+`client_registry` or `tb` bypass the cache, since the client or return type
+they lead to can't be inspected. A hit records nothing in a `collector`.
+"""
+import abc
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from pydantic import BaseModel, TypeAdapter
+
+from .baml_sources import baml_source_hash, function_clients
+
+
+def _canonical(value: typing.Any) -> typing.Any:
+    """JSON-compatible form of an argument with a stable key order."""
+    if isinstance(value, BaseModel):
+        return _canonical(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if hasattr(value, "value") and type(value).__module__.endswith("types"):
+        # Enum members of the generated types
+        return value.value
+    return value
+
+
+def cache_key(function_name: str, args: typing.Dict[str, typing.Any], client_name: typing.Optional[str] = None,
+              env: typing.Optional[typing.Dict[str, typing.Optional[str]]] = None) -> str:
+    """Content address of a function call.
+
+    Args:
+        function_name: BAML function name
+        args: Arguments by parameter name; models and dicts are canonicalized
+        client_name: Client the call goes to; defaults to the function's client
+        env: The call's `env` option, which can point a client elsewhere
+
+    Returns:
+        Hex sha256 of the canonical call description
+    """
+    description = {
+        "function": function_name,
+        "args": _canonical(args),
+        "client": client_name or function_clients().get(function_name),
+        "source": baml_source_hash(),
+    }
+    if env:
+        description["env"] = _canonical(env)
+    encoded = json.dumps(description, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResponseCache(abc.ABC):
+    """Base class of cache backends: bytes values by key, with hit/miss counters."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @abc.abstractmethod
+    def put(self, key: str, value: bytes) -> None:
+        ...
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> typing.Optional[bytes]:
+        """The value of key, or None if it isn't cached; doesn't count hits and misses."""
+
+
+class MemoryCache(ResponseCache):
+    """In-memory LRU cache with an optional TTL in seconds."""
+
+    def __init__(self, max_entries: int = 1024, ttl: typing.Optional[float] = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, typing.Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str) -> typing.Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes, created: typing.Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() if created is None else created, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(ResponseCache):
+    """On-disk cache in a SQLite file, with an in-memory LRU in front.
+
+    Entries expire ttl seconds after they were written. When the stored values
+    exceed max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, ttl: typing.Optional[float] = None, max_bytes: int = 256 * 1024 * 1024,
+                 memory_entries: int = 256):
+        """Open (or create) the cache file.
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds an entry stays valid, None for no expiry
+            max_bytes: Total size of stored values before evicting
+            memory_entries: Size of the in-memory LRU in front of the file, 0 to disable
+        """
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory = MemoryCache(memory_entries, ttl) if memory_entries else None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Total bytes of stored values."""
+        return self._size
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _get(self, key: str) -> typing.Optional[bytes]:
+        if self._memory is not None:
+            value = self._memory._get(key)
+            if value is not None:
+                return value
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, size, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        if self._memory is not None:
+            self._memory.put(key, value, created)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._size += len(value) - (old[0] if old else 0)
+            self._evict(now)
+        if self._memory is not None:
+            self._memory.put(key, value, now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._size = 0
+        if self._memory is not None:
+            self._memory.clear()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        if self.ttl is not None:
+            expired = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses WHERE created < ?", (now - self.ttl,)
+            ).fetchone()
+            if expired[1]:
+                self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self._size -= expired[0]
+        while self._size > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._size = 0
+                break
+            evicted = []
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                evicted.append(key)
+                self._size -= size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in evicted])
+            if self._memory is not None:
+                # Keep the memory layer from serving entries evicted from disk
+                for key in evicted:
+                    self._memory.discard(key)
+
+
+class CachedBamlClient:
+    """Wraps an extended sync or async client with a ResponseCache.
+
+    BAML function calls are looked up in the cache first; on a miss the
+    wrapped client is called and its parsed result stored. Everything else
+    is forwarded to the wrapped client.
+    """
+
+    def __init__(self, client: typing.Any, cache: ResponseCache):
+        if not hasattr(client, "options"):
+            # The generated clients keep their with_options settings private,
+            # so entries could be shared between differently configured clients
+            raise TypeError("CachedBamlClient needs a client that exposes its call options, "
+                            "such as extended_client.sync_b or async_b")
+        self._client = client
+        self.cache = cache
+        self._adapters: typing.Dict[str, TypeAdapter] = {}
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        return self.cache.stats
+
+    def with_options(self, *args, **kwargs) -> "CachedBamlClient":
+        return CachedBamlClient(self._client.with_options(*args, **kwargs), self.cache)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        attr = getattr(self._client, name)
+        if name not in function_clients() or not callable(attr):
+            return attr
+        if inspect.iscoroutinefunction(attr):
+            async def cached_async_call(*args, **kwargs):
+                key = self._key(name, attr, args, kwargs)
+                if key is not None:
+                    hit = self._lookup(name, attr, key)
+                    if hit is not None:
+                        return hit[0]
+                result = await attr(*args, **kwargs)
+                if key is not None:
+                    self._store(name, attr, key, result)
+                return result
+            return cached_async_call
+
+        def cached_call(*args, **kwargs):
+            key = self._key(name, attr, args, kwargs)
+            if key is not None:
+                hit = self._lookup(name, attr, key)
+                if hit is not None:
+                    return hit[0]
+            result = attr(*args, **kwargs)
+            if key is not None:
+                self._store(name, attr, key, result)
+            return result
+        return cached_call
+
+    def _key(self, name, method, args, kwargs) -> typing.Optional[str]:
+        """Cache key of a call, or None if it must bypass the cache."""
+        bound = inspect.signature(method).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        options = {**self._client.options, **(arguments.pop("baml_options", None) or {})}
+        if options.get("client_registry") is not None or options.get("tb") is not None or options.get("raw"):
+            # raw results are dicts, not the return type the cache validates against
+            return None
+        return cache_key(name, arguments, env=options.get("env"))
+
+    def _adapter(self, name: str, method) -> TypeAdapter:
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            return_type = typing.get_type_hints(method)["return"]
+            adapter = TypeAdapter(return_type)
+            self._adapters[name] = adapter
+        return adapter
+
+    def _lookup(self, name, method, key) -> typing.Optional[typing.Tuple[typing.Any]]:
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        return (self._adapter(name, method).validate_json(value),)
+
+    def _store(self, name, method, key, result) -> None:
+        self.cache.put(key, self._adapter(name, method).dump_json(result))
@@ -0,0 +1,117 @@
+"""Delta-encoded stream partials.
+
+Every partial of a BAML stream is a full snapshot of the object parsed so
+far, so a consumer that converts or renders each one does work proportional
+to the whole reply on every tick. With the `stream_deltas` call option of
+the extended clients (extended_client.py) the stream yields
+DeltaPartial(snapshot, deltas) instead, where deltas are the path-addressed
+changes since the previous partial:
+
+    stream = sync_b.stream.CodeLocator(messages, baml_options={"stream_deltas": True})
+    for partial in stream:
+        for path, op, value in partial.deltas:
+            if path == ("findings",) and op == APPEND:
+                view.append(value)           # O(chunk), not O(findings)
+
+Paths are tuples of field names and list indexes, () for the whole value
+(e.g. ChatAgent's string). Ops are APPEND (a string grew by value), SET (a
+field, list item or the whole value is now value) and REMOVE (a field went
+back to None). Combined with `stream_throttle`, deltas are relative to the
+previously yielded partial.
+"""
+import typing
+
+from pydantic import BaseModel
+
+APPEND = "append"
+SET = "set"
+REMOVE = "remove"
+
+Path = typing.Tuple[typing.Union[str, int], ...]
+T = typing.TypeVar("T")
+
+
+class StreamDelta(typing.NamedTuple):
+    path: Path
+    op: str
+    value: typing.Any
+
+
+class DeltaPartial(typing.NamedTuple):
+    snapshot: typing.Any
+    deltas: typing.List[StreamDelta]
+
+
+def diff(old: typing.Any, new: typing.Any, path: Path = ()) -> typing.List[StreamDelta]:
+    """Changes that turn old into new.
+
+    Models and dicts are compared field by field and lists item by item; a
+    string that extends the old one is an APPEND of the new suffix.
+    """
+    if old is new:
+        return []
+    if old is None:
+        return [] if new is None else [StreamDelta(path, SET, new)]
+    if new is None:
+        return [StreamDelta(path, REMOVE, None)]
+    if isinstance(new, str) and isinstance(old, str):
+        if len(new) > len(old) and new.startswith(old):
+            return [StreamDelta(path, APPEND, new[len(old):])]
+        return [] if new == old else [StreamDelta(path, SET, new)]
+    if isinstance(new, BaseModel) and type(new) is type(old):
+        deltas = []
+        old_fields = old.__dict__
+        for name, value in new.__dict__.items():
+            deltas.extend(diff(old_fields.get(name), value, path + (name,)))
+        return deltas
+    if isinstance(new, dict) and isinstance(old, dict):
+        # Partials of calls with the raw option
+        deltas = []
+        for name, value in new.items():
+            deltas.extend(diff(old.get(name), value, path + (name,)))
+        deltas.extend(StreamDelta(path + (name,), REMOVE, None) for name in old.keys() - new.keys())
+        return deltas
+    if isinstance(new, list) and isinstance(old, list) and len(new) >= len(old):
+        deltas = []
+        for index, (before, after) in enumerate(zip(old, new)):
+            deltas.extend(diff(before, after, path + (index,)))
+        deltas.extend(StreamDelta(path + (index,), SET, new[index]) for index in range(len(old), len(new)))
+        return deltas
+    return [] if new == old else [StreamDelta(path, SET, new)]
+
+
+class DeltaSyncStream(typing.Generic[T]):
+    """A BamlSyncStream that yields DeltaPartial(snapshot, deltas)."""
+
+    def __init__(self, stream: typing.Any):
+        self._stream = stream
+
+    def __iter__(self) -> typing.Iterator[DeltaPartial]:
+        previous = None
+        for partial in self._stream:
+            deltas = diff(previous, partial)
+            previous = partial
+            if deltas:
+                yield DeltaPartial(partial, deltas)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # get_final_response, stats and anything else go to the wrapped stream
+        return getattr(self._stream, name)
+
+
+class DeltaStream(typing.Generic[T]):
+    """A BamlStream that yields DeltaPartial(snapshot, deltas)."""
+
+    def __init__(self, stream: typing.Any):
+        self._stream = stream
+
+    async def __aiter__(self) -> typing.AsyncIterator[DeltaPartial]:
+        previous = None
+        async for partial in self._stream:
+            deltas = diff(previous, partial)
+            previous = partial
+            if deltas:
+                yield DeltaPartial(partial, deltas)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._stream, name)
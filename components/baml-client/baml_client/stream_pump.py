@@ -0,0 +1,168 @@
+"""Drain a BAML stream on a background thread.
+
+Walking a BamlSyncStream from another runtime (the JVM through
+libpython-clj) costs a GIL round trip and a conversion per partial, and
+ends with a StopIteration the caller has to recognise. A StreamPump
+iterates the stream on its own thread, converts each partial to plain
+dicts/lists/strings there, and hands them over in batches:
+
+    pump = StreamPump(sync_b.stream.CodeLocator(messages))
+    while (batch := pump.poll(0.1)) is not None:
+        for item in batch:               # {"snapshot": {...}} per partial
+            render(item["snapshot"])
+    final = pump.stream.get_final_response()
+
+A partial is queued on its own while the consumer keeps up. While the queue
+is full the pump keeps converting into one pending batch, and only blocks
+the stream once that batch reaches max_batch, so a slow consumer gets fewer,
+larger batches and memory stays bounded. For a stream with the
+`stream_deltas` option, items also carry "deltas":
+[{"path": [...], "op": ..., "value": ...}, ...].
+"""
+import queue
+import threading
+import typing
+
+from pydantic import BaseModel
+
+from .stream_delta import DeltaPartial, StreamDelta
+
+_DONE = object()
+
+
+def to_plain(value: typing.Any) -> typing.Any:
+    """A partial or delta value as JSON-like builtins (model_dump for models)."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def delta_to_plain(delta: StreamDelta) -> typing.Dict[str, typing.Any]:
+    return {"path": list(delta.path), "op": delta.op, "value": to_plain(delta.value)}
+
+
+class StreamPump:
+    """Iterates a sync BAML stream on a daemon thread into a bounded queue.
+
+    Args:
+        stream: A BamlSyncStream, or one wrapped by the stream_throttle /
+            stream_deltas options
+        snapshots: Include the converted partial ("snapshot") in each item;
+            turn off when only deltas are consumed to skip the model_dump
+        max_batch: Partials held back while the queue is full before the
+            pump blocks
+        max_queued: Batches the queue holds
+    """
+
+    def __init__(self, stream: typing.Any, snapshots: bool = True, max_batch: int = 64, max_queued: int = 8):
+        self.stream = stream
+        self.snapshots = snapshots
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[typing.Any]" = queue.Queue(maxsize=max_queued)
+        self._closed = threading.Event()
+        self._finished = False
+        self._error: typing.Optional[BaseException] = None
+        self.partials = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="baml-stream-pump", daemon=True)
+        self._thread.start()
+
+    def _convert(self, partial: typing.Any) -> typing.Dict[str, typing.Any]:
+        item: typing.Dict[str, typing.Any] = {}
+        if isinstance(partial, DeltaPartial):
+            item["deltas"] = [delta_to_plain(delta) for delta in partial.deltas]
+            partial = partial.snapshot
+        if self.snapshots:
+            item["snapshot"] = to_plain(partial)
+        return item
+
+    def _put(self, value: typing.Any) -> bool:
+        """Blocking put that gives up once the pump is closed."""
+        while not self._closed.is_set():
+            try:
+                self._queue.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        pending: typing.List[typing.Dict[str, typing.Any]] = []
+        try:
+            for partial in self.stream:
+                if self._closed.is_set():
+                    return
+                pending.append(self._convert(partial))
+                self.partials += 1
+                try:
+                    self._queue.put_nowait(pending)
+                except queue.Full:
+                    if len(pending) < self.max_batch:
+                        continue
+                    if not self._put(pending):
+                        return
+                self.batches += 1
+                pending = []
+        except BaseException as e:
+            self._error = e
+        if pending and self._put(pending):
+            self.batches += 1
+        self._put(_DONE)
+
+    def poll(self, timeout: typing.Optional[float] = None) -> typing.Optional[typing.List[typing.Dict[str, typing.Any]]]:
+        """Every converted partial queued so far, waiting up to timeout for the first one.
+
+        Returns:
+            A list of items, empty if nothing arrived within timeout, or None
+            once the stream is exhausted
+
+        Raises:
+            The exception the stream raised while iterating, after the
+            partials that preceded it were returned
+        """
+        if self._finished:
+            self._raise_error()
+            return None
+        try:
+            first = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        batch: typing.List[typing.Dict[str, typing.Any]] = []
+        value = first
+        while True:
+            if value is _DONE:
+                self._finished = True
+                break
+            batch.extend(value)
+            try:
+                value = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._finished and not batch:
+            self._raise_error()
+            return None
+        return batch
+
+    def _raise_error(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Stop pumping; the stream is left unconsumed."""
+        self._closed.set()
+        self._finished = True
+        # Unblock a put waiting on a full queue
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def __enter__(self) -> "StreamPump":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
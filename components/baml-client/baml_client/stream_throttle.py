@@ -0,0 +1,163 @@
+"""Throttled delivery of stream partials.
+
+A BAML stream yields a new partial object for every parser tick, most of
+which differ from the previous one by a few characters. Pass a
+StreamThrottle as the `stream_throttle` call option of the extended clients
+(extended_client.py) to only receive the partials worth acting on:
+
+    stream = sync_b.stream.CodeActAgent(messages, baml_options={
+        "stream_throttle": StreamThrottle(min_interval=0.05, min_chars=32),
+    })
+    for partial in stream:           # far fewer partials
+        render(partial)
+    final = stream.get_final_response()
+
+The first partial is always delivered. After that a partial is delivered
+when at least `min_interval` seconds have passed and its text grew by at
+least `min_chars` characters since the last delivered one, or, with
+`on_state_change`, as soon as its shape changes: a field gets a value, a
+list gets an item, or a StreamState field moves to another state. Skipped
+partials are dropped, not queued, except the last one: it is delivered when
+the stream ends, so the last partial seen is always the most complete. The
+final response is unaffected.
+"""
+import time
+import typing
+
+from pydantic import BaseModel
+
+from .stream_types import StreamState
+
+T = typing.TypeVar("T")
+
+_NOTHING = object()
+
+
+class StreamThrottle(typing.NamedTuple):
+    min_interval: float = 0.0  # Seconds between delivered partials
+    min_chars: int = 0  # Growth of the partial's text between delivered partials
+    on_state_change: bool = True  # Deliver immediately when the partial's shape changes
+
+
+def measure(value: typing.Any) -> typing.Tuple[int, typing.Any]:
+    """Size and shape of a partial.
+
+    Returns:
+        Characters of text in the value (scalars count as their str()), and a
+        hashable shape that ignores text content: which fields are set, list
+        lengths and StreamState states
+    """
+    if value is None:
+        return 0, None
+    if isinstance(value, str):
+        return len(value), str
+    if isinstance(value, StreamState):
+        chars, shape = measure(value.value)
+        return chars, (value.state, shape)
+    if isinstance(value, BaseModel):
+        total = 0
+        shapes = []
+        for name, field in value.__dict__.items():
+            if field is not None:
+                chars, shape = measure(field)
+                total += chars
+                shapes.append((name, shape))
+        return total, tuple(shapes)
+    if isinstance(value, (list, tuple)):
+        total = 0
+        shapes = []
+        for item in value:
+            chars, shape = measure(item)
+            total += chars
+            shapes.append(shape)
+        return total, (len(shapes), tuple(shapes))
+    if isinstance(value, dict):
+        return measure(list(value.values()))
+    return len(str(value)), type(value)
+
+
+class _Throttle:
+    """Decides which partials to deliver."""
+
+    def __init__(self, settings: StreamThrottle):
+        self.settings = settings
+        self.received = 0
+        self.delivered = 0
+        self._last_time: typing.Optional[float] = None
+        self._last_chars = 0
+        self._last_shape: typing.Any = None
+        self._skipped: typing.Any = _NOTHING  # Last partial held back, if it differs from the last delivered
+
+    def should_deliver(self, partial: typing.Any) -> bool:
+        self.received += 1
+        settings = self.settings
+        chars, shape = measure(partial)
+        now = time.monotonic()
+        if self._last_time is not None:
+            changed = settings.on_state_change and shape != self._last_shape
+            if not changed:
+                if chars == self._last_chars and shape == self._last_shape:
+                    return False
+                if now - self._last_time < settings.min_interval or chars - self._last_chars < settings.min_chars:
+                    self._skipped = partial
+                    return False
+        self._last_time = now
+        self._last_chars = chars
+        self._last_shape = shape
+        self._skipped = _NOTHING
+        self.delivered += 1
+        return True
+
+    def tail(self) -> typing.Any:
+        """The last skipped partial, to deliver once the stream has ended, else _NOTHING."""
+        skipped, self._skipped = self._skipped, _NOTHING
+        if skipped is not _NOTHING:
+            self.delivered += 1
+        return skipped
+
+
+class ThrottledSyncStream(typing.Generic[T]):
+    """A BamlSyncStream that only yields the partials its throttle lets through."""
+
+    def __init__(self, stream: typing.Any, settings: StreamThrottle):
+        self._stream = stream
+        self._throttle = _Throttle(settings)
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        return {"received": self._throttle.received, "delivered": self._throttle.delivered}
+
+    def __iter__(self) -> typing.Iterator[T]:
+        for partial in self._stream:
+            if self._throttle.should_deliver(partial):
+                yield partial
+        tail = self._throttle.tail()
+        if tail is not _NOTHING:
+            yield tail
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # get_final_response and anything else go to the wrapped stream
+        return getattr(self._stream, name)
+
+
+class ThrottledStream(typing.Generic[T]):
+    """A BamlStream that only yields the partials its throttle lets through."""
+
+    def __init__(self, stream: typing.Any, settings: StreamThrottle):
+        self._stream = stream
+        self._throttle = _Throttle(settings)
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        return {"received": self._throttle.received, "delivered": self._throttle.delivered}
+
+    async def __aiter__(self) -> typing.AsyncIterator[T]:
+        async for partial in self._stream:
+            if self._throttle.should_deliver(partial):
+                yield partial
+        tail = self._throttle.tail()
+        if tail is not _NOTHING:
+            yield tail
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._stream, name)
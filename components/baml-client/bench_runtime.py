@@ -0,0 +1,65 @@
+"""Microbenchmark of the per-call Python overhead of the generated BAML client.
+
+Compares option resolution in the generated DoNotUseDirectlyCallManager
+(merge a new manager and copy os.environ on every call) with the memoized
+call_manager.CallManager, without making any LLM requests:
+
+    python bench_runtime.py
+    python bench_runtime.py --calls 20000
+"""
+import argparse
+import os
+import time
+
+import baml_py
+
+from baml_client import call_manager
+from baml_client.call_manager import CallManager
+from baml_client.extended_client import sync_b
+from baml_client.runtime import DoNotUseDirectlyCallManager
+from baml_client.sync_client import b
+from baml_client.types import Message
+
+DECIDE_ACTION_RESPONSE = '{"message": {"role": "assistant", "content": "1 + 2 = 3"}, "tools": [{"name": "add", "a": 1, "b": 2}]}'
+
+
+def per_call_us(fn, calls: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def resolve(manager, options):
+    return manager.merge_options(options)._DoNotUseDirectlyCallManager__resolve()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10_000, help="calls per measurement")
+    args = parser.parse_args()
+
+    generated, memoized = DoNotUseDirectlyCallManager({}), CallManager({})
+    collector = baml_py.Collector("bench")
+    options = {"tags": {"agent": "code-locator"}, "collector": collector}
+    messages = [Message(role="user", content="add 1 and 2")]
+
+    # (generated, memoized) pairs
+    cases = {
+        "resolve, no options": (lambda: resolve(generated, {}), lambda: resolve(memoized, {})),
+        "resolve, tags+collector": (lambda: resolve(generated, options), lambda: resolve(memoized, options)),
+        "b.parse.DecideAction": (lambda: b.parse.DecideAction(DECIDE_ACTION_RESPONSE),
+                                 lambda: sync_b.parse.DecideAction(DECIDE_ACTION_RESPONSE)),
+        "b.request.DecideAction": (lambda: b.request.DecideAction(messages, None, baml_options=options),
+                                   lambda: sync_b.request.DecideAction(messages, None, baml_options=options)),
+    }
+
+    print(f"os.environ: {len(os.environ)} variables, relevant: {', '.join(call_manager.RELEVANT_ENV_KEYS)}")
+    print(f"{'case':>24} {'generated':>10} {'memoized':>10}")
+    for name, (before, after) in cases.items():
+        print(f"{name:>24} {per_call_us(before, args.calls):>8.1f}us {per_call_us(after, args.calls):>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
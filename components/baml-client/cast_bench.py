@@ -0,0 +1,69 @@
+"""Benchmark casting BAML results to Pydantic models and dumping them vs the raw option.
+
+`pydantic->clj` on the JVM side gets a Pydantic model from the client and
+calls model_dump() on it before converting the dict. With
+baml_options={"raw": True} the client casts straight to dicts
+(baml_client/raw_types.py). This casts the same FunctionResults both ways,
+checks they agree, and prints the time per result:
+
+    python cast_bench.py --iterations 20000 --findings-items 200
+"""
+import argparse
+import time
+import typing
+
+from mock_llm_server import MockConfig, MockLLMServer
+
+
+def collect_results(server: MockLLMServer) -> typing.Dict[str, typing.Any]:
+    """One FunctionResult per reply shape, fetched from the mock server."""
+    from baml_client.runtime import DoNotUseDirectlyCallManager
+    from baml_client.types import Message
+
+    manager = DoNotUseDirectlyCallManager({"client_registry": server.client_registry()})
+    question = Message(role="user", content="Where is the user authentication code?")
+    tool_result = Message(role="user", content="Tool executed: grep -> src/auth.clj")
+    calls = {
+        "CodeLocator tool": ("CodeLocator", {"messages": [question]}),
+        "CodeLocator findings": ("CodeLocator", {"messages": [question, tool_result]}),
+        "CodeActAgent": ("CodeActAgent", {"messages": [question], "code": None, "code_result": None}),
+        "DecideAction": ("DecideAction", {"messages": [question]}),
+    }
+    return {name: manager.call_function_sync(function_name=function, args=args)
+            for name, (function, args) in calls.items()}
+
+
+def per_call(fn: typing.Callable[[], typing.Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--findings-items", type=int, default=40, help="lines in the CodeLocator findings reply")
+    args = parser.parse_args()
+
+    from baml_client import raw_types, stream_types, types
+    from baml_client.globals import DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_RUNTIME as runtime
+
+    with MockLLMServer(MockConfig(ttft=0.0, tokens_per_second=1e6, findings_items=args.findings_items)) as server:
+        results = collect_results(server)
+
+    print(f"{'result':<22}{'cast_to':>12}{'+ model_dump':>14}{'raw':>12}{'speedup':>10}")
+    for name, result in results.items():
+        model = lambda: result.cast_to(types, types, stream_types, False, runtime)
+        dumped = lambda: model().model_dump()
+        raw = lambda: result.cast_to(raw_types, raw_types, raw_types, False, runtime)
+        assert raw() == dumped(), name
+        model_time = per_call(model, args.iterations)
+        dumped_time = per_call(dumped, args.iterations)
+        raw_time = per_call(raw, args.iterations)
+        print(f"{name:<22}{model_time * 1e6:>10.1f}us{dumped_time * 1e6:>12.1f}us"
+              f"{raw_time * 1e6:>10.1f}us{dumped_time / raw_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""Local, deterministic stand-in for the LLM endpoints used by baml_src.
+
+Speaks the Anthropic Messages API (POST /v1/messages) and the OpenAI chat
+completions API (POST /v1/chat/completions), both with SSE streaming, and
+answers with canned replies that parse as the return types of ChatAgent,
+CodeLocator, CodeActAgent and DecideAction. Latency, throughput and failures
+are configurable, so the BAML client and the agents on top of it can be
+benchmarked without network access or API keys:
+
+    from mock_llm_server import MockConfig, MockLLMServer
+    from baml_client.sync_client import b
+
+    with MockLLMServer(MockConfig(ttft=0.3, tokens_per_second=80, error_rate=0.05)) as server:
+        decision = b.CodeLocator(messages, baml_options={"client_registry": server.client_registry()})
+
+The registry redefines every client of clients.baml under its own name,
+pointing at the server, so each function keeps its provider. Through the
+extended clients, calls with a client_registry skip hedging but still count
+against the function's client-side rate limits.
+
+Run standalone, or drive a load test against it:
+
+    python mock_llm_server.py serve --port 8765 --ttft 0.2 --tps 100
+    python mock_llm_server.py load --function CodeLocator --calls 200 --concurrency 32 --stream
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import typing
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import baml_py
+
+# Clients declared in baml_src/clients.baml and the provider each one uses
+CLIENTS = {
+    "GLMCodingA": "anthropic",
+    "FreeGLM45Air": "openai-generic",
+    "LMStudioQWen3Coder": "openai-generic",
+}
+
+
+class MockConfig:
+    """Timing and failure behaviour of the mock server."""
+
+    def __init__(self, ttft: float = 0.2, tokens_per_second: float = 200.0, error_rate: float = 0.0,
+                 error_status: int = 500, seed: int = 0, chars_per_token: int = 4, findings_items: int = 40):
+        """Configure the server.
+
+        Args:
+            ttft: Seconds before the first token (or, without streaming, added to the generation time)
+            tokens_per_second: Generation speed; 0 sends the whole reply at once
+            error_rate: Fraction of requests answered with error_status instead of a reply
+            error_status: HTTP status of injected errors, e.g. 429, 500 or 529
+            seed: Seed of the error injection, so runs fail on the same requests
+            chars_per_token: Characters of reply text per simulated token
+            findings_items: Number of file entries in canned CodeLocator findings
+        """
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.seed = seed
+        self.chars_per_token = chars_per_token
+        self.findings_items = findings_items
+
+
+def _json(value: typing.Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def locator_reply(prompt: str, config: MockConfig) -> str:
+    """A tool call until the conversation contains tool results, then findings."""
+    # The instructions mention "Tool executed:" too, so only look at the conversation
+    if "Tool executed:" not in prompt.rpartition("Conversation history:")[2]:
+        return _json({
+            "explanation": "Search for the keywords of the request first.",
+            "tool": {"name": "grep", "pattern": "defn", "path": None, "type": "clj"},
+            "findings": None,
+        })
+    lines = ["## File Locations", "", "### Implementation Files"]
+    lines += [f"- `components/module_{i}/src/core.clj` - Implementation {i}" for i in range(config.findings_items)]
+    lines += ["", "### Test Files", "- `test/core_test.clj` - Tests"]
+    return _json({"explanation": None, "tool": None, "findings": "\n".join(lines)})
+
+
+def codeact_reply(prompt: str, config: MockConfig) -> str:
+    """Code to run until the prompt contains a result, then an answer."""
+    if "Code execution result:" not in prompt and "Previous code execution result:" not in prompt:
+        return _json({
+            "message": {"role": "assistant", "content": "Let me evaluate that."},
+            "code": "(+ 1 2)",
+        })
+    return _json({"message": {"role": "assistant", "content": "The result is 3."}, "code": None})
+
+
+def decide_action_reply(prompt: str, config: MockConfig) -> str:
+    """A tool call until a tool result is in the prompt, then an answer."""
+    if "A tool was just executed:" not in prompt:
+        return _json({"message": None, "tools": [{"name": "add", "a": 1, "b": 2}]})
+    return _json({"message": {"role": "assistant", "content": "1 + 2 = 3"}, "tools": []})
+
+
+def chat_reply(prompt: str, config: MockConfig) -> str:
+    return "Hello! This is a canned reply from the mock LLM server.\n\n" + "\n".join(
+        f"{i}. Point number {i}, with a little `code` and **emphasis**." for i in range(1, 21)
+    )
+
+
+# (pattern searched in the prompt, reply function); the first match answers
+CANNED_REPLIES: typing.List[typing.Tuple[str, typing.Callable[[str, MockConfig], str]]] = [
+    (r"specialist at finding WHERE code lives", locator_reply),
+    (r"You are a CodeAct agent", codeact_reply),
+    (r"Available tools:\s*- AddTool", decide_action_reply),
+    (r"", chat_reply),
+]
+
+
+def _content_text(content: typing.Any) -> str:
+    """Text of a message content: a string or a list of content parts."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def prompt_text(body: typing.Dict[str, typing.Any]) -> str:
+    """All prompt text of an Anthropic or OpenAI request body."""
+    parts = [_content_text(body.get("system"))]
+    parts += [_content_text(message.get("content")) for message in body.get("messages", [])]
+    return "\n".join(parts)
+
+
+class _ServerState:
+    """Counters and error injection of a running server."""
+
+    def __init__(self, config: MockConfig, replies):
+        self.config = config
+        self.replies = [(re.compile(pattern), reply) for pattern, reply in replies]
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.requests = 0
+        self.streams = 0
+        self.errors = 0
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        return {"requests": self.requests, "streams": self.streams, "errors": self.errors}
+
+    def reply_for(self, prompt: str) -> str:
+        for pattern, reply in self.replies:
+            if pattern.search(prompt):
+                return reply(prompt, self.config)
+        return ""
+
+    def next_request(self, stream: bool) -> typing.Tuple[int, bool]:
+        """Count a request; returns its number and whether it should fail."""
+        with self._lock:
+            self.requests += 1
+            self.streams += stream
+            fail = self._random.random() < self.config.error_rate
+            self.errors += fail
+            return next(self._ids), fail
+
+    def chunks(self, text: str) -> typing.List[str]:
+        size = self.config.chars_per_token
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _anthropic_usage(input_tokens: int, output_tokens: int) -> typing.Dict[str, int]:
+    # BAML's Anthropic client expects every usage field, the cache counters included
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+            "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+
+
+def _handler_class(server: _ServerState) -> typing.Type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, server.stats)
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path.endswith("/chat/completions"):
+                protocol = "openai"
+            elif self.path.endswith("/messages"):
+                protocol = "anthropic"
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            stream = bool(body.get("stream"))
+            request_id, fail = server.next_request(stream)
+            config = server.config
+            if fail:
+                time.sleep(config.ttft)
+                self._send_error(protocol, config.error_status)
+                return
+            prompt = prompt_text(body)
+            text = server.reply_for(prompt)
+            chunks = server.chunks(text)
+            model = body.get("model", "mock")
+            usage = (len(prompt) // config.chars_per_token, len(chunks))
+            if stream:
+                self._stream(protocol, request_id, model, chunks, usage)
+            else:
+                time.sleep(config.ttft + (len(chunks) / config.tokens_per_second if config.tokens_per_second else 0))
+                self._send_json(200, self._completion(protocol, request_id, model, text, usage))
+
+        def _send_json(self, status: int, value: typing.Any, headers: typing.Optional[dict] = None):
+            data = json.dumps(value).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, header in (headers or {}).items():
+                self.send_header(name, header)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, protocol: str, status: int):
+            message = "Injected error from the mock LLM server"
+            headers = {"Retry-After": "1"} if status == 429 else None
+            if protocol == "anthropic":
+                error_type = "rate_limit_error" if status == 429 else "overloaded_error" if status == 529 else "api_error"
+                self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+            else:
+                self._send_json(status, {"error": {"message": message, "type": "server_error", "code": status}}, headers)
+
+        @staticmethod
+        def _completion(protocol, request_id, model, text, usage):
+            if protocol == "anthropic":
+                return {
+                    "id": f"msg_mock_{request_id}", "type": "message", "role": "assistant", "model": model,
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn", "stop_sequence": None,
+                    "usage": _anthropic_usage(*usage),
+                }
+            return {
+                "id": f"chatcmpl-mock-{request_id}", "object": "chat.completion", "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)},
+            }
+
+        def _stream(self, protocol, request_id, model, chunks, usage):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            config = server.config
+            interval = 1 / config.tokens_per_second if config.tokens_per_second else 0
+            time.sleep(config.ttft)
+            if protocol == "anthropic":
+                self._event("message_start", {"type": "message_start", "message": {
+                    "id": f"msg_mock_{request_id}", "type": "message", "role": "assistant", "model": model,
+                    "content": [], "stop_reason": None, "stop_sequence": None,
+                    "usage": _anthropic_usage(usage[0], 0),
+                }})
+                self._event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                    "content_block": {"type": "text", "text": ""}})
+                for chunk in self._paced(chunks, interval):
+                    self._event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                        "delta": {"type": "text_delta", "text": chunk}})
+                self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._event("message_delta", {"type": "message_delta",
+                                               "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                               "usage": _anthropic_usage(*usage)})
+                self._event("message_stop", {"type": "message_stop"})
+            else:
+                base = {"id": f"chatcmpl-mock-{request_id}", "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": model}
+                self._event(None, {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                                        "finish_reason": None}]})
+                for chunk in self._paced(chunks, interval):
+                    self._event(None, {**base, "choices": [{"index": 0, "delta": {"content": chunk},
+                                                            "finish_reason": None}]})
+                self._event(None, {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                                   "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1],
+                                             "total_tokens": sum(usage)}})
+                self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        @staticmethod
+        def _paced(chunks, interval):
+            """Yield chunks at the configured rate, without drifting behind it."""
+            start = time.monotonic()
+            for index, chunk in enumerate(chunks):
+                delay = start + index * interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                yield chunk
+
+        def _event(self, name, data):
+            event = f"event: {name}\n" if name else ""
+            self._write_chunk(f"{event}data: {json.dumps(data)}\n\n".encode())
+
+        def _write_chunk(self, data: bytes):
+            # HTTP/1.1 chunked encoding keeps the connection reusable; an empty chunk ends the body
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(config: MockConfig, host: str, port: int, replies, connection=None) -> None:
+    """Run the server until the process ends, sending the bound port to connection."""
+    httpd = ThreadingHTTPServer((host, port), _handler_class(_ServerState(config, replies)))
+    httpd.daemon_threads = True
+    if connection is not None:
+        connection.send(httpd.server_address[1])
+        connection.close()
+    httpd.serve_forever()
+
+
+class MockLLMServer:
+    """The mock server, run in a subprocess. Use as a context manager, or call
+    start() and stop().
+
+    The server needs its own process: a baml_py sync stream holds the GIL
+    while it waits for the response, which would deadlock a server thread in
+    the same interpreter, and serving in-process would skew client timings.
+    """
+
+    def __init__(self, config: typing.Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0,
+                 replies: typing.Optional[typing.List[typing.Tuple[str, typing.Callable[[str, MockConfig], str]]]] = None):
+        """Prepare the server.
+
+        Args:
+            config: Timing and failure behaviour
+            host: Interface to listen on
+            port: Port to listen on, 0 for a free one
+            replies: (prompt pattern, reply function) pairs; module-level functions, as they
+                are sent to the server process. Defaults to CANNED_REPLIES
+        """
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self.replies = replies or CANNED_REPLIES
+        self._process: typing.Optional[multiprocessing.process.BaseProcess] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        """Requests, streams and injected errors served so far."""
+        with urllib.request.urlopen(f"{self.url}/stats", timeout=5) as response:
+            return json.loads(response.read())
+
+    def start(self) -> "MockLLMServer":
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=serve, args=(self.config, self.host, self.port, self.replies, sender),
+            name="mock-llm-server", daemon=True,
+        )
+        self._process.start()
+        sender.close()
+        if not receiver.poll(30):
+            self.stop()
+            raise RuntimeError("Mock LLM server did not start")
+        self.port = receiver.recv()
+        return self
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def client_registry(self) -> baml_py.ClientRegistry:
+        """A registry that sends every client of clients.baml to this server."""
+        registry = baml_py.ClientRegistry()
+        for name, provider in CLIENTS.items():
+            base_url = self.url if provider == "anthropic" else f"{self.url}/v1"
+            registry.add_llm_client(name, provider, {"base_url": base_url, "api_key": "mock", "model": f"mock-{name}"})
+        return registry
+
+
+def percentiles(values: typing.List[float]) -> str:
+    ordered = sorted(values)
+    if not ordered:
+        return "-"
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+    return f"p50 {pick(0.5) * 1000:.0f}ms  p95 {pick(0.95) * 1000:.0f}ms  max {ordered[-1] * 1000:.0f}ms"
+
+
+async def load_test(server: MockLLMServer, function_name: str, calls: int, concurrency: int, stream: bool) -> None:
+    """Call a BAML function through the async client against the server and print latencies."""
+    from baml_client.async_client import b
+    from baml_client.types import Message
+
+    messages = [Message(role="user", content="Where is the user authentication code?")]
+    options = {"client_registry": server.client_registry()}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, first_partials, failures = [], [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    first = None
+                    stream_call = getattr(b.stream, function_name)(messages, baml_options=options)
+                    async for _ in stream_call:
+                        first = first or time.perf_counter() - start
+                    # Errors surface here, not while iterating
+                    await stream_call.get_final_response()
+                    first_partials.append(first or 0.0)
+                else:
+                    await getattr(b, function_name)(messages, baml_options=options)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(calls)])
+    elapsed = time.perf_counter() - start
+    print(f"{function_name}: {calls} calls, concurrency {concurrency}, {'stream' if stream else 'call'}")
+    print(f"  {calls / elapsed:.1f} calls/s, {failures} failed, server {server.stats}")
+    print(f"  latency       {percentiles(latencies)}")
+    if stream:
+        print(f"  first partial {percentiles(first_partials)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["serve", "load"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds to first token")
+    parser.add_argument("--tps", type=float, default=200.0, help="tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--function", default="CodeLocator", help="BAML function to load test")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stream", action="store_true", help="load test the stream client")
+    args = parser.parse_args()
+
+    config = MockConfig(ttft=args.ttft, tokens_per_second=args.tps, error_rate=args.error_rate,
+                        error_status=args.error_status, seed=args.seed)
+    with MockLLMServer(config, args.host, args.port) as server:
+        if args.command == "load":
+            asyncio.run(load_test(server, args.function, args.calls, args.concurrency, args.stream))
+            return
+        print(f"Mock LLM server on {server.url} (OpenAI base_url {server.url}/v1, Anthropic base_url {server.url})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
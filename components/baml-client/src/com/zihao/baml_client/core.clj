@@ -9,9 +9,20 @@
         ;; sync_client 里面只是一个 shell, 真正是交给 runtime 执行的
         ;; runtime 构造又是根据 inlinebaml 的, 所以 inlinebaml, runtime 都需要重新加载
         modules-to-reload (reverse ["baml_client"
+                                    "baml_client.response_cache"
+                                    "baml_client.extended_client"
                                     "baml_client.async_client"
+                                    "baml_client.batch"
                                     "baml_client.sync_client"
+                                    "baml_client.call_manager"
                                     "baml_client.runtime"
+                                    "baml_client.rate_limit"
+                                    "baml_client.hedging"
+                                    "baml_client.stream_throttle"
+                                    "baml_client.stream_pump"
+                                    "baml_client.stream_delta"
+                                    "baml_client.raw_types"
+                                    "baml_client.baml_sources"
                                     "baml_client.parser"
                                     "baml_client.type_builder"
                                     "baml_client.stream_types"
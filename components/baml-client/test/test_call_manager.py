@@ -0,0 +1,64 @@
+import baml_py
+
+from baml_client import call_manager, raw_types, stream_types, types
+from baml_client.call_manager import CallManager
+from baml_client.extended_client import sync_b
+
+DECIDE_ACTION_RESPONSE = '{"message": {"role": "assistant", "content": "1 + 2 = 3"}, "tools": [{"name": "add", "a": 1, "b": 2}]}'
+
+
+def resolve(manager):
+    return manager._DoNotUseDirectlyCallManager__resolve()
+
+
+def test_resolution_is_reused_until_a_relevant_variable_changes(monkeypatch):
+    key = call_manager.RELEVANT_ENV_KEYS[0]
+    monkeypatch.setenv(key, "before")
+    manager = CallManager({"env": {"EXTRA": "1"}})
+    resolved = resolve(manager)
+    assert resolve(manager) is resolved
+    assert (resolved.env_vars[key], resolved.env_vars["EXTRA"]) == ("before", "1")
+    monkeypatch.setenv(key, "after")
+    assert resolve(manager).env_vars[key] == "after"
+    monkeypatch.delenv(key)
+    assert key not in resolve(manager).env_vars
+
+
+def test_setting_an_unset_relevant_variable_is_noticed(monkeypatch):
+    key = call_manager.RELEVANT_ENV_KEYS[-1]
+    monkeypatch.delenv(key, raising=False)
+    manager = CallManager({})
+    assert key not in resolve(manager).env_vars
+    monkeypatch.setenv(key, "set")
+    assert resolve(manager).env_vars[key] == "set"
+
+
+def test_per_call_merges_share_the_environment_copy():
+    manager = CallManager({"env": {"EXTRA": "1"}})
+    controller = baml_py.AbortController()
+    merged = manager.merge_options({"abort_controller": controller, "tags": {"step": "1"}})
+    assert manager.merge_options({}) is manager
+    assert resolve(merged).env_vars is resolve(manager).env_vars
+    assert resolve(merged).abort_controller is controller and resolve(manager).abort_controller is None
+    assert resolve(manager.merge_options({"env": {"EXTRA": "2"}})).env_vars["EXTRA"] == "2"
+
+
+def test_collectors_are_copied_not_shared():
+    collectors = [baml_py.Collector("a")]
+    manager = CallManager({"collector": collectors, "on_tick": lambda name, log: None})
+    assert len(resolve(manager).collectors) == 2
+    assert len(collectors) == 1
+
+
+def test_raw_option_parses_to_dicts():
+    model = sync_b.parse.DecideAction(DECIDE_ACTION_RESPONSE)
+    raw = sync_b.with_options(raw=True).parse.DecideAction(DECIDE_ACTION_RESPONSE)
+    assert raw == model.model_dump()
+    assert sync_b.with_options(raw=True).options == {"raw": True}
+
+
+def test_every_generated_class_has_a_raw_stand_in():
+    for module in (types, stream_types):
+        for name, value in vars(module).items():
+            if isinstance(value, type) and value.__module__ == module.__name__:
+                assert getattr(raw_types, name).model_validate({"a": 1}) == {"a": 1}
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import baml_py
+import pytest
+
+from baml_client import hedging
+from baml_client.hedging import Hedge, HedgePolicy
+
+
+def make_leg(delays, errors=()):
+    """A sync leg that sleeps delays[leg], watching its controller, and records what ran where."""
+    runs = []
+
+    def leg(client_name, abort_controller, tags):
+        name = tags["hedge"]
+        runs.append((name, client_name, threading.current_thread().name))
+        deadline = time.monotonic() + delays[name]
+        while time.monotonic() < deadline:
+            if abort_controller.aborted:
+                raise baml_py.baml_py.BamlAbortError("aborted")
+            time.sleep(0.005)
+        if name in errors:
+            raise baml_py.baml_py.BamlClientError(f"{name} failed")
+        return name
+
+    return leg, runs
+
+
+def hedge(delay_ms=50):
+    return Hedge(HedgePolicy("Primary", "Backup", delay_ms=delay_ms))
+
+
+def test_fast_primary_runs_on_the_calling_thread_without_a_backup():
+    leg, runs = make_leg({"primary": 0.01, "backup": 0})
+    assert hedge().call_sync(leg) == "primary"
+    assert runs == [("primary", None, threading.current_thread().name)]
+
+
+def test_slow_primary_is_hedged_and_aborted_when_the_backup_wins():
+    leg, runs = make_leg({"primary": 5, "backup": 0.01})
+    start = time.monotonic()
+    assert hedge().call_sync(leg) == "backup"
+    assert time.monotonic() - start < 1
+    assert [(name, client) for name, client, _ in runs] == [("primary", None), ("backup", "Backup")]
+
+
+def test_backup_delay_starts_with_the_primary():
+    leg, runs = make_leg({"primary": 0.03, "backup": 0})
+    # Each call's primary finishes before its own delay, however many run at once
+    threads = [threading.Thread(target=hedge(delay_ms=200).call_sync, args=(leg,)) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {name for name, _, _ in runs} == {"primary"}
+
+
+def test_failed_primary_falls_back_to_the_backup_right_away():
+    leg, runs = make_leg({"primary": 0, "backup": 0}, errors={"primary"})
+    assert hedge(delay_ms=10_000).call_sync(leg) == "backup"
+    assert {thread for _, _, thread in runs} == {threading.current_thread().name}
+
+
+def test_primary_error_is_raised_when_both_legs_fail():
+    leg, _ = make_leg({"primary": 0, "backup": 0}, errors={"primary", "backup"})
+    with pytest.raises(baml_py.baml_py.BamlClientError, match="primary failed"):
+        hedge().call_sync(leg)
+
+
+def test_caller_abort_reaches_both_legs():
+    leg, runs = make_leg({"primary": 5, "backup": 5})
+    controller = baml_py.AbortController()
+    threading.Timer(0.2, controller.abort).start()
+    start = time.monotonic()
+    with pytest.raises(baml_py.baml_py.BamlAbortError):
+        hedge().call_sync(leg, controller)
+    assert time.monotonic() - start < 1 and len(runs) == 2
+
+
+def test_async_backup_wins_over_a_slow_primary():
+    async def leg(client_name, abort_controller, tags):
+        await asyncio.sleep(5 if tags["hedge"] == "primary" else 0.01)
+        return tags["hedge"]
+
+    assert asyncio.run(hedge().call_async(leg)) == "backup"
+
+
+def function_log(call_id, leg, finished_at, raw='{"code": "(ls)"}'):
+    return SimpleNamespace(
+        tags={"hedge": leg, "hedge_call": call_id},
+        function_name="CodeActAgent",
+        raw_llm_response=raw,
+        timing=SimpleNamespace(start_time_utc_ms=0, duration_ms=finished_at),
+    )
+
+
+def test_stats_are_read_from_the_collector_logs():
+    collector = SimpleNamespace(logs=[
+        function_log("1", "primary", 100),
+        function_log("2", "primary", 900, raw=None),
+        function_log("2", "backup", 400),
+        function_log("3", "primary", 50, raw=None),
+        function_log("3", "backup", 60, raw=None),
+        SimpleNamespace(tags={}, function_name="CodeActAgent"),
+    ])
+    assert hedging.hedge_stats(collector) == {
+        "GLMCodingA": {"calls": 3, "hedged": 2, "primary_wins": 1, "backup_wins": 1, "failures": 1},
+    }
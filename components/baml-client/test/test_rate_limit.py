@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import baml_py
+import pytest
+
+from baml_client import rate_limit, types
+from baml_client.baml_sources import function_clients
+from baml_client.call_manager import CallManager
+from baml_client.rate_limit import ClientLimiter, ClientLimits
+
+QUESTION = [types.Message(role="user", content="Where is the user authentication code?")]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def usage(input_tokens, output_tokens):
+    """A collector whose last call reported this usage."""
+    return SimpleNamespace(last=SimpleNamespace(usage=SimpleNamespace(input_tokens=input_tokens,
+                                                                      output_tokens=output_tokens)))
+
+
+@pytest.fixture
+def limited():
+    """Configure client limits for one test."""
+    names = []
+
+    def configure(name, **limits):
+        names.append(name)
+        return rate_limit.configure_client(name, **limits)
+
+    yield configure
+    for name in names:
+        rate_limit.remove_client(name)
+
+
+def test_request_rate_allows_a_burst_then_spaces_calls():
+    clock = FakeClock()
+    limiter = ClientLimiter("test", ClientLimits(requests_per_second=2), clock)
+    assert limiter.try_acquire(0) and limiter.try_acquire(0)
+    assert limiter.try_acquire(0) is None
+    clock.now += 0.49
+    assert limiter.try_acquire(0) is None
+    clock.now += 0.01
+    assert limiter.try_acquire(0) is not None
+
+
+def test_token_estimate_is_settled_from_reported_usage():
+    clock = FakeClock()
+    limiter = ClientLimiter("test", ClientLimits(tokens_per_minute=60), clock)
+    reservation = limiter.try_acquire(50)
+    assert limiter.try_acquire(50) is None
+    reservation.release(usage(3, 2))
+    assert limiter.stats["tokens_used"] == 5
+    assert limiter.try_acquire(50) is not None
+    # An underestimate is paid back by the refill, at 1 token/s
+    limiter.try_acquire(5).release(usage(40, 20))
+    assert limiter.try_acquire(1) is None
+    clock.now += 55
+    assert limiter.try_acquire(1) is None
+    clock.now += 1
+    assert limiter.try_acquire(1) is not None
+
+
+def test_a_call_larger_than_the_bucket_waits_for_a_full_bucket():
+    clock = FakeClock()
+    limiter = ClientLimiter("test", ClientLimits(tokens_per_minute=60), clock)
+    limiter.try_acquire(10)
+    assert limiter.try_acquire(100) is None
+    clock.now += 10
+    assert limiter.try_acquire(100) is not None
+
+
+def test_in_flight_limit_blocks_until_release():
+    limiter = ClientLimiter("test", ClientLimits(max_in_flight=1))
+    held = limiter.acquire(0)
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(0), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    held.release()
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.stats["queued"] == 1 and limiter.stats["in_flight"] == 1
+
+
+def test_abort_stops_waiting():
+    limiter = ClientLimiter("test", ClientLimits(max_in_flight=1))
+    limiter.acquire(0)
+    controller = baml_py.AbortController()
+    threading.Timer(0.05, controller.abort).start()
+    start = time.monotonic()
+    with pytest.raises(baml_py.baml_py.BamlAbortError):
+        limiter.acquire(0, controller)
+    assert time.monotonic() - start < 1
+
+
+def test_async_waiters_wake_on_release():
+    limiter = ClientLimiter("test", ClientLimits(max_in_flight=1))
+
+    async def run():
+        held = await limiter.acquire_async(0)
+        waiter = asyncio.ensure_future(limiter.acquire_async(0))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        held.release()
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(run()).waited >= 0.05
+
+
+def test_default_limits_are_opt_in():
+    assert all(rate_limit.limiter_for_client(name) is None for name in rate_limit.DEFAULT_LIMITS)
+    rate_limit.apply_default_limits()
+    try:
+        assert set(rate_limit.limiter_stats()) >= set(rate_limit.DEFAULT_LIMITS)
+    finally:
+        for name in rate_limit.DEFAULT_LIMITS:
+            rate_limit.remove_client(name)
+
+
+def test_registry_calls_count_against_the_function_client(limited, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    own = limited(function_clients()["CodeLocator"], max_in_flight=2)
+    other = limited("LocalClient", max_in_flight=1)
+    manager = CallManager({"client_registry": baml_py.ClientRegistry()})
+    # Streams take their slot lazily, so creating one makes no request
+    _, stream = manager.create_sync_stream(function_name="CodeLocator", args={"messages": QUESTION})
+    assert stream._limiter is own
+    manager = manager.merge_options({"rate_limit_client": "LocalClient"})
+    _, stream = manager.create_sync_stream(function_name="CodeLocator", args={"messages": QUESTION})
+    assert stream._limiter is other
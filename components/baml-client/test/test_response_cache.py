@@ -0,0 +1,100 @@
+import baml_py
+import pytest
+
+from baml_client import types
+from baml_client.extended_client import sync_b
+from baml_client.response_cache import CachedBamlClient, MemoryCache, ResponseCache, SQLiteCache, cache_key
+from baml_client.sync_client import b
+
+QUESTION = [types.Message(role="user", content="Where is the user authentication code?")]
+
+
+class FakeClient:
+    """Stands in for an extended client: exposes options and counts calls."""
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        self.calls = 0
+
+    def with_options(self, **options):
+        return FakeClient({**self.options, **options})
+
+    def CodeLocator(self, messages: list, baml_options: dict = {}) -> types.LocatorDecision:
+        self.calls += 1
+        return types.LocatorDecision(explanation=f"call {self.calls}", tool=None, findings=None)
+
+
+def test_key_covers_function_args_and_env():
+    key = cache_key("CodeLocator", {"messages": QUESTION})
+    assert key == cache_key("CodeLocator", {"messages": [{"content": QUESTION[0].content, "role": "user"}]})
+    assert key != cache_key("ChatAgent", {"messages": QUESTION})
+    assert key != cache_key("CodeLocator", {"messages": QUESTION + QUESTION})
+    assert key != cache_key("CodeLocator", {"messages": QUESTION}, env={"OPENROUTER_API_KEY": "other"})
+    assert key == cache_key("CodeLocator", {"messages": QUESTION}, env={})
+
+
+def test_repeated_calls_hit_the_cache():
+    client = FakeClient()
+    cached = CachedBamlClient(client, MemoryCache())
+    first = cached.CodeLocator(QUESTION)
+    assert cached.CodeLocator(messages=QUESTION) == first
+    assert client.calls == 1 and cached.stats == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.parametrize("options", [
+    {"client_registry": baml_py.ClientRegistry()},
+    {"tb": object()},
+    {"raw": True},
+])
+def test_client_and_call_options_that_bypass_the_cache(options):
+    cache = MemoryCache()
+    configured = CachedBamlClient(FakeClient(), cache).with_options(**options)
+    configured.CodeLocator(QUESTION)
+    configured.CodeLocator(QUESTION)
+    per_call = CachedBamlClient(FakeClient(), cache)
+    per_call.CodeLocator(QUESTION, baml_options=options)
+    assert len(cache) == 0
+
+
+def test_env_of_the_client_is_part_of_the_key():
+    cache = MemoryCache()
+    CachedBamlClient(FakeClient(), cache).CodeLocator(QUESTION)
+    other = FakeClient({"env": {"OPENROUTER_API_KEY": "other"}})
+    CachedBamlClient(other, cache).CodeLocator(QUESTION)
+    assert other.calls == 1 and len(cache) == 2
+
+
+def test_only_clients_that_expose_their_options_are_wrapped():
+    CachedBamlClient(sync_b, MemoryCache())
+    with pytest.raises(TypeError):
+        CachedBamlClient(b, MemoryCache())
+
+
+def test_backends_must_implement_the_abstract_methods():
+    with pytest.raises(TypeError):
+        ResponseCache()
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (b"1", None, b"3")
+
+
+def test_sqlite_cache_expires_and_evicts(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("baml_client.response_cache.time.time", lambda: now[0])
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=60, max_bytes=10, memory_entries=0)
+    cache.put("a", b"12345")
+    now[0] += 1
+    cache.put("b", b"12345")
+    now[0] += 1
+    cache.get("a")
+    cache.put("c", b"12345")
+    assert (cache.get("a"), cache.get("b"), cache.size) == (b"12345", None, 10)
+    now[0] += 61
+    assert cache.get("c") is None
+    cache.close()
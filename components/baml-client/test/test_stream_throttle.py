@@ -0,0 +1,38 @@
+import asyncio
+
+from baml_client.stream_throttle import StreamThrottle, ThrottledStream, ThrottledSyncStream
+
+PARTIALS = ["a", "ab", "abc", "abcd"]
+
+
+class FakeAsyncStream:
+    def __init__(self, partials):
+        self._partials = partials
+
+    async def __aiter__(self):
+        for partial in self._partials:
+            yield partial
+
+
+def test_last_skipped_partial_is_delivered_when_the_stream_ends():
+    stream = ThrottledSyncStream(PARTIALS, StreamThrottle(min_chars=2, on_state_change=False))
+    assert list(stream) == ["a", "abc", "abcd"]
+    assert stream.stats == {"received": 4, "delivered": 3}
+
+
+def test_nothing_is_repeated_when_the_last_partial_was_delivered():
+    stream = ThrottledSyncStream(PARTIALS[:3], StreamThrottle(min_chars=2, on_state_change=False))
+    assert list(stream) == ["a", "abc"]
+
+
+def test_unchanged_partials_are_not_held_back():
+    stream = ThrottledSyncStream(["a", "abc", "abc"], StreamThrottle(min_chars=2))
+    assert list(stream) == ["a", "abc"]
+
+
+def test_async_stream_delivers_the_tail():
+    async def collect():
+        stream = ThrottledStream(FakeAsyncStream(PARTIALS), StreamThrottle(min_interval=60))
+        return [partial async for partial in stream]
+
+    assert asyncio.run(collect()) == ["a", "abcd"]
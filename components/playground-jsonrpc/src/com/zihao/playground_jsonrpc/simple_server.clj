@@ -1,16 +1,23 @@
 (ns com.zihao.playground-jsonrpc.simple-server
   (:gen-class)
   (:require
+   [camel-snake-kebab.core :as csk]
+   [camel-snake-kebab.extras :as cske]
+   [cheshire.core :as json]
+   [clojure.core.async :as async]
+   [clojure.string :as string]
    [jsonrpc4clj.io-server :as io-server]
    [jsonrpc4clj.server :as server]
    [clojure.java.io :as io])
   (:import
+   [java.io InputStream IOException OutputStream]
    [java.net ServerSocket InetAddress]))
 
-(def log-file (io/file "simple_server.log"))
+;; Set with --log, so servers started side by side (textual-main's ServerPool) each get their own
+(def log-file (atom (io/file "simple_server.log")))
 
 (defn log [& args]
-  (with-open [w (io/writer log-file :append true)]
+  (with-open [w (io/writer @log-file :append true)]
     (binding [*out* w]
       (apply println args)
       (.flush w))))
@@ -31,6 +38,33 @@
     (log "Returning:" (str "Hi, " name "!"))
     (str "Hi, " name "!")))
 
+;; Echo method for client benchmarks (textual-main/jsonrpc_bench.py): returns the params
+;; unchanged and doesn't log, so the numbers measure the transport
+(defmethod server/receive-request "echo"
+  [_ _context params]
+  params)
+
+;; Codecs a connection can switch to with $/negotiateCodec. Every frame names its codec in
+;; a Content-Type header (none means JSON), so frames in flight while the codec changes
+;; still decode. The Python client also knows msgpack; cheshire only does CBOR.
+(def codecs
+  {"json" {:content-type nil
+           :encode (fn [message] (.getBytes ^String (json/generate-string message) "UTF-8"))
+           :decode (fn [^bytes body key-fn] (json/parse-string (String. body "UTF-8") key-fn))}
+   "cbor" {:content-type "application/cbor"
+           :encode json/generate-cbor
+           :decode (fn [^bytes body key-fn] (json/parse-cbor body key-fn))}})
+
+(defmethod server/receive-request "$/negotiateCodec"
+  [_ {:keys [codec]} {offered :codecs}]
+  ;; Only connections made by batching-server have a codec to switch (context :codec);
+  ;; the response and everything after it are written in the picked codec
+  (let [picked (or (when codec
+                     (some #(when (contains? codecs %) %) offered))
+                   "json")]
+    (some-> codec (reset! picked))
+    {:codec picked}))
+
 ;; Catch-all default handler for any method not explicitly defined
 (defmethod server/receive-request :default
   [method context params]
@@ -43,36 +77,207 @@
                    :message (str "Method not found: " method)
                    :data method})))
 
+;; JSON-RPC 2.0 batches. jsonrpc4clj only handles single messages, so batch arrays are
+;; split before they reach the server and the responses to a batch are joined after it.
+(defn batch-channels
+  "Takes the channels of a connection, parsed messages read from it and messages to write
+   to it, and returns [input-ch output-ch] for server/chan-server. The messages of a batch
+   array read from raw-input-ch go to the server one by one; the responses to its requests
+   are held back until all of them are in and then written to raw-output-ch as one array.
+   A batch of notifications only gets no response, an empty batch an Invalid Request error."
+  [raw-input-ch raw-output-ch]
+  (let [input-ch (async/chan 1024)
+        output-ch (async/chan 1024)
+        ;; request id -> atoms {:remaining n :responses [...]} of the batches waiting for a
+        ;; response with that id, oldest first. An id repeated in a batch is listed once per
+        ;; request, so each response is joined into the batch.
+        batch-of (atom {})]
+    (async/go-loop []
+      (if-let [message (async/<! raw-input-ch)]
+        (do
+          (cond
+            (not (sequential? message))
+            (async/>! input-ch message)
+
+            (empty? message)
+            (async/>! raw-output-ch {:jsonrpc "2.0"
+                                     :id nil
+                                     :error {:code -32600 :message "Invalid Request: empty batch"}})
+
+            :else
+            (let [ids (keep #(when (map? %) (:id %)) message)
+                  batch (atom {:remaining (count ids) :responses []})]
+              (swap! batch-of #(reduce (fn [batches id] (update batches id (fnil conj []) batch)) % ids))
+              (doseq [item message]
+                (async/>! input-ch item))))
+          (recur))
+        (async/close! input-ch)))
+    (async/go-loop []
+      (if-let [message (async/<! output-ch)]
+        (let [id (:id message)
+              batch (when-not (:method message)
+                      (first (get @batch-of id)))]
+          (if-not batch
+            (async/>! raw-output-ch message)
+            (let [_ (swap! batch-of (fn [batches]
+                                      (let [waiting (subvec (get batches id) 1)]
+                                        (if (seq waiting)
+                                          (assoc batches id waiting)
+                                          (dissoc batches id)))))
+                  {:keys [remaining responses]} (swap! batch #(-> %
+                                                                  (update :remaining dec)
+                                                                  (update :responses conj message)))]
+              (when (zero? remaining)
+                (async/>! raw-output-ch responses))))
+          (recur))
+        (async/close! raw-output-ch)))
+    [input-ch output-ch]))
+
+;; Framing. Like jsonrpc4clj.io-chan, which only reads and writes JSON, but decoding each
+;; frame with the codec of its Content-Type and encoding with the connection's codec.
+(defn- content-type->codec [content-type]
+  (let [media-type (some-> content-type (string/split #";") first string/trim string/lower-case)]
+    (get codecs (if (= media-type "application/cbor") "cbor" "json"))))
+
+(defn- read-header-line
+  "The next header line without its CRLF, nil at end of stream."
+  [^InputStream input]
+  (let [sb (StringBuilder.)]
+    (loop [previous -1]
+      (let [c (.read input)]
+        (cond
+          (neg? c) nil
+          (and (= c 10) (= previous 13)) (str (.deleteCharAt sb (dec (.length sb))))
+          :else (do (.append sb (char c))
+                    (recur c)))))))
+
+(defn- read-frame
+  "Reads and decodes the next frame. Returns nil at end of stream, or :parse-error when the
+   frame can't be decoded, which chan-server answers with a Parse error."
+  [^InputStream input]
+  (loop [headers {}]
+    (when-let [line (read-header-line input)]
+      (if (= "" line)
+        (try
+          (let [content-length (parse-long (get headers "content-length"))
+                body (.readNBytes input (int content-length))]
+            (when (= content-length (alength body))
+              ((:decode (content-type->codec (get headers "content-type")))
+               body csk/->kebab-case-keyword)))
+          (catch Exception _
+            :parse-error))
+        (let [[header-name value] (string/split line #":\s*" 2)]
+          (recur (assoc headers (string/lower-case header-name) value)))))))
+
+(def ^:private kw->camelCaseString
+  (memoize (fn [k] (cond-> k (keyword? k) csk/->camelCaseString))))
+
+(defn- write-frame [^OutputStream output codec message]
+  (let [{:keys [content-type encode]} (get codecs codec)
+        ^bytes body (encode (cske/transform-keys kw->camelCaseString message))]
+    (.write output (.getBytes (str "Content-Length: " (alength body) "\r\n"
+                                   (when content-type
+                                     (str "Content-Type: " content-type "\r\n"))
+                                   "\r\n")
+                              "US-ASCII"))
+    (.write output body)
+    (.flush output)))
+
+(defn- input-stream->input-chan [input]
+  (let [input (io/input-stream input)
+        messages (async/chan 1)]
+    (async/thread
+      (try
+        (loop []
+          (when-let [message (read-frame input)]
+            (when (async/>!! messages message)
+              (recur))))
+        (catch IOException _)
+        (finally
+          (async/close! messages))))
+    messages))
+
+(defn- output-stream->output-chan
+  "Writes each message in the codec named by the codec atom at the time it's written."
+  [output codec]
+  (let [output (io/output-stream output)
+        messages (async/chan 1)]
+    (async/thread
+      (with-open [^OutputStream output output]
+        (loop []
+          (when-let [message (async/<!! messages)]
+            (write-frame output @codec message)
+            (recur)))))
+    messages))
+
+(defn batching-server
+  "Like io-server/server, but also accepts JSON-RPC batch arrays (see batch-channels), and
+   frames in any of codecs. codec is an atom holding the name of the codec responses are
+   written in; pass the same atom as :codec in the context given to server/start so
+   $/negotiateCodec can switch it."
+  [{:keys [in out codec] :or {codec (atom "json")} :as opts}]
+  (let [[input-ch output-ch] (batch-channels (input-stream->input-chan in)
+                                             (output-stream->output-chan out codec))]
+    (server/chan-server (assoc opts :input-ch input-ch :output-ch output-ch))))
+
+(def ready-prefix
+  "Printed to stdout with the port once the socket server is bound, so launchers
+   (textual-main/jsonrpc_client.py) can connect without guessing how long the JVM takes."
+  "JSON-RPC server listening on port ")
+
+(defn- serve-client
+  "Accepts one client on server-socket and serves it until it disconnects. Closes
+   server-socket afterwards unless it should accept more clients."
+  [^ServerSocket server-socket close-server-socket?]
+  (let [_ (log "Waiting for client connection...")
+        client-socket (.accept server-socket)
+        _ (log "Client connected!")
+        codec (atom "json")
+        server (batching-server {:in client-socket
+                                 :out client-socket
+                                 :codec codec
+                                 :on-close #(do
+                                              (log "Closing client socket...")
+                                              (.close client-socket)
+                                              (when close-server-socket?
+                                                (log "Closing server socket...")
+                                                (.close server-socket)))})]
+    (log "Server created, starting...")
+    (let [start-promise (server/start server {:codec codec})]
+      (log "Server started, blocking on server/start...")
+      (let [result @start-promise]
+        (log "Server shut down, result:" result)
+        result))))
+
+(defn- arg-value
+  "Value following flag in args, nil if flag isn't there."
+  [args flag]
+  (some->> args (drop-while #(not= flag %)) second))
+
 (defn -main [& args]
+  (when-let [path (arg-value args "--log")]
+    (reset! log-file (io/file path)))
   (log "=== Server starting ===")
   (let [use-socket? (some #(= "--socket" %) args)
+        ;; Keep the JVM (and its JIT) for the next client instead of exiting after the first
+        serve-forever? (some #(= "--serve-forever" %) args)
         port (when use-socket?
-               (if-let [port-str (some->> args
-                                          (drop-while #(not= "--port" %))
-                                          second)]
+               (if-let [port-str (arg-value args "--port")]
                  (Long/valueOf port-str)
                  51234))]
     (if use-socket?
-      ;; Socket server mode
+      ;; Socket server mode; --port 0 binds a free port, printed in the ready line
       (do
         (log "Starting socket server on port:" port)
-        (let [server-socket (ServerSocket. port 0 (InetAddress/getLoopbackAddress))
-              _ (log "Socket bound, waiting for client connection...")
-              client-socket (.accept server-socket)
-              _ (log "Client connected!")
-              server (io-server/server {:in client-socket
-                                       :out client-socket
-                                       :on-close #(do
-                                                   (log "Closing client socket...")
-                                                   (.close client-socket)
-                                                   (log "Closing server socket...")
-                                                   (.close server-socket))})]
-          (log "Server created, starting...")
-          (let [start-promise (server/start server {})]
-            (log "Server started, blocking on server/start...")
-            (let [result @start-promise]
-              (log "Server shut down, result:" result)
-              result))))
+        (let [server-socket (ServerSocket. port 0 (InetAddress/getLoopbackAddress))]
+          (log "Socket bound, port:" (.getLocalPort server-socket))
+          (println (str ready-prefix (.getLocalPort server-socket)))
+          (flush)
+          (loop []
+            (let [result (serve-client server-socket (not serve-forever?))]
+              (if serve-forever?
+                (recur)
+                result)))))
       ;; Stdio mode (default)
       (do
         (log "Starting stdio server...")
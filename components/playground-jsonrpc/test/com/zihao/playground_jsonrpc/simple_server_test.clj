@@ -0,0 +1,67 @@
+(ns com.zihao.playground-jsonrpc.simple-server-test
+  (:require [clojure.core.async :as async]
+            [clojure.test :refer [deftest testing is]]
+            [com.zihao.playground-jsonrpc.simple-server :as simple-server]))
+
+(defn- take!!
+  "Next message on ch, or ::timeout if none arrives within ms."
+  ([ch] (take!! ch 1000))
+  ([ch ms]
+   (async/alt!!
+     ch ([message] message)
+     (async/timeout ms) ::timeout)))
+
+(defn- echo-connection
+  "batch-channels in front of a fake server that answers every request with its params.
+   Returns [raw-input-ch raw-output-ch], the connection's side of the channels."
+  []
+  (let [raw-input-ch (async/chan 16)
+        raw-output-ch (async/chan 16)
+        [input-ch output-ch] (simple-server/batch-channels raw-input-ch raw-output-ch)]
+    (async/go-loop []
+      (when-let [{:keys [id params]} (async/<! input-ch)]
+        (when (some? id)
+          (async/>! output-ch {:jsonrpc "2.0" :id id :result params}))
+        (recur)))
+    [raw-input-ch raw-output-ch]))
+
+(defn- request [id params]
+  {:jsonrpc "2.0" :id id :method "echo" :params params})
+
+(defn- notification [params]
+  {:jsonrpc "2.0" :method "echo" :params params})
+
+(deftest single-messages-test
+  (testing "Messages outside a batch pass through unchanged"
+    (let [[in out] (echo-connection)]
+      (async/>!! in (request 1 ["a"]))
+      (is (= {:jsonrpc "2.0" :id 1 :result ["a"]} (take!! out))))))
+
+(deftest batch-test
+  (testing "A batch is split into its messages and the responses are joined into one array"
+    (let [[in out] (echo-connection)]
+      (async/>!! in [(request 1 ["a"]) (notification ["b"]) (request 2 ["c"])])
+      (let [responses (take!! out)]
+        (is (vector? responses))
+        (is (= #{[1 ["a"]] [2 ["c"]]} (set (map (juxt :id :result) responses)))))
+      (is (= ::timeout (take!! out 200)))))
+
+  (testing "Requests sharing an id in one batch are all answered inside the array"
+    (let [[in out] (echo-connection)]
+      (async/>!! in [(request 1 ["a"]) (request 1 ["b"])])
+      (let [responses (take!! out)]
+        (is (vector? responses))
+        (is (= #{["a"] ["b"]} (set (map :result responses)))))
+      (is (= ::timeout (take!! out 200)))))
+
+  (testing "A batch of notifications gets no response"
+    (let [[in out] (echo-connection)]
+      (async/>!! in [(notification ["a"]) (notification ["b"])])
+      (is (= ::timeout (take!! out 200)))))
+
+  (testing "An empty batch gets an Invalid Request error"
+    (let [[in out] (echo-connection)]
+      (async/>!! in [])
+      (let [response (take!! out)]
+        (is (nil? (:id response)))
+        (is (= -32600 (get-in response [:error :code])))))))
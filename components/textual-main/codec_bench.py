@@ -0,0 +1,79 @@
+"""Encode/decode time and wire bytes of each codec in jsonrpc_framing.CODECS.
+
+Payloads are shaped like agent tool traffic: a large file read, ripgrep
+matches, a directory listing and a small echo. Codecs whose library isn't
+installed (cbor2, msgpack) are left out:
+
+    python codec_bench.py --repeat 200
+"""
+import argparse
+import time
+
+from jsonrpc_framing import CODECS, encode_frame
+
+
+def file_read(size):
+    line = "(defn handler [request] (assoc request :status 200))  ; some clojure\n"
+    return {"path": "src/core.clj", "content": (line * (size // len(line) + 1))[:size]}
+
+
+def ripgrep_matches(count):
+    return {"matches": [{"path": f"components/agent/src/com/zihao/agent/module_{i % 40}.clj",
+                         "lineNumber": 10 + i,
+                         "column": 4,
+                         "line": f"  (let [result (llm-function/call-baml {{:query query-{i}}})]",
+                         "submatches": [{"start": 16, "end": 34, "match": "llm-function/call"}]}
+                        for i in range(count)]}
+
+
+def directory_listing(count):
+    return {"entries": [{"name": f"file_{i}.clj", "type": "file" if i % 5 else "directory",
+                         "size": 1000 + 37 * i, "modified": 1760000000.5 + i}
+                        for i in range(count)]}
+
+
+PAYLOADS = {
+    "file read 1 MB": lambda: file_read(1_000_000),
+    "ripgrep 500 matches": lambda: ripgrep_matches(500),
+    "listing 1000 entries": lambda: directory_listing(1000),
+    "echo 64 chars": lambda: ["x" * 64],
+}
+
+
+def timed(function, repeat):
+    """Best of three runs of repeat calls, in seconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=100, help="calls per timing run; fewer for the 1 MB payload")
+    args = parser.parse_args()
+
+    print(f"{'':<22}{'codec':<9}{'encode us':>11}{'decode us':>11}{'wire bytes':>12}{'vs json':>9}")
+    for name, make in PAYLOADS.items():
+        message = {"jsonrpc": "2.0", "id": 1, "result": make()}
+        repeat = max(1, args.repeat // 20) if name.startswith("file read") else args.repeat
+        json_bytes = None
+        for codec in CODECS.values():
+            body = codec.encode(message)
+            # The parser decodes from a memoryview of its receive buffer
+            view = memoryview(body)
+            assert codec.decode(view) == message
+            wire = len(encode_frame(message, codec))
+            json_bytes = json_bytes or len(encode_frame(message))
+            print(f"{name:<22}{codec.name:<9}"
+                  f"{timed(lambda: codec.encode(message), repeat) * 1e6:>11.1f}"
+                  f"{timed(lambda: codec.decode(view), repeat) * 1e6:>11.1f}"
+                  f"{wire:>12}{wire / json_bytes:>9.2f}")
+            name = ""
+
+
+if __name__ == "__main__":
+    main()
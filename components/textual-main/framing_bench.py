@@ -0,0 +1,156 @@
+"""Benchmark Content-Length framing on large responses, like 1 MB file reads.
+
+Compares the readline/readexactly parsing SimpleJSONRPCClient used to do on
+asyncio streams with jsonrpc_framing.FrameParser, first on frames already in
+memory (received in 256 KiB chunks, as the event loop does), then end to end
+over loopback against a server process answering every request with the
+same large result:
+
+    python framing_bench.py --size 1000000 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+from jsonrpc_framing import FrameParser, encode_frame
+from simple_jsonrpc_client import SimpleJSONRPCClient
+
+CHUNK = 256 * 1024
+
+
+def file_read_response(request_id, size):
+    """A response shaped like a file read of about size characters"""
+    line = "(defn handler [request] (assoc request :status 200))  ; some clojure\n"
+    return {"jsonrpc": "2.0", "id": request_id,
+            "result": {"path": "src/core.clj", "content": (line * (size // len(line) + 1))[:size]}}
+
+
+async def read_message_streams(reader):
+    """The framing SimpleJSONRPCClient used before jsonrpc_framing"""
+    header_lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        line_str = line.decode('utf-8').strip()
+        if not line_str:
+            break
+        header_lines.append(line_str)
+    content_length = None
+    for line in header_lines:
+        if line.startswith('Content-Length:'):
+            content_length = int(line.split(':', 1)[1].strip())
+            break
+    response_bytes = await reader.readexactly(content_length)
+    return json.loads(response_bytes.decode('utf-8'))
+
+
+def bench_streams(data, messages):
+    async def run():
+        reader = asyncio.StreamReader(limit=2 ** 16)
+        for offset in range(0, len(data), CHUNK):
+            reader.feed_data(data[offset:offset + CHUNK])
+        reader.feed_eof()
+        start = time.perf_counter()
+        for _ in range(messages):
+            await read_message_streams(reader)
+        return time.perf_counter() - start
+    return asyncio.run(run())
+
+
+def bench_frame_parser(data, messages):
+    received = []
+    parser = FrameParser(received.append)
+    view = memoryview(data)
+    start = time.perf_counter()
+    for offset in range(0, len(data), CHUNK):
+        chunk = view[offset:offset + CHUNK]
+        # What the socket's recv_into does
+        buffer = parser.get_buffer(CHUNK)
+        buffer[:len(chunk)] = chunk
+        buffer.release()
+        parser.buffer_updated(len(chunk))
+    elapsed = time.perf_counter() - start
+    assert len(received) == messages
+    return elapsed
+
+
+def bench_decode_only(data, messages, size):
+    body = encode_frame(file_read_response(1, size)).split(b"\r\n\r\n", 1)[1]
+    start = time.perf_counter()
+    for _ in range(messages):
+        json.loads(body.decode("utf-8"))
+    return time.perf_counter() - start
+
+
+def serve(port_pipe, size):
+    """Answer every request with a file_read_response of size characters"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                message = await read_message_streams(reader)
+                if message is None:
+                    break
+                writer.write(encode_frame(file_read_response(message["id"], size)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port_pipe.send(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def bench_loopback(port, messages):
+    results = {}
+    for name in ["streams", "protocol"]:
+        if name == "streams":
+            client = SimpleJSONRPCClient(*await asyncio.open_connection("127.0.0.1", port))
+        else:
+            client = await SimpleJSONRPCClient.connect("127.0.0.1", port)
+        await client.send_request("read_file")
+        start = time.perf_counter()
+        for _ in range(messages):
+            await client.send_request("read_file")
+        results[name] = time.perf_counter() - start
+        await client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000, help="characters of file content per response")
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    frame = encode_frame(file_read_response(1, args.size))
+    data = frame * args.messages
+    megabytes = len(data) / 1e6
+    print(f"{args.messages} responses of {len(frame) / 1e6:.2f} MB")
+
+    rows = [("json.loads only", bench_decode_only(data, args.messages, args.size)),
+            ("streams (before)", bench_streams(data, args.messages)),
+            ("FrameParser", bench_frame_parser(data, args.messages))]
+
+    receive, send = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(send, args.size), daemon=True)
+    server.start()
+    try:
+        loopback = asyncio.run(bench_loopback(receive.recv(), args.messages))
+    finally:
+        server.terminate()
+    rows += [("loopback streams", loopback["streams"]), ("loopback protocol", loopback["protocol"])]
+
+    print(f"{'':<20}{'ms/response':>12}{'MB/s':>10}")
+    for name, elapsed in rows:
+        print(f"{name:<20}{elapsed / args.messages * 1000:>12.2f}{megabytes / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
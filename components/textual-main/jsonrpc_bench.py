@@ -0,0 +1,85 @@
+"""Throughput of SimpleJSONRPCClient against the Clojure simple-server.
+
+Starts com.zihao.playground-jsonrpc.simple-server (or connects to one that is
+already running with --connect) and pipelines "echo" requests over a single
+connection at each concurrency level, optionally as batch frames:
+
+    python jsonrpc_bench.py --requests 5000 --concurrency 1 16 256
+    python jsonrpc_bench.py --connect localhost:51234 --batch 32
+    python jsonrpc_bench.py --codec cbor
+"""
+import argparse
+import asyncio
+import time
+
+from jsonrpc_client import start_server_and_connect
+from simple_jsonrpc_client import SimpleJSONRPCClient
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run_level(client, concurrency, requests, params, batch=1):
+    """Send requests with concurrency callers in flight, batch requests per frame when batch > 1
+
+    Returns:
+        (requests/s, sorted latencies of each call or batch)
+    """
+    latencies = []
+    per_worker = max(1, requests // (concurrency * batch))
+    calls = [("echo", params)] * batch
+
+    async def worker():
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            if batch > 1:
+                await client.send_batch(calls)
+            else:
+                await client.send_request("echo", params)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return len(latencies) * batch / elapsed, sorted(latencies)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connect", help="host:port of a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=51234)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--payload", type=int, default=64, help="characters of params per request")
+    parser.add_argument("--batch", type=int, default=1, help="requests per JSON-RPC batch frame")
+    parser.add_argument("--codec", default="json", help="codec to negotiate with the server: json, cbor or msgpack")
+    args = parser.parse_args()
+
+    server_process = None
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        client = await SimpleJSONRPCClient.connect(host, int(port))
+    else:
+        client, server_process = await start_server_and_connect(port=args.port)
+
+    params = ["x" * args.payload]
+    try:
+        if args.codec != "json":
+            print(f"codec: {await client.negotiate_codec(preferred=(args.codec,))}")
+        # Warm up the JIT and the connection
+        await run_level(client, 16, 500, params)
+        print(f"{'concurrency':>12}{'requests/s':>12}{'p50':>10}{'p99':>10}")
+        for concurrency in args.concurrency:
+            rate, latencies = await run_level(client, concurrency, args.requests, params, args.batch)
+            print(f"{concurrency:>12}{rate:>12.0f}{percentile(latencies, 0.5) * 1000:>8.2f}ms"
+                  f"{percentile(latencies, 0.99) * 1000:>8.2f}ms")
+    finally:
+        await client.close()
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,54 +1,208 @@
 import asyncio
+import contextlib
+import itertools
 import subprocess
-import time
+import threading
+from collections import deque
 from pathlib import Path
 from simple_jsonrpc_client import SimpleJSONRPCClient
 
+# The line simple-server prints on stdout once its socket is bound (simple-server/ready-prefix)
+READY_PREFIX = "JSON-RPC server listening on port "
+# Last lines of the server's stderr kept for the error when it fails to start
+STDERR_TAIL_LINES = 50
 
-async def start_server_and_connect(port=51234, wait_time=2):
+
+def server_command(port, serve_forever=False, log_file=None):
+    """Command line of the Clojure socket server; port 0 picks a free port"""
+    command = [
+        "clojure", "-M", "-m",
+        "com.zihao.playground-jsonrpc.simple-server",
+        "--socket", "--port", str(port)
+    ]
+    if serve_forever:
+        command.append("--serve-forever")
+    if log_file is not None:
+        command += ["--log", str(log_file)]
+    return command
+
+
+def _drain(stream, tail=None):
+    """Read a pipe to its end so the server never blocks on it, keeping the last lines in tail"""
+    for line in stream:
+        if tail is not None:
+            tail.append(line)
+
+
+def _read_ready_port(server_process, stderr_thread, stderr_tail):
+    """Block until the server prints its ready line, returning the port in it"""
+    for line in server_process.stdout:
+        if line.startswith(READY_PREFIX):
+            return int(line[len(READY_PREFIX):])
+    # stdout closed without a ready line: the server exited
+    code = server_process.wait()
+    stderr_thread.join(5)
+    raise RuntimeError(f"Server exited with code {code}: {''.join(stderr_tail).strip()}")
+
+
+async def start_server(port=0, serve_forever=False, timeout=120, log_file=None):
     """
-    Start the Clojure JSON-RPC server and connect to it.
-    
+    Start the Clojure JSON-RPC server and wait until it accepts connections.
+
+    Waits for the ready line the server prints after binding its socket,
+    however long the JVM takes to start.
+
+    Args:
+        port: Port to listen on, 0 for a free one
+        serve_forever: Accept clients one after another instead of exiting
+            when the first one disconnects
+        timeout: Seconds to wait for the ready line before killing the server
+        log_file: Log of the server, relative to components/playground-jsonrpc;
+            None for its default simple_server.log
+
     Returns:
-        tuple: (client, server_process) where client is SimpleJSONRPCClient
-               and server_process is the subprocess.Popen object
+        tuple: (server_process, port)
     """
     # Get the playground-jsonrpc directory
     project_root = Path(__file__).parent.parent.parent
     playground_dir = project_root / "components" / "playground-jsonrpc"
-    
-    # Start the Clojure server
-    server_cmd = [
-        "clojure", "-M", "-m",
-        "com.zihao.playground-jsonrpc.simple-server",
-        "--socket", "--port", str(port)
-    ]
-    
-    print(f"Starting Clojure JSON-RPC server on port {port}...")
+
     server_process = subprocess.Popen(
-        server_cmd,
+        server_command(port, serve_forever, log_file),
         cwd=str(playground_dir),
         stderr=subprocess.PIPE,
-        stdout=subprocess.PIPE
+        stdout=subprocess.PIPE,
+        text=True
     )
-    
+    # Read stderr from the start, so a JVM that logs a lot before the ready line
+    # can't block on a full pipe
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(target=_drain, args=(server_process.stderr, stderr_tail), daemon=True)
+    stderr_thread.start()
+    try:
+        port = await asyncio.wait_for(
+            asyncio.to_thread(_read_ready_port, server_process, stderr_thread, stderr_tail), timeout)
+    except asyncio.TimeoutError:
+        server_process.kill()
+        server_process.wait()
+        raise asyncio.TimeoutError(
+            f"Server not ready after {timeout}s, stderr: {''.join(stderr_tail).strip()}") from None
+    except BaseException:
+        server_process.kill()
+        server_process.wait()
+        raise
+    threading.Thread(target=_drain, args=(server_process.stdout,), daemon=True).start()
+    return server_process, port
+
+
+async def connect_with_backoff(host, port, timeout=10, delay=0.01, max_delay=0.5):
+    """Connect to a server, retrying refused connections with exponential backoff until timeout"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            return await SimpleJSONRPCClient.connect(host, port)
+        except OSError:
+            if loop.time() + delay > deadline:
+                raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+async def start_server_and_connect(port=51234, timeout=120):
+    """
+    Start the Clojure JSON-RPC server and connect to it.
+
+    Args:
+        timeout: Seconds to wait for the server to start
+
+    Returns:
+        tuple: (client, server_process) where client is SimpleJSONRPCClient
+               and server_process is the subprocess.Popen object
+    """
+    print(f"Starting Clojure JSON-RPC server on port {port}...")
+    server_process, port = await start_server(port, timeout=timeout)
     print(f"Server subprocess PID: {server_process.pid}")
-    print(f"Waiting {wait_time} seconds for server to bind socket...")
-    await asyncio.sleep(wait_time)
-    
-    # Check if server is still alive
-    if server_process.poll() is not None:
-        raise RuntimeError(f"Server exited with code {server_process.poll()}")
-    
+
     # Connect to server
     print(f"Connecting to server on localhost:{port}...")
-    reader, writer = await asyncio.open_connection("localhost", port)
+    client = await connect_with_backoff("localhost", port)
     print("Connected!")
-    
-    client = SimpleJSONRPCClient(reader, writer)
+
     return client, server_process
 
 
+class ServerPool:
+    """Keeps size servers started and warm so tests and benchmarks pay for the JVM once
+
+    The servers run with serve_forever, so each connection gets a fresh
+    server session on a JVM that is already up (and JIT-compiled). Each
+    server logs to its own simple_server-pool-<n>.log.
+
+        async with ServerPool(2) as pool:
+            async with pool.client() as client:
+                await client.send_request("echo", ["hi"])
+    """
+
+    def __init__(self, size=2, timeout=120):
+        self.size = size
+        self.timeout = timeout
+        # port -> server process
+        self.servers = {}
+        self._idle = asyncio.Queue()
+        self._log_numbers = itertools.count(1)
+
+    def _start_server(self):
+        log_file = f"simple_server-pool-{next(self._log_numbers)}.log"
+        return start_server(serve_forever=True, timeout=self.timeout, log_file=log_file)
+
+    async def start(self):
+        """Start the servers concurrently and wait until all of them are ready"""
+        started = await asyncio.gather(*[self._start_server() for _ in range(self.size)], return_exceptions=True)
+        for result in started:
+            if not isinstance(result, BaseException):
+                server_process, port = result
+                self.servers[port] = server_process
+                self._idle.put_nowait(port)
+        errors = [result for result in started if isinstance(result, BaseException)]
+        if errors:
+            self.close()
+            raise errors[0]
+        return self
+
+    @contextlib.asynccontextmanager
+    async def client(self):
+        """A client connected to an idle server, which goes back to the pool on exit"""
+        port = await self._idle.get()
+        if self.servers[port].poll() is not None:
+            # The server died, replace it (if that fails too the pool is one server smaller)
+            del self.servers[port]
+            server_process, port = await self._start_server()
+            self.servers[port] = server_process
+        try:
+            client = await connect_with_backoff("localhost", port)
+            try:
+                yield client
+            finally:
+                await client.close()
+        finally:
+            self._idle.put_nowait(port)
+
+    def close(self):
+        """Stop all servers"""
+        for server_process in self.servers.values():
+            server_process.terminate()
+        for server_process in self.servers.values():
+            server_process.wait()
+        self.servers.clear()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
 async def main():
     """Test the client with greet method"""
     client, server_process = await start_server_and_connect()
@@ -0,0 +1,245 @@
+"""
+Content-Length framing for JSON-RPC without intermediate copies.
+
+FrameParser keeps one growable bytearray. The socket receives into it
+directly (through FramingProtocol, an asyncio.BufferedProtocol), header
+boundaries are found with bytearray.find, and each body is decoded straight
+from a memoryview of the buffer. The only copy of the body is the UTF-8
+decode the JSON decoder needs anyway.
+
+Frames can also carry msgpack or CBOR bodies, named by their Content-Type
+header (see CODECS); SimpleJSONRPCClient.negotiate_codec switches a
+connection over when the server supports one.
+
+    parser = FrameParser(on_message)
+    parser.feed(b'Content-Length: 17\\r\\n\\r\\n{"jsonrpc":"2.0"}')
+"""
+import asyncio
+import json
+import typing
+
+HEADER_END = b"\r\n\r\n"
+CONTENT_LENGTH = b"content-length:"
+CONTENT_TYPE = b"content-type:"
+# Smallest free space offered to a recv, and the initial buffer size
+MIN_READ = 64 * 1024
+
+
+def decode_json(view):
+    """Decode a message body from a memoryview of the receive buffer"""
+    return json.loads(str(view, "utf-8"))
+
+
+class Codec(typing.NamedTuple):
+    name: str
+    content_type: bytes  # Content-Type header value of frames in this codec
+    encode: typing.Callable[[typing.Any], bytes]
+    decode: typing.Callable[[memoryview], typing.Any]
+
+
+JSON = Codec("json", b"application/vscode-jsonrpc; charset=utf-8",
+             lambda message: json.dumps(message).encode("utf-8"), decode_json)
+
+# Codecs by name, most preferred binary codec first. cbor2 and msgpack are optional:
+# without them the connection stays on JSON.
+CODECS = {}
+try:
+    import msgpack
+except ImportError:
+    pass
+else:
+    CODECS["msgpack"] = Codec("msgpack", b"application/msgpack", msgpack.packb, msgpack.unpackb)
+try:
+    import cbor2
+except ImportError:
+    pass
+else:
+    CODECS["cbor"] = Codec("cbor", b"application/cbor", cbor2.dumps, cbor2.loads)
+CODECS["json"] = JSON
+
+_CODECS_BY_TYPE = {codec.content_type.split(b";")[0].strip(): codec for codec in CODECS.values()}
+
+
+def encode_frame(message, codec=JSON):
+    """A JSON-RPC message as a Content-Length frame; other codecs than JSON name themselves in Content-Type"""
+    body = codec.encode(message)
+    if codec is JSON:
+        return b"Content-Length: %d\r\n\r\n" % len(body) + body
+    return b"Content-Length: %d\r\nContent-Type: %s\r\n\r\n" % (len(body), codec.content_type) + body
+
+
+class FrameParser:
+    """Splits a byte stream into Content-Length framed messages.
+
+    Frames with a Content-Type of one of CODECS are decoded with that codec,
+    the rest with decode.
+
+    Args:
+        on_message: Called with each decoded message, in order
+        decode: Turns a memoryview of a message body into the message; the
+            view is only valid during the call
+    """
+
+    def __init__(self, on_message, decode=decode_json):
+        self.on_message = on_message
+        self.decode = decode
+        self._buffer = bytearray(MIN_READ)
+        self._start = 0  # First byte not parsed yet
+        self._end = 0  # End of the received bytes
+        self._needed = 0  # Size of the frame being received, once its header is in
+
+    def get_buffer(self, sizehint=-1):
+        """Writable view of the free space at the end of the buffer"""
+        free = len(self._buffer) - self._end
+        wanted = max(sizehint, self._needed - (self._end - self._start), MIN_READ)
+        if free < wanted:
+            pending = self._end - self._start
+            if self._start and len(self._buffer) - pending >= wanted:
+                # Move the partial frame to the front
+                self._buffer[:pending] = memoryview(self._buffer)[self._start:self._end]
+            else:
+                # Grow once to fit the whole frame, never in small steps
+                buffer = bytearray(max(2 * len(self._buffer), pending + wanted))
+                buffer[:pending] = memoryview(self._buffer)[self._start:self._end]
+                self._buffer = buffer
+            self._start, self._end = 0, pending
+        return memoryview(self._buffer)[self._end:]
+
+    def buffer_updated(self, nbytes):
+        """nbytes were written into the view from get_buffer"""
+        self._end += nbytes
+        self._parse()
+
+    def feed(self, data):
+        """Copy received bytes in and parse them (for stream readers and tests)"""
+        view = self.get_buffer(len(data))
+        view[:len(data)] = data
+        view.release()
+        self.buffer_updated(len(data))
+
+    def _parse(self):
+        buffer = self._buffer
+        while True:
+            header_end = buffer.find(HEADER_END, self._start, self._end)
+            if header_end < 0:
+                break
+            body_start = header_end + len(HEADER_END)
+            body_end = body_start + self._content_length(self._start, header_end)
+            if body_end > self._end:
+                self._needed = body_end - self._start
+                break
+            self._needed = 0
+            decode = self._decoder(self._start, header_end)
+            with memoryview(buffer) as view, view[body_start:body_end] as body:
+                message = decode(body)
+            self._start = body_end
+            self.on_message(message)
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def _header(self, name, lower_name, start, end):
+        """Value of a header between start and end, None if it's missing"""
+        buffer = self._buffer
+        position = buffer.find(name, start, end)
+        if position < 0:
+            # Header names are case-insensitive; lower() copies, but only the header
+            position = buffer[start:end].lower().find(lower_name)
+            if position < 0:
+                return None
+            position += start
+        value_start = position + len(lower_name)
+        value_end = buffer.find(b"\r\n", value_start, end)
+        return buffer[value_start:end if value_end < 0 else value_end]
+
+    def _content_length(self, start, end):
+        value = self._header(b"Content-Length:", CONTENT_LENGTH, start, end)
+        if value is None:
+            raise ValueError("No Content-Length header in response")
+        return int(value)
+
+    def _decoder(self, start, end):
+        value = self._header(b"Content-Type:", CONTENT_TYPE, start, end)
+        if value is None:
+            return self.decode
+        codec = _CODECS_BY_TYPE.get(bytes(value.split(b";")[0].strip().lower()))
+        return self.decode if codec is None or codec is JSON else codec.decode
+
+
+class FramingProtocol(asyncio.BufferedProtocol):
+    """Receives Content-Length frames into a FrameParser, and writes them.
+
+    Provides the StreamWriter methods SimpleJSONRPCClient uses (write,
+    drain, close, wait_closed, is_closing).
+
+    Args:
+        on_message: Called with each decoded message
+        on_close: Called with None or the exception the connection closed with
+    """
+
+    def __init__(self, on_message, on_close, decode=decode_json):
+        self.parser = FrameParser(on_message, decode)
+        self.on_close = on_close
+        self.transport = None
+        self._paused = False
+        self._drain_waiters = []
+        self._closed = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        try:
+            self.parser.buffer_updated(nbytes)
+        except Exception as e:
+            # Framing is lost, the connection can't be used anymore
+            self.transport.abort()
+            self.connection_lost(e)
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        if self._closed.done():
+            return
+        self._closed.set_result(None)
+        self._wake_drain_waiters(exc)
+        self.on_close(exc)
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        self._wake_drain_waiters(None)
+
+    def _wake_drain_waiters(self, exc):
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                if exc is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(ConnectionError(f"Connection lost: {exc}"))
+        self._drain_waiters.clear()
+
+    def write(self, data):
+        self.transport.write(data)
+
+    async def drain(self):
+        if self._closed.done():
+            raise ConnectionError("Connection closed")
+        if self._paused:
+            waiter = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+    def is_closing(self):
+        return self.transport is None or self.transport.is_closing()
+
+    def close(self):
+        self.transport.close()
+
+    async def wait_closed(self):
+        await self._closed
@@ -1,80 +1,262 @@
 #!/usr/bin/env python3
 """
 Simple JSON-RPC client using asyncio streams.
+
+Requests are pipelined over one connection: send_request writes its frame
+and waits on a future, and a background reader task resolves the futures by
+response id, in whatever order the server answers.
+
+    results = await asyncio.gather(*[client.send_request("echo", [i]) for i in range(256)])
+
+send_batch sends many requests in one JSON-RPC batch frame and notify sends
+requests without an id, which get no response. Frames are parsed by
+jsonrpc_framing; SimpleJSONRPCClient.connect(host, port) has the socket
+receive straight into the parser's buffer.
+
+negotiate_codec moves a connection from JSON to msgpack or CBOR when the
+server supports one of them (and cbor2/msgpack are installed).
 """
 import asyncio
-import json
+
+from jsonrpc_framing import CODECS, JSON, MIN_READ, FrameParser, FramingProtocol, encode_frame
+
+
+class JSONRPCError(Exception):
+    """An error response from the server"""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(f"JSON-RPC error: {message} (code: {code})")
+        self.code = code
+        self.message = message
+        self.data = data
 
 
 class SimpleJSONRPCClient:
     """Simple JSON-RPC client using asyncio streams"""
-    
+
     def __init__(self, reader, writer):
+        """Client over asyncio streams; see connect() for the faster protocol-based transport"""
         self.reader = reader
         self.writer = writer
         self.request_id = 0
-    
-    async def send_request(self, method, params=None):
-        """Send a JSON-RPC request and wait for response"""
+        # request id -> future of the response, resolved by the reader task
+        self._pending = {}
+        self._reader_task = None
+        self._closed_error = None
+        # Codec of the frames we write; frames we read name their own in Content-Type
+        self.codec = JSON
+
+    @classmethod
+    async def connect(cls, host, port):
+        """Connect to a server, receiving responses straight into a FramingProtocol's buffer"""
+        client = cls(None, None)
+        loop = asyncio.get_running_loop()
+        _, client.writer = await loop.create_connection(
+            lambda: FramingProtocol(client._dispatch, client._connection_lost), host, port)
+        return client
+
+    async def negotiate_codec(self, preferred=("msgpack", "cbor"), timeout=None):
+        """Agree on a binary codec with the server, keeping JSON if it has none of them
+
+        Sends a $/negotiateCodec request listing the codecs available here in
+        order of preference. msgpack decodes fastest here (codec_bench.py);
+        CBOR, all the Clojure server speaks, decodes tool payloads about as
+        fast as JSON or faster and sends 18-33% fewer bytes. The server
+        answers with the one it picked and uses it for everything it writes
+        after that answer; this client switches once the answer is in. Each
+        frame names its codec in its Content-Type header, so frames already
+        in flight decode either way.
+        Call it right after connecting.
+
+        Returns:
+            The name of the codec in use, "json" when the server doesn't
+            support negotiation or any of the codecs
+        """
+        offered = [name for name in preferred if name in CODECS] + ["json"]
+        try:
+            result = await self.send_request("$/negotiateCodec", {"codecs": offered}, timeout)
+        except JSONRPCError as e:
+            if e.code != -32601:
+                raise
+            # Method not found: a server without codec support
+            return self.codec.name
+        codec = CODECS.get((result or {}).get("codec"), JSON)
+        self.codec = codec
+        return codec.name
+
+    async def send_request(self, method, params=None, timeout=None):
+        """Send a JSON-RPC request and wait for response
+
+        Args:
+            timeout: Seconds to wait for the response, None waits forever.
+                On timeout or cancellation the server is sent a
+                $/cancelRequest and a late response is dropped.
+
+        Raises:
+            JSONRPCError: The server answered with an error
+            ConnectionError: The connection closed before the response came
+            asyncio.TimeoutError: No response within timeout
+        """
+        request = self._new_request(method, params)
+        [response] = await self._exchange(request, [request], timeout)
+        return self._result(response)
+
+    async def send_batch(self, calls, timeout=None, return_exceptions=False):
+        """Send several requests as one JSON-RPC batch array and wait for all responses
+
+        One frame goes out for the whole batch, and a server that supports
+        batches answers with one frame too.
+
+            contents = await client.send_batch([("read_file", [path]) for path in paths])
+
+        Args:
+            calls: (method, params) pairs, params may be None
+            timeout: Seconds to wait for all responses, as in send_request
+            return_exceptions: Return a JSONRPCError in place of the result
+                of a failed request instead of raising the first one
+
+        Returns:
+            The results in the order of calls
+        """
+        requests = [self._new_request(method, params) for method, params in calls]
+        if not requests:
+            return []
+        responses = await self._exchange(requests, requests, timeout)
+        results = []
+        for response in responses:
+            try:
+                results.append(self._result(response))
+            except JSONRPCError as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    async def notify(self, method, params=None):
+        """Send a JSON-RPC notification: a request without id, which gets no response"""
+        if self._closed_error is not None:
+            raise self._closed_error
+        notification = {
+            "jsonrpc": "2.0",
+            "method": method
+        }
+        if params is not None:
+            notification["params"] = params
+        self._write_message(notification)
+        await self.writer.drain()
+
+    def _new_request(self, method, params):
         self.request_id += 1
-        request_id = self.request_id
-        
         request = {
             "jsonrpc": "2.0",
             "method": method,
-            "id": request_id
+            "id": self.request_id
         }
-        
         if params is not None:
             request["params"] = params
-        
-        # Format as Content-Length message (like LSP)
-        request_json = json.dumps(request)
-        request_bytes = request_json.encode('utf-8')
-        content_length = len(request_bytes)
-        header = f"Content-Length: {content_length}\r\n\r\n"
-        message = header.encode('utf-8') + request_bytes
-        
-        # Send request
-        self.writer.write(message)
-        await self.writer.drain()
-        
-        # Read response
-        # First read the Content-Length header
-        header_lines = []
-        while True:
-            line = await self.reader.readline()
-            if not line:
-                raise ConnectionError("Connection closed")
-            line_str = line.decode('utf-8').strip()
-            if not line_str:
-                break  # Empty line means end of headers
-            header_lines.append(line_str)
-        
-        # Parse Content-Length
-        content_length = None
-        for line in header_lines:
-            if line.startswith('Content-Length:'):
-                content_length = int(line.split(':', 1)[1].strip())
-                break
-        
-        if content_length is None:
-            raise ValueError("No Content-Length header in response")
-        
-        # Read the message body
-        response_bytes = await self.reader.readexactly(content_length)
-        response_json = response_bytes.decode('utf-8')
-        response = json.loads(response_json)
-        
+        return request
+
+    async def _exchange(self, message, requests, timeout):
+        """Write a request or batch and wait for the responses to its requests, in their order"""
+        if self._closed_error is not None:
+            raise self._closed_error
+        self._ensure_reader()
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for request in requests:
+            futures[request["id"]] = self._pending[request["id"]] = loop.create_future()
+        try:
+            self._write_message(message)
+            await self.writer.drain()
+            return await asyncio.wait_for(asyncio.gather(*futures.values()), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # wait_for cancels the futures on timeout; a response that already arrived needs no cancel
+            for request_id, future in futures.items():
+                if future.cancelled() or not future.done():
+                    self._cancel_on_server(request_id)
+            raise
+        finally:
+            for request_id in futures:
+                self._pending.pop(request_id, None)
+
+    @staticmethod
+    def _result(response):
         # Check for errors
         if "error" in response:
             error = response["error"]
-            raise Exception(f"JSON-RPC error: {error.get('message', 'Unknown error')} (code: {error.get('code', 'unknown')})")
-        
+            raise JSONRPCError(error.get('code', 'unknown'), error.get('message', 'Unknown error'), error.get('data'))
         return response.get("result")
-    
+
+    def _write_message(self, message):
+        # Format as Content-Length message (like LSP)
+        self.writer.write(encode_frame(message, self.codec))
+
+    def _cancel_on_server(self, request_id):
+        """Tell the server to stop working on a request nobody waits for anymore (LSP $/cancelRequest)"""
+        if self._closed_error is None and not self.writer.is_closing():
+            self._write_message({"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": request_id}})
+
+    def _ensure_reader(self):
+        # Clients from connect() are fed by their FramingProtocol instead
+        if self._reader_task is None and self.reader is not None:
+            self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        """Resolve pending requests with the responses as they arrive"""
+        parser = FrameParser(self._dispatch)
+        error = ConnectionError("Connection closed")
+        try:
+            while True:
+                data = await self.reader.read(MIN_READ)
+                if not data:
+                    break
+                parser.feed(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = ConnectionError(f"Connection failed: {e}")
+            error.__cause__ = e
+        finally:
+            self._fail_pending(error)
+
+    def _connection_lost(self, exc):
+        if exc is None:
+            self._fail_pending(ConnectionError("Connection closed"))
+        else:
+            error = ConnectionError(f"Connection failed: {exc}")
+            error.__cause__ = exc
+            self._fail_pending(error)
+
+    def _dispatch(self, message):
+        if isinstance(message, list):
+            # Response to a batch
+            for item in message:
+                self._dispatch(item)
+            return
+        if "method" in message:
+            # A request or notification from the server, whose id may be one of ours
+            return
+        # Responses to requests that timed out or were cancelled have no pending future
+        future = self._pending.get(message.get("id"))
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def _fail_pending(self, error):
+        if self._closed_error is None:
+            self._closed_error = error
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
     async def close(self):
         """Close the connection"""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(ConnectionError("Connection closed"))
         self.writer.close()
         await self.writer.wait_closed()
-
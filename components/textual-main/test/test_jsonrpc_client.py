@@ -0,0 +1,76 @@
+import asyncio
+import sys
+
+import pytest
+
+import jsonrpc_client
+from jsonrpc_client import READY_PREFIX, ServerPool, start_server
+
+# Writes more to stderr than a pipe holds before printing the ready line
+CHATTY_SERVER = f"""
+import sys, time
+for i in range(20000):
+    sys.stderr.write(f"starting {{i}} " + "x" * 40 + "\\n")
+sys.stderr.flush()
+print("{READY_PREFIX}4321", flush=True)
+time.sleep(60)
+"""
+
+# Ready right away, on a port of its own
+IDLE_SERVER = f"""
+import os, time
+print("{READY_PREFIX}%d" % (10000 + os.getpid() % 50000), flush=True)
+time.sleep(60)
+"""
+
+FAILING_SERVER = """
+import sys
+for i in range(200):
+    print(f"loading {i}", file=sys.stderr)
+print("Address already in use", file=sys.stderr)
+sys.exit(3)
+"""
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """Make start_server run a Python script instead of the Clojure server; records each command's log_file"""
+    log_files = []
+
+    def use(script):
+        def command(port, serve_forever=False, log_file=None):
+            log_files.append(log_file)
+            return [sys.executable, "-c", script]
+        monkeypatch.setattr(jsonrpc_client, "server_command", command)
+        return log_files
+
+    return use
+
+
+def test_stderr_is_drained_before_the_ready_line(fake_server):
+    fake_server(CHATTY_SERVER)
+
+    async def run():
+        server_process, port = await start_server(timeout=30)
+        server_process.kill()
+        server_process.wait()
+        return port
+
+    assert asyncio.run(run()) == 4321
+
+
+def test_failure_reports_the_end_of_stderr(fake_server):
+    fake_server(FAILING_SERVER)
+    with pytest.raises(RuntimeError, match="(?s)code 3: loading 151\n.*loading 199\nAddress already in use$"):
+        asyncio.run(start_server(timeout=30))
+
+
+def test_pooled_servers_get_their_own_log(fake_server):
+    log_files = fake_server(IDLE_SERVER)
+
+    async def run():
+        async with ServerPool(2, timeout=30) as pool:
+            return len(pool.servers)
+
+    assert asyncio.run(run()) == 2
+    assert len(set(log_files)) == 2 and None not in log_files
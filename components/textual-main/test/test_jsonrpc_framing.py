@@ -0,0 +1,75 @@
+import pytest
+
+from jsonrpc_framing import CODECS, JSON, MIN_READ, FrameParser, encode_frame
+
+MESSAGES = [
+    {"jsonrpc": "2.0", "id": 1, "method": "echo", "params": ["héllo"]},
+    {"jsonrpc": "2.0", "id": 2, "result": {"lines": ["x" * 100] * 10}},
+    {"jsonrpc": "2.0", "method": "$/progress", "params": {"done": True}},
+]
+
+
+def parse(*chunks):
+    received = []
+    parser = FrameParser(received.append)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return received
+
+
+def test_frames_in_one_feed():
+    assert parse(b"".join(encode_frame(message) for message in MESSAGES)) == MESSAGES
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 30, 1000])
+def test_frames_split_across_feeds(size):
+    stream = b"".join(encode_frame(message) for message in MESSAGES)
+    assert parse(*(stream[i:i + size] for i in range(0, len(stream), size))) == MESSAGES
+
+
+def test_split_at_every_position():
+    stream = encode_frame(MESSAGES[0]) + encode_frame(MESSAGES[2])
+    for split in range(1, len(stream)):
+        assert parse(stream[:split], stream[split:]) == [MESSAGES[0], MESSAGES[2]]
+
+
+def test_frame_larger_than_the_buffer():
+    message = {"jsonrpc": "2.0", "id": 3, "result": "x" * (3 * MIN_READ)}
+    stream = encode_frame(MESSAGES[0]) + encode_frame(message) + encode_frame(MESSAGES[2])
+    assert parse(stream[:100], stream[100:MIN_READ], stream[MIN_READ:]) == [MESSAGES[0], message, MESSAGES[2]]
+
+
+def test_receiving_into_the_parser_buffer():
+    received = []
+    parser = FrameParser(received.append)
+    for message in MESSAGES:
+        frame = encode_frame(message)
+        view = parser.get_buffer(-1)
+        view[:len(frame)] = frame
+        view.release()
+        parser.buffer_updated(len(frame))
+    assert received == MESSAGES
+
+
+def test_header_names_are_case_insensitive():
+    body = b'{"id": 1}'
+    frame = b"content-length: %d\r\nCONTENT-TYPE: application/vscode-jsonrpc\r\n\r\n" % len(body) + body
+    assert parse(frame) == [{"id": 1}]
+
+
+def test_missing_content_length_is_an_error():
+    with pytest.raises(ValueError):
+        parse(b"Content-Type: application/json\r\n\r\n{}")
+
+
+@pytest.mark.parametrize("codec", [name for name in CODECS if name != "json"])
+def test_mixed_codecs_on_one_connection(codec):
+    codecs = [JSON, CODECS[codec], JSON]
+    stream = b"".join(encode_frame(message, codec) for message, codec in zip(MESSAGES, codecs))
+    assert parse(*(stream[i:i + 5] for i in range(0, len(stream), 5))) == MESSAGES
+
+
+def test_unknown_content_type_falls_back_to_the_default_decoder():
+    body = b'{"id": 1}'
+    frame = b"Content-Length: %d\r\nContent-Type: application/x-unknown\r\n\r\n" % len(body) + body
+    assert parse(frame) == [{"id": 1}]
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from jsonrpc_framing import CODECS, JSON, FrameParser, encode_frame
+from simple_jsonrpc_client import JSONRPCError, SimpleJSONRPCClient
+
+
+class FakeServer:
+    """In-process JSON-RPC server over Content-Length frames.
+
+    Methods: echo answers with its params; sleep [seconds, value] answers
+    value after seconds; fail answers with an error; ask_first sends a
+    request of its own with the caller's id before answering; hang_up
+    closes the connection. Batches are answered in reverse order.
+    $/negotiateCodec picks from CBOR and JSON, like the Clojure server.
+    Everything received is kept in messages.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.server = None
+        self.codec = JSON
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def received(self, method):
+        return [message for message in self.messages if isinstance(message, dict) and message.get("method") == method]
+
+    async def _serve(self, reader, writer):
+        tasks = []
+        parser = FrameParser(lambda message: tasks.append(asyncio.create_task(self._handle(message, writer))))
+        try:
+            while data := await reader.read(4096):
+                parser.feed(data)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _handle(self, message, writer):
+        self.messages.append(message)
+        if isinstance(message, list):
+            responses = await asyncio.gather(*[self._answer(request, writer) for request in message])
+            writer.write(encode_frame([response for response in reversed(responses) if response is not None],
+                                      self.codec))
+        elif (response := await self._answer(message, writer)) is not None:
+            writer.write(encode_frame(response, self.codec))
+
+    async def _answer(self, request, writer):
+        method, params = request["method"], request.get("params")
+        if "id" not in request:
+            return None
+        if method == "sleep":
+            seconds, params = params
+            await asyncio.sleep(seconds)
+        elif method == "fail":
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "failed"}}
+        elif method == "ask_first":
+            writer.write(encode_frame({"jsonrpc": "2.0", "id": request["id"], "method": "window/showMessage"}))
+        elif method == "hang_up":
+            writer.close()
+            return None
+        elif method == "$/negotiateCodec":
+            # The answer is already written in the picked codec
+            picked = next(name for name in params["codecs"] if name in ("cbor", "json"))
+            self.codec = CODECS[picked]
+            params = {"codec": picked}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": params}
+
+
+async def open_streams_client(host, port):
+    return SimpleJSONRPCClient(*await asyncio.open_connection(host, port))
+
+
+@pytest.fixture(params=[open_streams_client, SimpleJSONRPCClient.connect], ids=["streams", "connect"])
+def run(request):
+    """Run test(client, server) against a fresh FakeServer, with each kind of client."""
+    def run_test(test):
+        async def main():
+            server = FakeServer()
+            client = await request.param(*await server.start())
+            try:
+                await test(client, server)
+            finally:
+                await client.close()
+                await server.close()
+        asyncio.run(main())
+    return run_test
+
+
+def test_responses_out_of_order_reach_their_requests(run):
+    async def test(client, server):
+        delays = [0.2, 0.1, 0, 0.15, 0.05]
+        results = await asyncio.gather(*[client.send_request("sleep", [delay, i]) for i, delay in enumerate(delays)])
+        assert results == list(range(len(delays)))
+
+    run(test)
+
+
+def test_server_requests_are_not_taken_for_responses(run):
+    async def test(client, server):
+        assert await client.send_request("ask_first", ["answer"]) == ["answer"]
+
+    run(test)
+
+
+def test_error_response_raises(run):
+    async def test(client, server):
+        with pytest.raises(JSONRPCError, match="failed") as error:
+            await client.send_request("fail")
+        assert error.value.code == -32000
+        # The connection is still usable
+        assert await client.send_request("echo", [1]) == [1]
+
+    run(test)
+
+
+def test_timeout_cancels_the_request_on_the_server(run):
+    async def test(client, server):
+        with pytest.raises(asyncio.TimeoutError):
+            await client.send_request("sleep", [0.3, "late"], timeout=0.05)
+        assert await client.send_request("echo", ["next"]) == ["next"]
+        [cancel] = server.received("$/cancelRequest")
+        assert cancel["params"] == {"id": server.received("sleep")[0]["id"]}
+        # The late response arrives and is dropped
+        await asyncio.sleep(0.3)
+        assert await client.send_request("echo", ["still here"]) == ["still here"]
+
+    run(test)
+
+
+def test_pending_requests_fail_when_the_connection_closes(run):
+    async def test(client, server):
+        waiting = asyncio.ensure_future(client.send_request("sleep", [5, None]))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ConnectionError):
+            await client.send_request("hang_up")
+        with pytest.raises(ConnectionError):
+            await waiting
+        with pytest.raises(ConnectionError):
+            await client.send_request("echo", [1])
+
+    run(test)
+
+
+def test_batch_results_follow_the_calls(run):
+    async def test(client, server):
+        results = await client.send_batch([("echo", [i]) for i in range(5)] + [("fail", None)],
+                                          return_exceptions=True)
+        assert results[:5] == [[i] for i in range(5)]
+        assert isinstance(results[5], JSONRPCError)
+        # One frame for the whole batch
+        assert len(server.messages) == 1 and len(server.messages[0]) == 6
+        with pytest.raises(JSONRPCError):
+            await client.send_batch([("echo", [1]), ("fail", None)])
+        assert await client.send_batch([]) == []
+
+    run(test)
+
+
+def test_notifications_get_no_response(run):
+    async def test(client, server):
+        await client.notify("note", {"n": 1})
+        await client.notify("note")
+        assert await client.send_request("echo", ["after"]) == ["after"]
+        assert server.received("note") == [{"jsonrpc": "2.0", "method": "note", "params": {"n": 1}},
+                                           {"jsonrpc": "2.0", "method": "note"}]
+
+    run(test)
+
+
+@pytest.mark.skipif("cbor" not in CODECS, reason="cbor2 is not installed")
+def test_default_negotiation_reaches_a_cbor_only_server(run):
+    async def test(client, server):
+        assert await client.negotiate_codec() == "cbor"
+        # Both ends write CBOR from here on
+        assert client.codec is server.codec is CODECS["cbor"]
+        assert await client.send_request("echo", ["héllo"]) == ["héllo"]
+
+    run(test)